@@ -2,6 +2,7 @@ import pygame as pg
 from .engine import Engine
 from .scene import Scene
 from .nodes.node import Node
+from .nodes.static_instance import StaticInstance
 from .mesh.mesh import Mesh
 from .render.image import Image
 from .render.material import Material
@@ -10,6 +11,7 @@ from .render.shader_handler import ShaderHandler
 from .draw import draw
 from .render.camera import FreeCamera, StaticCamera, FollowCamera, OrbitCamera, FixedCamera
 from .render.sky import Sky
+from .render.light import PointLight, SpotLight
 from .render.post_process import PostProcess
 from .particles.particle_handler import ParticleHandler
 from .render.framebuffer import Framebuffer
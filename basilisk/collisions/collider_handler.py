@@ -9,38 +9,67 @@ from .narrow.dataclasses import ContactPoint, ContactManifold, Collision
 from ..nodes.node import Node
 from ..generic.collisions import get_sat_axes
 from ..physics.impulse import calculate_collisions
+from ..generic.registry import Registry
 
 class ColliderHandler():
     scene: ...
     """Back reference to scene"""
-    colliders: list[Collider]
-    """Main list of collders contained in the scene"""
+    colliders: Registry
+    """Main registry of collders contained in the scene"""
     bvh: BroadBVH
     """Broad bottom up BVH containing all colliders in the scene"""
+    deferred: bool
+    """When True, new colliders are not inserted into the BVH until flush is called"""
     
     def __init__(self, scene) -> None:
         self.scene = scene
         self.cube = self.scene.engine.cube
-        self.colliders = []
+        self.colliders = Registry()
         self.polytope_data = {}
         self.contact_manifolds: dict[tuple[Collider, Collider] : ContactManifold] = {}
         self.bvh = BroadBVH(self)
+        self.deferred = False
+        self.pending = {}
         
     def add(self, collider: Collider) -> Collider:
         """
         Creates a collider and adds it to the collider list
         """
-        self.colliders.append(collider)
-        self.bvh.add(collider)
+        self.colliders.add(collider)
+        if self.deferred: self.pending[collider] = None
+        else: self.bvh.add(collider)
         return collider
     
     def remove(self, collider: Collider) -> None:
         """
         Removes a collider from the main branch and BVH
         """
-        if collider in self.colliders: self.colliders.remove(collider)
-        self.bvh.remove(collider)
+        if self.colliders.remove(collider):
+            if collider in self.pending: del self.pending[collider]
+            else: self.bvh.remove(collider)
         collider.collider_handler = None
+
+    def defer(self) -> None:
+        """
+        Postpones BVH insertion of new colliders until flush is called
+        """
+        self.deferred = True
+        
+    def flush(self) -> None:
+        """
+        Inserts all colliders added while deferred into the BVH. 
+        Rebuilds the whole tree when the new colliders make up a large part of it
+        """
+        self.deferred = False
+        if not self.pending: return
+        
+        if len(self.pending) * 2 >= len(self.colliders):
+            self.bvh.build(self.colliders.items)
+            for collider in self.colliders: collider.needs_bvh = False
+        else: 
+            for collider in self.pending: self.bvh.add(collider)
+            
+        self.pending = {}
     
     def resolve_collisions(self) -> None:
         """
@@ -1,4 +1,11 @@
 class Config():
     def __init__(self) -> None:
         self.chunk_size = 40
-        self.render_distance = 5
\ No newline at end of file
+        self.render_distance = 5
+        self.chunk_hysteresis = 0.1 # fraction of the chunk size a node may pass a chunk border before it is moved to the next chunk
+        self.instancing = False # draw nodes that share a mesh with one mesh buffer and a per instance buffer instead of copying the mesh for every node
+        self.stream_buffers = 3 # number of buffer regions dynamic chunks rotate through, one per frame. A region is written again only after this many frames, when the GPU has finished drawing from it
+        self.lod_size = 0.25 # fraction of the screen height a mesh must cover to be drawn at full detail. Each following level of detail is used below half the size of the level before
+        self.lod_hysteresis = 0.2 # fraction of a level the screen size must pass a level boundary by before a chunk changes level, so chunks near a boundary are not rebatched every frame
+        self.batch_threads = 2 # number of worker threads that assemble the vertex data of rebatched chunks. The previous batch is drawn until the new data is uploaded. New chunks are always batched on the main thread. 0 batches on the main thread
+        self.light_clusters = (16, 9, 24) # number of clusters point and spot lights are assigned to across the screen width, the screen height and the view depth. Fragments only evaluate the lights of their cluster
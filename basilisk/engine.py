@@ -7,6 +7,7 @@ import glcontext  # For packaging (so it isnt a hidden import)
 from .render.shader_handler import ShaderHandler
 from .render.material_handler import MaterialHandler
 from .render.frame import Frame
+from .render.profiler import Profiler
 from .draw.draw_handler import DrawHandler
 from .config import Config
 from .input_output.mouse import Mouse
@@ -45,8 +46,10 @@ class Engine():
     """List of all keyboard inputs as booleans"""
     previous_keys: list[bool]
     """List of all keyoard inputs from the last frame as booleans"""
+    profiler: Profiler
+    """Measures the GPU time of the render passes. Does nothing unless profiling is enabled"""
 
-    def __init__(self, win_size=(800, 800), title="Basilisk Engine", vsync=None, max_fps=None, grab_mouse=True, headless=False, resizable=True) -> None:
+    def __init__(self, win_size=(800, 800), title="Basilisk Engine", vsync=None, max_fps=None, grab_mouse=True, headless=False, resizable=True, profile=False) -> None:
         """
         Basilisk Engine Class. Sets up the engine enviornment and allows the user to interact with Basilisk
         Args:
@@ -58,6 +61,8 @@ class Engine():
                 Flag for running engine with vsync enabled
             headless: bool
                 Flag for headless rendering
+            profile: bool
+                Flag for measuring the GPU time of each render pass. Results are read from engine.profiler
         """
 
         # Save the window size
@@ -99,6 +104,7 @@ class Engine():
         self.root = os.path.dirname(__file__)
         self.cube = Cube(self)
         self.fbos = []
+        self.profiler = Profiler(self.ctx, enabled=profile)
         
         # Handlers
         self.clock            = Clock(self, max_fps)
@@ -138,7 +144,7 @@ class Engine():
 
         # Render all draw calls from the past frame
         self.frame.use()
-        self.draw_handler.render()
+        with self.profiler.measure('draw'): self.draw_handler.render()
 
         # Clear the screen and render the frame
         self.ctx.screen.use()
@@ -147,6 +153,7 @@ class Engine():
         pg.display.flip()
 
         self.frame.clear()
+        self.profiler.end_frame()
 
 
         # Allow for the engine to take in input again
@@ -9,6 +9,29 @@ def transform_points(points: np.ndarray, model_matrix: glm.mat4x4) -> list[glm.v
     """
     return [model_matrix * pt for pt in points]
 
+def weld_vertices(data: np.ndarray, width: int=None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Merges the rows of the vertex data that are identical in their first width columns, or in all columns if width is None.
+    The remaining columns of merged rows are averaged. Returns the unique vertices in order of first use and the index of each original row in them
+    """
+    width = width if width else data.shape[1]
+    unique, first, inverse = np.unique(data[:, :width], axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    # np.unique sorts the rows, so restore the original order to keep nearby triangles close in memory
+    order = np.argsort(first)
+    remap = np.empty(len(order), dtype='u4')
+    remap[order] = np.arange(len(order), dtype='u4')
+    indices = remap[inverse]
+
+    vertices = np.zeros((len(order), data.shape[1]), dtype=data.dtype)
+    vertices[:, :width] = unique[order]
+    if width < data.shape[1]:
+        np.add.at(vertices[:, width:], indices, data[:, width:])
+        vertices[:, width:] /= np.bincount(indices, minlength=len(order))[:, None]
+
+    return vertices, indices
+
 # bvh
 def get_aabb_surface_area(top_right: glm.vec3, bottom_left: glm.vec3) -> float:
     """
@@ -0,0 +1,95 @@
+class Registry():
+    items: list
+    """Dense list of the registered items. Order is not preserved when items are removed"""
+    handles: dict
+    """Maps each registered item to its handle"""
+    slots: list[int]
+    """Maps each handle to the position of its item in items, -1 for unused handles"""
+    owners: list[int]
+    """Maps each position in items to the handle of the item"""
+
+    def __init__(self) -> None:
+        """
+        Container giving each item a stable integer handle.
+        Items are stored densely and removed by swapping the last item into their place, so add, remove and lookup are O(1).
+        """
+
+        self.items   = []
+        self.handles = {}
+        self.slots   = []
+        self.owners  = []
+        self.free_handles = []
+
+    def add(self, item) -> int:
+        """
+        Adds the item if it is not already registered and returns its handle
+        """
+
+        if item in self.handles: return self.handles[item]
+
+        # Reuse the handles of removed items
+        if self.free_handles: handle = self.free_handles.pop()
+        else:
+            handle = len(self.slots)
+            self.slots.append(-1)
+
+        self.slots[handle] = len(self.items)
+        self.items.append(item)
+        self.owners.append(handle)
+        self.handles[item] = handle
+
+        return handle
+
+    def remove(self, item) -> bool:
+        """
+        Removes the item by swapping the last item into its place. Returns False if the item was not registered
+        """
+
+        handle = self.handles.pop(item, None)
+        if handle is None: return False
+
+        slot = self.slots[handle]
+        last = len(self.items) - 1
+
+        # Move the last item into the removed slot
+        if slot != last:
+            moved = self.owners[last]
+            self.items[slot]  = self.items[last]
+            self.owners[slot] = moved
+            self.slots[moved] = slot
+
+        self.items.pop()
+        self.owners.pop()
+        self.slots[handle] = -1
+        self.free_handles.append(handle)
+
+        return True
+
+    def get(self, handle: int):
+        """
+        Returns the item with the given handle, or None if the handle is not in use
+        """
+
+        if not 0 <= handle < len(self.slots) or self.slots[handle] == -1: return None
+        return self.items[self.slots[handle]]
+
+    def get_handle(self, item) -> int:
+        """
+        Returns the handle of the item, or -1 if it is not registered
+        """
+
+        return self.handles.get(item, -1)
+
+    def clear(self) -> None:
+        """
+        Removes all items and frees all handles
+        """
+
+        self.__init__()
+
+    def __contains__(self, item) -> bool: return item in self.handles
+    def __len__(self) -> int: return len(self.items)
+    def __iter__(self): return iter(self.items)
+    def __getitem__(self, index): return self.items[index]
+    def __bool__(self) -> bool: return bool(self.items)
+    def __repr__(self) -> str: return f'<Basilisk Registry | {len(self.items)} items>'
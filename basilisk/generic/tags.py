@@ -0,0 +1,57 @@
+class Tags(list):
+    callback: ...
+    """Function called with no arguments after the tags are changed in place"""
+
+    def __init__(self, tags=(), callback=None) -> None:
+        """
+        List of the tags of a node. Edits made in place, such as append or remove, call the callback so the node's queries stay indexed
+        """
+
+        super().__init__(tags)
+        self.callback = callback
+
+    def changed(self) -> None:
+        if self.callback: self.callback()
+
+    def append(self, tag: str) -> None:
+        super().append(tag)
+        self.changed()
+
+    def extend(self, tags) -> None:
+        super().extend(tags)
+        self.changed()
+
+    def insert(self, index: int, tag: str) -> None:
+        super().insert(index, tag)
+        self.changed()
+
+    def remove(self, tag: str) -> None:
+        super().remove(tag)
+        self.changed()
+
+    def pop(self, index: int=-1) -> str:
+        tag = super().pop(index)
+        self.changed()
+        return tag
+
+    def clear(self) -> None:
+        super().clear()
+        self.changed()
+
+    def __setitem__(self, index, value) -> None:
+        super().__setitem__(index, value)
+        self.changed()
+
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self.changed()
+
+    def __iadd__(self, tags):
+        self.extend(tags)
+        return self
+
+    def __imul__(self, count: int):
+        super().__imul__(count)
+        self.changed()
+        return self
+
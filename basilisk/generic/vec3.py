@@ -126,7 +126,55 @@ class Vec3(Custom):
         if self.callback and abs(value - self.prev_data.z) > 1e-6: 
             self.prev_data.z = value
             self.callback()
-        
+
+
+class Vec3View(glm.vec3):
+    """
+    A glm.vec3 copy of a Vec3 that can be passed to glm functions. Edits to its components are written back to the Vec3, sending its callback
+    """
+
+    def __new__(cls, target: Vec3):
+        return super().__new__(cls, target.data)
+
+    def __init__(self, target: Vec3):
+        super().__init__(target.data)
+        self.__dict__['target'] = target # glm attribute assignment only accepts vector components
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        self.target.data = glm.vec3(self)
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self.target.data = glm.vec3(self)
+
+    # in place operators change the components without assigning them
+    def __iadd__(self, other):
+        super().__iadd__(other)
+        self.target.data = glm.vec3(self)
+        return self
+
+    def __isub__(self, other):
+        super().__isub__(other)
+        self.target.data = glm.vec3(self)
+        return self
+
+    def __imul__(self, other):
+        super().__imul__(other)
+        self.target.data = glm.vec3(self)
+        return self
+
+    def __itruediv__(self, other):
+        super().__itruediv__(other)
+        self.target.data = glm.vec3(self)
+        return self
+
+    def __repr__(self):
+        return str(glm.vec3(self))
+
+    def __str__(self):
+        return str(glm.vec3(self))
+
 class Node():
     
     def __init__(self, pos):
@@ -1,18 +1,26 @@
 import numpy as np
 import glm
 import os
+import hashlib
 # from pyobjloader import load_model
 from .model import load_model
 from .narrow_bvh import NarrowBVH
 from ..generic.matrices import compute_inertia_moment, compute_inertia_product
-from ..generic.meshes import get_extreme_points_np, moller_trumbore
+from ..generic.meshes import get_extreme_points_np, moller_trumbore, weld_vertices
 from .mesh_from_data import from_data
+from .simplify import simplify, save_lods, load_lods
 import time
 
 
 class Mesh():
     data: np.ndarray
     """The mesh vertex data stored as a 4-byte float numpy array. Format will be [position.xyz, uv.xy, normal.xyz, tangent.xyz, bitangent.xyz]"""
+    vertices: np.ndarray
+    """The unique rows of the vertex data. Rows with identical position/uv/normal are welded into one vertex"""
+    vertex_indices: np.ndarray
+    """Index of each row of data in vertices. Used as the index buffer when rendering"""
+    lods: list[tuple[np.ndarray, np.ndarray]]
+    """Level of detail chain of the mesh as (vertices, vertex_indices) pairs. Level 0 is the full mesh and each level has about half the triangles of the one before"""
     points: np.ndarray
     """All the unique points of the mesh given by the model file"""  
     indices: np.ndarray
@@ -27,10 +35,12 @@ class Mesh():
     """The center of mass of the mesh calculated from the inertia tensor algorithm"""
     half_dimensions: glm.vec3
     """The aligned half dimensions to the untransformed mesh"""
+    radius: float
+    """Radius of the bounding sphere of the untransformed mesh around the geometric center. Used to find the screen size of the mesh when choosing a level of detail"""
     bvh: NarrowBVH
     """BVH for accessing triangle intersections with a line"""
 
-    def __init__(self, data: str | os.PathLike | np.ndarray, custom_format:bool=False) -> None:
+    def __init__(self, data: str | os.PathLike | np.ndarray, custom_format:bool=False, lods: int=0, lod_cache: str | os.PathLike=None) -> None:
         """
         Mesh object containing all the data needed to render an object and perform physics/collisions on it
         Args:
@@ -38,6 +48,10 @@ class Mesh():
                 path to the .obj file of the model or an array of the mesh data
             custom_format: bool
                 makes expected changes to the given data if false. Leaves data as given if true
+            lods: int
+                number of simplified levels of detail to generate on load
+            lod_cache: str
+                directory the generated levels of detail are saved to and loaded from
         """
         
         # Verify the path type
@@ -74,6 +88,16 @@ class Mesh():
         self.hash = hash(str(self.data))
         self.custom = custom_format
 
+        # Indexed vertex data for rendering. Vertices with the same position, uv and normal are welded and their tangents are averaged
+        if custom_format: self.vertices, self.vertex_indices = weld_vertices(self.data)
+        else:
+            self.vertices, self.vertex_indices = weld_vertices(self.data, 8)
+            for columns in (slice(8, 11), slice(11, 14)):
+                length = np.linalg.norm(self.vertices[:, columns], axis=1, keepdims=True)
+                first = self.data[np.unique(self.vertex_indices, return_index=True)[1], columns]
+                self.vertices[:, columns] = np.where(length > 1e-6, self.vertices[:, columns] / np.maximum(length, 1e-6), first)
+        self.lods = [(self.vertices, self.vertex_indices)]
+
         # generate edges from faces
         edges = [set() for _ in range(len(self.points))]
         for face in self.indices:
@@ -89,6 +113,7 @@ class Mesh():
         maximum, minimum = get_extreme_points_np(self.points)
         self.geometric_center = (glm.vec3(maximum) + glm.vec3(minimum)) / 2
         self.half_dimensions  = maximum - self.geometric_center
+        self.radius = float(np.max(np.linalg.norm(self.points - np.array(self.geometric_center), axis=1)))
         
         # volume and center of mass
         self.volume = 0
@@ -103,6 +128,56 @@ class Mesh():
         
         # data structrues
         self.bvh = NarrowBVH(self)
+
+        if lods: self.generate_lods(lods, cache=lod_cache)
+
+    def generate_lods(self, count: int=3, ratio: float=0.5, max_error: float=0.05, cache: str | os.PathLike=None) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Generates the level of detail chain of the mesh by simplifying each level into the next with quadric edge collapses.
+        Args:
+            count: int
+                number of simplified levels after the full mesh. The chain stops early once a level can not be reduced further within max_error
+            ratio: float
+                fraction of the triangles of the previous level kept in each level
+            max_error: float
+                largest distance the surface may move in a single level, as a fraction of the mesh radius
+            cache: str
+                directory to save the chain to. A chain saved for the same mesh and arguments is loaded instead of generated
+        """
+
+        if self.custom: raise ValueError('Mesh: levels of detail can not be generated for meshes with a custom format')
+        if not 0 < ratio < 1: raise ValueError(f'Mesh: Invalid level of detail ratio {ratio}. Expected a value between 0 and 1')
+
+        self.lods = [(self.vertices, self.vertex_indices)]
+
+        # The cache file is named by the contents of the mesh so edited models are not loaded from an old file
+        path = None
+        if cache:
+            key = hashlib.sha1(self.vertices.tobytes() + self.vertex_indices.tobytes() + str((count, ratio, max_error)).encode()).hexdigest()
+            path = os.path.join(cache, f'{key}.npz')
+            if os.path.exists(path):
+                self.lods += load_lods(path)
+                return self.lods
+
+        vertices, indices = self.vertices, self.vertex_indices
+        for _ in range(count):
+            vertices, indices = simplify(vertices, indices, int(len(indices) // 3 * ratio), max_error)
+            # Levels that barely reduce the previous level are not worth drawing, and the levels after them would be limited by the same error
+            if len(indices) > len(self.lods[-1][1]) * (1 + ratio) / 2: break
+            self.lods.append((vertices, indices))
+
+        if path:
+            os.makedirs(cache, exist_ok=True)
+            save_lods(path, self.lods[1:])
+
+        return self.lods
+
+    def get_lod(self, lod: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Gets the vertices and indices of the given level of detail, or of the last level if the mesh has fewer levels
+        """
+
+        return self.lods[min(lod, len(self.lods) - 1)]
         
     def get_inertia_tensor(self, scale: glm.vec3) -> glm.mat3x3:
         """
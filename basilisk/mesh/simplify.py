@@ -0,0 +1,186 @@
+import numpy as np
+
+
+def simplify(vertices: np.ndarray, indices: np.ndarray, target: int, max_error: float=0.05, boundary_weight: float=10.0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reduces an indexed mesh to at most target triangles with quadric error metric edge collapses.
+    Positions are read from the first three columns of the vertices. Each collapse moves a vertex onto a neighbouring vertex,
+    so the remaining vertices keep their original attributes and no attribute interpolation is needed.
+    Collapses are applied in passes of independent edges, cheapest first, so the whole simplification runs on numpy arrays.
+    Returns the remaining vertices and indices. Stops early if no edge can be collapsed without flipping a triangle
+    or moving the surface further than max_error, given as a fraction of the radius of the mesh
+    """
+
+    triangles = indices.reshape(-1, 3).astype('i8')
+
+    # Vertices that share a position collapse together so the mesh does not tear along uv and normal seams
+    positions, vertex_positions = np.unique(vertices[:, :3], axis=0, return_inverse=True)
+    vertex_positions = vertex_positions.reshape(-1).astype('i8')
+    positions = positions.astype('f8')
+    homogeneous = np.hstack([positions, np.ones((len(positions), 1))])
+
+    quadrics = get_quadrics(positions, vertex_positions[triangles], boundary_weight)
+    radius = np.linalg.norm(np.ptp(positions, axis=0)) / 2
+    max_cost = (max_error * radius) ** 2
+    triangles = remove_degenerate(triangles, vertex_positions)
+    blocked = np.zeros(0, dtype='i8')
+
+    while len(triangles) > target:
+        corners = vertex_positions[triangles]
+        moves, flipped = get_collapses(homogeneous, quadrics, corners, len(triangles) - target, max_cost, blocked)
+        # Collapses that flipped a triangle are not tried again, so the next pass can choose other collapses around them
+        blocked = np.union1d(blocked, flipped)
+        if not np.any(moves >= 0):
+            if len(flipped): continue
+            break
+
+        # Vertices of a collapsed position take the attributes of an adjacent vertex at the target position if there is one.
+        # Otherwise they keep their attributes and only move to the target position
+        edges = np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]], triangles[:, [1, 0]], triangles[:, [2, 1]], triangles[:, [0, 2]]])
+        edges = edges[moves[vertex_positions[edges[:, 0]]] == vertex_positions[edges[:, 1]]]
+        sources, first = np.unique(edges[:, 0], return_index=True)
+
+        remap = np.arange(len(vertices))
+        remap[sources] = edges[first, 1]
+        collapsed = np.flatnonzero(moves >= 0)
+        moved = moves[vertex_positions] >= 0
+        vertex_positions[moved] = moves[vertex_positions[moved]]
+
+        quadrics[moves[collapsed]] += quadrics[collapsed]
+        triangles = remove_degenerate(remap[triangles], vertex_positions)
+
+    # Compact the vertices that are still used by a triangle
+    used, triangles = np.unique(triangles, return_inverse=True)
+    simplified = vertices[used].copy()
+    simplified[:, :3] = positions[vertex_positions[used]]
+
+    return simplified, triangles.reshape(-1).astype('u4')
+
+def get_quadrics(positions: np.ndarray, corners: np.ndarray, boundary_weight: float) -> np.ndarray:
+    """
+    Computes the (n, 4, 4) error quadric of each position from the planes of its triangles, weighted by triangle area relative to the mean area.
+    Weights are at least one, so the error of a collapse is never less than its squared distance to any of the planes and max_error bounds the distance.
+    Edges used by a single triangle add a plane perpendicular to the triangle so open borders keep their shape
+    """
+
+    a, b, c = positions[corners[:, 0]], positions[corners[:, 1]], positions[corners[:, 2]]
+    normals = np.cross(b - a, c - a)
+    areas = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = normals / np.maximum(areas, 1e-12)
+    mean_area = max(np.mean(areas), 1e-12)
+
+    planes = np.hstack([normals, -np.sum(normals * a, axis=1, keepdims=True)])
+    face_quadrics = planes[:, :, None] * planes[:, None, :] * np.maximum(areas[:, :, None] / mean_area, 1)
+
+    quadrics = np.zeros((len(positions), 4, 4))
+    for i in range(3): np.add.at(quadrics, corners[:, i], face_quadrics)
+
+    # Border edges appear in exactly one triangle
+    edges = np.concatenate([corners[:, [0, 1]], corners[:, [1, 2]], corners[:, [2, 0]]])
+    faces = np.tile(np.arange(len(corners)), 3)
+    keys, inverse, counts = np.unique(np.sort(edges, axis=1), axis=0, return_inverse=True, return_counts=True)
+    border = counts[inverse.reshape(-1)] == 1
+    edges, faces = edges[border], faces[border]
+    if not len(edges): return quadrics
+
+    start, end = positions[edges[:, 0]], positions[edges[:, 1]]
+    directions = end - start
+    lengths = np.linalg.norm(directions, axis=1, keepdims=True)
+    border_normals = np.cross(directions, normals[faces])
+    border_normals /= np.maximum(np.linalg.norm(border_normals, axis=1, keepdims=True), 1e-12)
+
+    planes = np.hstack([border_normals, -np.sum(border_normals * start, axis=1, keepdims=True)])
+    border_quadrics = planes[:, :, None] * planes[:, None, :] * (lengths[:, :, None] ** 2 / mean_area * boundary_weight)
+    for i in range(2): np.add.at(quadrics, edges[:, i], border_quadrics)
+
+    return quadrics
+
+def get_collapses(homogeneous: np.ndarray, quadrics: np.ndarray, corners: np.ndarray, excess: int, max_cost: float, blocked: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Chooses a set of edge collapses for one pass, skipping the blocked edges given as source * n + target.
+    Returns the target position of each collapsed position, or -1 if it is kept, and the edges cancelled because they would flip a triangle.
+    A collapse is only chosen if it is the cheapest collapse touching any triangle around it,
+    so no two collapses in a pass move corners of the same triangle
+    """
+
+    n = len(homogeneous)
+
+    # Every directed edge is a candidate collapse of its first position onto its second
+    edges = np.concatenate([corners[:, [0, 1]], corners[:, [1, 2]], corners[:, [2, 0]], corners[:, [1, 0]], corners[:, [2, 1]], corners[:, [0, 2]]])
+    edges = np.setdiff1d(np.unique(edges[:, 0] * n + edges[:, 1]), blocked, assume_unique=True)
+    sources, targets = edges // n, edges % n
+
+    # Error of moving the source onto the target with the combined quadric of both positions
+    points = homogeneous[targets]
+    costs = np.einsum('ni,nij,nj->n', points, quadrics[sources] + quadrics[targets], points)
+    allowed = costs <= max_cost
+    sources, targets, costs = sources[allowed], targets[allowed], costs[allowed]
+    moves = np.full(n, -1, dtype='i8')
+    if not len(costs): return moves, np.zeros(0, dtype='i8')
+    ranks = np.empty(len(costs), dtype='i8')
+    ranks[np.argsort(costs, kind='stable')] = np.arange(len(costs))
+
+    # Smallest rank touching each position, then each triangle, then the triangles around each position
+    lowest = np.full(n, len(costs), dtype='i8')
+    np.minimum.at(lowest, sources, ranks)
+    np.minimum.at(lowest, targets, ranks)
+    triangle_lowest = lowest[corners].min(axis=1)
+    neighbourhood = np.full(n, len(costs), dtype='i8')
+    np.minimum.at(neighbourhood, corners.reshape(-1), np.repeat(triangle_lowest, 3))
+
+    chosen = np.flatnonzero(ranks == neighbourhood[sources])
+    # Each collapse removes up to two triangles
+    chosen = chosen[np.argsort(ranks[chosen])][:max(1, (excess + 1) // 2)]
+
+    moves[sources[chosen]] = targets[chosen]
+
+    # Cancel collapses that would flip a triangle. Triangles containing both ends of an edge are removed instead
+    moved = moves[corners]
+    new_corners = np.where(moved >= 0, moved, corners)
+    changed = np.any(moved >= 0, axis=1) & (new_corners[:, 0] != new_corners[:, 1]) & (new_corners[:, 1] != new_corners[:, 2]) & (new_corners[:, 2] != new_corners[:, 0])
+
+    old_normals = get_normals(homogeneous, corners[changed])
+    new_normals = get_normals(homogeneous, new_corners[changed])
+    flipped = np.sum(old_normals * new_normals, axis=1) <= 0.2 * np.linalg.norm(old_normals, axis=1) * np.linalg.norm(new_normals, axis=1)
+
+    flipped_corners = corners[changed][flipped]
+    flipped_sources = np.unique(flipped_corners[moved[changed][flipped] >= 0])
+    flipped_edges = flipped_sources * n + moves[flipped_sources]
+    moves[flipped_sources] = -1
+
+    return moves, flipped_edges
+
+def get_normals(homogeneous: np.ndarray, corners: np.ndarray) -> np.ndarray:
+    """
+    Gets the unnormalized normals of the given triangles
+    """
+
+    a, b, c = homogeneous[corners[:, 0], :3], homogeneous[corners[:, 1], :3], homogeneous[corners[:, 2], :3]
+    return np.cross(b - a, c - a)
+
+def remove_degenerate(triangles: np.ndarray, vertex_positions: np.ndarray) -> np.ndarray:
+    """
+    Removes triangles with two corners at the same position
+    """
+
+    corners = vertex_positions[triangles]
+    return triangles[(corners[:, 0] != corners[:, 1]) & (corners[:, 1] != corners[:, 2]) & (corners[:, 2] != corners[:, 0])]
+
+def save_lods(path: str, lods: list[tuple[np.ndarray, np.ndarray]]) -> None:
+    """
+    Saves a level of detail chain to a .npz file
+    """
+
+    arrays = {}
+    for i, (vertices, indices) in enumerate(lods):
+        arrays[f'vertices_{i}'] = vertices
+        arrays[f'indices_{i}']  = indices
+    np.savez(path, **arrays)
+
+def load_lods(path: str) -> list[tuple[np.ndarray, np.ndarray]]:
+    """
+    Loads a level of detail chain saved with save_lods
+    """
+
+    with np.load(path) as file:
+        return [(file[f'vertices_{i}'], file[f'indices_{i}']) for i in range(len(file.files) // 2)]
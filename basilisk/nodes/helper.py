@@ -1,29 +1,85 @@
 import glm
+import numpy as np
 # from .node import Node
 from ..mesh.mesh import Mesh
 from ..render.material import Material
+from ..render.packing import pack_vertices
+from .transform_store import rotate_inverse
 
 def node_is(node, position: glm.vec3=None, scale: glm.vec3=None, rotation: glm.quat=None, forward: glm.vec3=None, mesh: Mesh=None, material: Material=None, velocity: glm.vec3=None, rotational_velocity: glm.quat=None, physics: bool=None, mass: float=None, collisions: bool=None, static_friction: float=None, kinetic_friction: float=None, elasticity: float=None, collision_group: float=None, name: str=None, tags: list[str]=None,static: bool=None) -> bool:
     """
     Determine if a node meets the requirements given by the parameters. If a parameter is None, then the filter is not applied.
+    Stops at the first requirement that is not met.
     """
-    return all([
-            position is None or position == node.position,
-            scale    is None or scale    == node.scale,
-            rotation is None or rotation == node.rotation,
-            forward  is None or forward  == node.forward,
-            mesh     is None or mesh     == node.mesh,
-            material is None or material == node.material,
-            velocity is None or velocity == node.velocity,
-            rotational_velocity is None or rotational_velocity == node.rotational_velocity,
-            physics    is None or bool(node.physics_body) == physics,
-            mass       is None or (node.physics_body and mass == node.physics_body.mass),
-            collisions is None or bool(node.collider) == collisions,
-            static_friction  is None or (node.collider and node.collider.static_friction  == static_friction),
-            kinetic_friction is None or (node.collider and node.collider.kinetic_friction == kinetic_friction),
-            elasticity       is None or (node.collider and node.collider.elasticity       == elasticity),
-            collision_group  is None or (node.collider and node.collider.collision_group  == collision_group),
-            name   is None or node.name == name,
-            tags   is None or all([tag in node.tags for tag in tags]),
-            static is None or node.static == static
-        ])
\ No newline at end of file
+    return (
+            (name     is None or node.name == name) and
+            (tags     is None or all(tag in node.tags for tag in tags)) and
+            (mesh     is None or mesh     == node.mesh) and
+            (material is None or material == node.material) and
+            (physics    is None or bool(node.physics_body) == physics) and
+            (collisions is None or bool(node.collider) == collisions) and
+            (position is None or position == node.position) and
+            (scale    is None or scale    == node.scale) and
+            (rotation is None or rotation == node.rotation) and
+            (forward  is None or forward  == node.forward) and
+            (velocity is None or velocity == node.velocity) and
+            (rotational_velocity is None or rotational_velocity == node.rotational_velocity) and
+            (mass       is None or bool(node.physics_body and mass == node.physics_body.mass)) and
+            (static_friction  is None or bool(node.collider and node.collider.static_friction  == static_friction)) and
+            (kinetic_friction is None or bool(node.collider and node.collider.kinetic_friction == kinetic_friction)) and
+            (elasticity       is None or bool(node.collider and node.collider.elasticity       == elasticity)) and
+            (collision_group  is None or bool(node.collider and node.collider.collision_group  == collision_group)) and
+            (static is None or node.static == static)
+        )
+
+def get_batch_data(mesh: Mesh, position, rotation, scale, material: Material | list, shader=None, lod: int=0) -> np.ndarray:
+    """
+    Gets the per vertex batch data of a mesh with the given transform and material for chunk batching at the given level of detail.
+    Shaders with packed attributes get the data as an (n, stride) byte array in their vertex format
+    """
+    
+    per_vertex_mtl = isinstance(material, list)
+
+    # Get data from the mesh node. Per vertex materials are given for every triangle corner, so they use the unwelded full detail vertices
+    mesh_data = mesh.data if per_vertex_mtl else mesh.get_lod(lod)[0]
+    node_data = np.array([*position, *rotation, *scale, 0])
+
+    if not per_vertex_mtl: node_data[-1] = material.index
+
+    # Create an array to hold the node's data
+    width = 25 if not mesh.custom else 11 + mesh_data.shape[1]
+    data = np.zeros(shape=(mesh_data.shape[0], width), dtype='f4')
+
+
+    data[:,:mesh_data.shape[1]] = mesh_data
+    data[:,mesh_data.shape[1]:] = node_data
+
+    if per_vertex_mtl: data[:,-1] = material
+
+    if shader and not mesh.custom and shader.packed: data = pack_vertices(data, shader.attributes, shader.fmt.split())
+    elif shader and not mesh.custom: data = np.take(data, shader.attribute_indices, axis=1)
+
+    return data
+
+def get_instance_data(position, rotation, scale, material: Material) -> np.ndarray:
+    """
+    Gets the per instance data of a node for instanced rendering. Contains the position, rotation, scale and material index
+    """
+    
+    return np.array([*position, *rotation, *scale, material.index], dtype='f4')
+
+def get_bounds(nodes: list) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Gets the world space axis aligned bounding boxes of the meshes of the given nodes. Returns (n, 3) arrays of the minimums and maximums
+    """
+
+    transforms = np.array([(*node.position, *node.rotation, *node.scale) for node in nodes], dtype='f4')
+    positions, rotations, scales = transforms[:, :3], transforms[:, 3:7], transforms[:, 7:]
+    centers = np.array([node.mesh.geometric_center for node in nodes], dtype='f4')
+    halves  = np.abs(scales) * np.array([node.mesh.half_dimensions for node in nodes], dtype='f4')
+
+    # The box of the rotated mesh box is the sum of its rotated half axes
+    centers = rotate_inverse(rotations, scales * centers) + positions
+    extents = sum(np.abs(rotate_inverse(rotations, halves * axis)) for axis in np.eye(3, dtype='f4'))
+
+    return centers - extents, centers + extents
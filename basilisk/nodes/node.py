@@ -1,8 +1,10 @@
+import warnings
 import glm
 import numpy as np
-from .helper import node_is
-from ..generic.vec3 import Vec3
+from .helper import node_is, get_batch_data, get_instance_data
+from ..generic.vec3 import Vec3, Vec3View
 from ..generic.quat import Quat
+from ..generic.tags import Tags
 from ..generic.matrices import get_model_matrix
 from ..mesh.mesh import Mesh
 from ..render.material import Material
@@ -10,6 +12,7 @@ from ..physics.physics_body import PhysicsBody
 from ..collisions.collider import Collider
 from ..render.chunk import Chunk
 from ..render.shader import Shader
+from .transform_store import DIRTY_POSITION, DIRTY_ROTATION, DIRTY_SCALE, DIRTY_RELATIVE
 
 
 class Node():
@@ -32,9 +35,9 @@ class Node():
     material: Material
     """The mesh of the node stored as a basilisk material object"""
     velocity: glm.vec3
-    """The translational velocity of the node"""
+    """The translational velocity of the node. Edits to its components are written back to the node like position"""
     rotational_velocity: glm.vec3
-    """The rotational velocity of the node"""
+    """The rotational velocity of the node. Edits to its components are written back to the node like position"""
     physics: bool
     """Allows the node's movement to be affected by the physics engine and collisions"""
     mass: float
@@ -53,16 +56,24 @@ class Node():
     """Nodes of the same collision group do not collide with each other"""
     name: str
     """The name of the node for reference"""  
-    tags: list[str]
-    """Tags are used to sort nodes into separate groups"""
+    tags: Tags
+    """Tags are used to sort nodes into separate groups. Edits made in place, such as tags.append, keep the node's queries indexed"""
     static: bool
     """Objects that don't move should be marked as static"""
+    occluder: bool
+    """Large opaque objects like walls and terrain should be marked as occluders. Chunks hidden behind occluders are not drawn"""
     chunk: Chunk
     """The parent chunk of the node. Used for callbacks to update chunk meshes"""
     children: list
     """List of nodes that this node is a parent of"""
     shader: Shader
     """Shader that is used to render the node. If none is given, engine default will be used"""
+    transform_store: ...
+    """The transform store of the node handler containing this node. None if the node is not in a scene"""
+    transform_index: int
+    """Row of this node in the transform store. -1 if the node is not in a scene"""
+    handle: int
+    """Stable integer handle of the node in its node handler. -1 if the node is not in a scene"""
 
     def __init__(self,
             position:            glm.vec3=None, 
@@ -87,7 +98,8 @@ class Node():
             name:                str='', 
             tags:                list[str]=None,
             static:              bool=None,
-            shader:              Shader=None
+            shader:              Shader=None,
+            occluder:            bool=False
         ) -> None:
         """
         Basilisk node object. 
@@ -101,10 +113,16 @@ class Node():
         self.engine       = None
         self.chunk        = None
         self.parent       = None
+
+        # row in the node handler's transform store
+        self.transform_store = None
+        self.transform_index = -1
+        self.handle = -1
         
         # lazy update variables
         self.needs_geometric_center = True # pos
         self.needs_model_matrix = True # pos, scale, rot
+        self._is_static = None # physics, velocity, rotational velocity, parent, static
 
         # node data
         self.internal_position: Vec3 = Vec3(position) if position else Vec3(0, 0, 0)
@@ -119,11 +137,15 @@ class Node():
         self.forward  = forward  if forward  else glm.vec3(1, 0, 0)
         self.mesh     = mesh
         self._mtl_list = material if isinstance(material, list) else [material]
+        self._material = None
         self.material = material if material else None
+        self._velocity = Vec3(0, 0, 0, callback=self.velocity_callback)
+        self._rotational_velocity = Vec3(0, 0, 0, callback=self.rotational_velocity_callback)
         self.velocity = velocity if velocity else glm.vec3(0, 0, 0)
         self.rotational_velocity = rotational_velocity if rotational_velocity else glm.vec3(0, 0, 0)
         
         self._static = static
+        self._occluder = occluder
 
         # Physics updates
         if physics: self.physics_body = PhysicsBody(mass = mass if mass else 1.0)
@@ -152,48 +174,92 @@ class Node():
         self.tags = tags if tags else []
 
         self.data_index = 0
+        self.data_length = 0
         self.children = []
 
         # Shader given by user or none for default
         self.shader = shader
 
-        # callback function to be added to the custom Vec3 and Quat classes
-        def position_callback():
-            if self.chunk:
-                self.chunk.node_update_callback(self)
-            
-            # update variables
-            self.needs_geometric_center = True
-            self.needs_model_matrix = True
-            if self.collider:
-                self.collider.needs_bvh = True
-                self.collider.needs_obb = True
-            
-        def scale_callback():
-            if self.chunk:
-                self.chunk.node_update_callback(self)
-            
-            # update variables
-            self.needs_model_matrix = True
-            if self.collider:
-                self.collider.needs_bvh = True
-                self.collider.needs_obb = True
-                self.collider.needs_half_dimensions = True
-            
-        def rotation_callback():
-            if self.chunk:
-                self.chunk.node_update_callback(self)
+        # callback functions to be added to the custom Vec3 and Quat classes
+        self.internal_position.callback = self.position_callback
+        self.internal_scale.callback    = self.scale_callback
+        self.internal_rotation.callback = self.rotation_callback
+
+    def position_callback(self) -> None:
+        if self.transform_store: self.transform_store.push(self, DIRTY_POSITION)
+        self.transform_callback(DIRTY_POSITION)
+
+    def scale_callback(self) -> None:
+        if self.transform_store: self.transform_store.push(self, DIRTY_SCALE)
+        self.transform_callback(DIRTY_SCALE)
+
+    def rotation_callback(self) -> None:
+        if self.transform_store: self.transform_store.push(self, DIRTY_ROTATION)
+        self.transform_callback(DIRTY_ROTATION)
+
+    def tags_callback(self) -> None:
+        if self.node_handler: self.node_handler.node_index.update(self)
+
+    def velocity_callback(self) -> None:
+        self.motion_callback(self._velocity, self.transform_store.velocities if self.transform_store else None)
+
+    def rotational_velocity_callback(self) -> None:
+        self.motion_callback(self._rotational_velocity, self.transform_store.rotational_velocities if self.transform_store else None)
+
+    def motion_callback(self, value: Vec3, column: np.ndarray | None) -> None:
+        """
+        Internal function to write a changed velocity to the node's row in the transform store and update the node if it started or stopped moving
+        """
+        if column is None:
+            self.update_static()
+            return
+
+        moving = bool(column[self.transform_index].any())
+        column[self.transform_index] = value.data
+        if self._is_static is not None and any(value.data) != moving: self.update_static()
+
+    def get_motion(self, value: Vec3, column: np.ndarray | None) -> Vec3:
+        """
+        Internal function to pull a velocity from the node's row in the transform store, where the batched integration updates it, without sending a callback
+        """
+        if column is not None:
+            value._data     = glm.vec3(column[self.transform_index])
+            value.prev_data = glm.vec3(value._data)
+        return value
+
+    def transform_callback(self, flags: int) -> None:
+        """
+        Internal function to update the chunk and the lazy variables after the transform of the node changes
+        """
+        if self.chunk:
+            self.chunk.node_update_callback(self)
+        
+        # update variables
+        self.needs_geometric_center = True
+        self.needs_model_matrix = True
+        if self.collider:
+            self.collider.needs_bvh = True
+            self.collider.needs_obb = True
+            if flags & (DIRTY_SCALE | DIRTY_ROTATION): self.collider.needs_half_dimensions = True
+
+    def sync_transform(self, flags: int) -> None:
+        """
+        Internal function to pull the node's transform from its row in the transform store after a bulk write.
+        Sends a single update for all changed components.
+        """
+        store, row = self.transform_store, self.transform_index
+        
+        if flags & DIRTY_POSITION:
+            self.internal_position._data     = glm.vec3(store.positions[row])
+            self.internal_position.prev_data = glm.vec3(store.positions[row])
+        if flags & DIRTY_ROTATION:
+            self.internal_rotation._data     = glm.quat(store.rotations[row])
+            self.internal_rotation.prev_data = glm.quat(store.rotations[row])
+        if flags & DIRTY_SCALE:
+            self.internal_scale._data     = glm.vec3(store.scales[row])
+            self.internal_scale.prev_data = glm.vec3(store.scales[row])
             
-            # update variables
-            self.needs_model_matrix = True
-            if self.collider:
-                self.collider.needs_bvh = True
-                self.collider.needs_obb = True
-                self.collider.needs_half_dimensions = True
-        
-        self.internal_position.callback = position_callback
-        self.internal_scale.callback    = scale_callback
-        self.internal_rotation.callback = rotation_callback
+        self.transform_callback(flags)
     
     def init_scene(self, scene: ...) -> None:
         """
@@ -215,8 +281,16 @@ class Node():
 
     def update(self, dt: float) -> None:
         """
-        Updates the node's movement variables based on the delta time
+        Updates the node's movement variables based on the delta time and updates its children.
+        Deprecated, scenes integrate all nodes through the transform store every frame
         """
+        warnings.warn('Node.update is deprecated. Nodes are integrated by their scene every frame', DeprecationWarning, stacklevel=2)
+
+        # Integrate the node's row and update its children through the store
+        if self.transform_store:
+            self.transform_store.sync(*self.transform_store.integrate(dt, self.scene.physics_engine, np.array([self.transform_index])))
+            return
+
         # update based on physical properties
         if any(self.velocity): self.position += dt * self.velocity
         if any(self.rotational_velocity): self.rotation = glm.normalize(self.rotation.data - dt / 2 * self.rotation.data * glm.quat(0, *self.rotational_velocity))
@@ -224,62 +298,118 @@ class Node():
         if self.physics_body:
             self.velocity += self.physics_body.get_delta_velocity(dt)
             self.rotational_velocity += self.physics_body.get_delta_rotational_velocity(dt)
-            
+
         # update children transforms
-        for child in self.children: child.sync_data()
-        
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            for child in self.children: child.sync_data()
+
     def sync_data(self) -> None:
         """
-        Syncronizes this node with the parent node based on its relative positioning
+        Syncronizes this node with the parent node based on its relative positioning.
+        Deprecated, scenes propagate parent transforms to their children through the transform store every frame
         """
+        warnings.warn('Node.sync_data is deprecated. Children are synchronized by their scene every frame', DeprecationWarning, stacklevel=2)
+
+        # Recompute the node's row and its subtree through the store
+        if self.transform_store:
+            if self.parent: self.transform_store.dirty[self.transform_index] |= DIRTY_RELATIVE
+            self.transform_store.sync(np.zeros(0, dtype='i4'), np.zeros(0, dtype='u1'))
+            return
+
         # calculate transform matrix with the given input
         transform = glm.mat4x4()
         if self.relative_position: transform  = glm.translate(transform, self.parent.position.data)
         if self.relative_rotation: transform *= glm.transpose(glm.mat4_cast(self.parent.rotation.data))
         if self.relative_scale:    transform  = glm.scale(transform, self.parent.scale.data)
-        
+
         # set this node's transforms based on the parent
-        self.position = transform * self.relative_position
-        self.scale = self.relative_scale * self.parent.scale.data
-        self.rotation = self.relative_rotation * self.parent.rotation.data
-        
-        for child in self.children: child.sync_data()
-        
+        if self.relative_position: self.position = transform * self.relative_position
+        if self.relative_scale:    self.scale    = self.relative_scale * self.parent.scale.data
+        if self.relative_rotation: self.rotation = self.relative_rotation * self.parent.rotation.data
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            for child in self.children: child.sync_data()
+
     def deep_copy(self) -> ...:
         """
         Creates a deep copy of this node and returns it. The new node is not added to the scene.
         """
         
-        copy = Node(
-            position = self.position,
-            scale = self.scale,
-            rotation = self.rotation,
-            relative_position = bool(self.relative_position),
-            relative_scale = bool(self.relative_scale),
-            relative_rotation = bool(self.relative_rotation),
-            forward = glm.vec3(self.forward),
-            mesh = self.mesh,
-            material = self.material,
-            velocity = glm.vec3(self.velocity),
-            rotational_velocity = glm.vec3(self.rotational_velocity),
-            physics = bool(self.physics_body),
-            mass = self.mass if self.physics_body else None,
-            collision = bool(self.collider),
-            static_friction = self.static_friction if self.collider else None,
-            kinetic_friction = self.kinetic_friction if self.collider else None,
-            elasticity = self.elasticity if self.collider else None,
-            collision_group = self.collision_group if self.collider else None,
-            name = self.name,
-            tags = [tag for tag in self.tags], # deep copy tags list
-            static = self.static,
-            shader = self.shader
-        )
+        return self.clone()
+    
+    def clone(self, children: bool=False) -> ...:
+        """
+        Creates a copy of this node without running the constructor or its validation. The new node is not added to the scene.
+        Meshes, materials, shaders and collider meshes are shared with this node. Children are copied too if children is True
+        """
+        
+        copy = Node.__new__(Node)
+        copy.__dict__.update(self.__dict__)
+        
+        # parents
+        copy.node_handler = None
+        copy.scene        = None
+        copy.engine       = None
+        copy.chunk        = None
+        copy.parent       = None
+        
+        # row in the node handler's transform store
+        copy.transform_store = None
+        copy.transform_index = -1
+        copy.handle = -1
+        
+        # lazy update variables
+        copy.needs_geometric_center = True
+        copy.needs_model_matrix = True
+        copy._is_static = None
+        
+        # mutable node data
+        copy.internal_position = copy_custom(self.internal_position, copy.position_callback)
+        copy.internal_scale    = copy_custom(self.internal_scale,    copy.scale_callback)
+        copy.internal_rotation = copy_custom(self.internal_rotation, copy.rotation_callback)
+        if self._relative_position is not None: copy._relative_position = glm.vec3(self._relative_position)
+        if self._relative_scale    is not None: copy._relative_scale    = glm.vec3(self._relative_scale)
+        if self._relative_rotation is not None: copy._relative_rotation = glm.quat(self._relative_rotation)
+        copy._forward  = glm.vec3(self._forward)
+        copy._velocity = copy_custom(Vec3(self.velocity), copy.velocity_callback)
+        copy._rotational_velocity = copy_custom(Vec3(self.rotational_velocity), copy.rotational_velocity_callback)
+        copy._mtl_list = list(self._mtl_list)
+        if isinstance(self._material, list): copy._material = list(self._material)
+        copy._tags = Tags(self._tags, callback=copy.tags_callback)
+        
+        # physics and collider
+        if self.physics_body: copy.physics_body = PhysicsBody(self.physics_body.mass)
+        if self.collider: 
+            copy.collider = Collider(copy, self.collider.mesh, collision_group=self.collider.collision_group)
+            copy.collider.static_friction  = self.collider.static_friction
+            copy.collider.kinetic_friction = self.collider.kinetic_friction
+            copy.collider.elasticity       = self.collider.elasticity
+        
+        copy.data_index = 0
+        copy.data_length = 0
+        copy.children = []
+        
+        # copy the hierarchy, keeping the relative transforms of the children
+        if children:
+            for child in self.children:
+                child_copy = child.clone(children=True)
+                child_copy.parent = copy
+                copy.children.append(child_copy)
         
         return copy
     
     def get_all(self, position: glm.vec3=None, scale: glm.vec3=None, rotation: glm.quat=None, forward: glm.vec3=None, mesh: Mesh=None, material: Material=None, velocity: glm.vec3=None, rotational_velocity: glm.quat=None, physics: bool=None, mass: float=None, collisions: bool=None, static_friction: float=None, kinetic_friction: float=None, elasticity: float=None, collision_group: float=None, name: str=None, tags: list[str]=None,static: bool=None) -> list:
-        nodes = [self] if node_is(self, position, scale, rotation, forward, mesh, material, velocity, rotational_velocity, physics, mass, collisions, static_friction, kinetic_friction, elasticity, collision_group, name, tags, static) else []
-        for node in self.children: nodes += node.get_all(position, scale, rotation, forward, mesh, material, velocity, rotational_velocity, physics, mass, collisions, static_friction, kinetic_friction, elasticity, collision_group, name, tags, static)
+        """
+        Returns this node and all of its descendants with the given traits. Parents are always listed before their children
+        """
+        nodes = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node_is(node, position, scale, rotation, forward, mesh, material, velocity, rotational_velocity, physics, mass, collisions, static_friction, kinetic_friction, elasticity, collision_group, name, tags, static): nodes.append(node)
+            stack.extend(reversed(node.children))
         return nodes
         
     # tree functions for managing children 
@@ -295,9 +425,11 @@ class Node():
         if relative_rotation or (relative_rotation is None and child.relative_rotation): child.relative_rotation = child.rotation.data * glm.inverse(self.rotation.data)
         
         # add as a child to by synchronized and controlled
-        if self.node_handler: self.node_handler.add(child)
         child.parent = self
         self.children.append(child)
+        child.update_static()
+        if self.node_handler: self.node_handler.add(child)
+        if child.transform_store: child.transform_store.link(child)
         
     def remove(self, child: ...) -> None:
         """
@@ -307,7 +439,23 @@ class Node():
             if self.node_handler: self.node_handler.remove(child)
             child.parent = None
             self.children.remove(child)
+            child.update_static()
+            if child.transform_store: child.transform_store.link(child)
         
+    def update_static(self) -> None:
+        """
+        Invalidates the cached static state after the node's velocity, physics, parent or static override changed.
+        If the state flipped, the node moves between static and dynamic chunks and its children are updated
+        """
+        previous = self._is_static
+        self._is_static = None
+        if previous is None or previous == self.static: return
+        
+        if self.node_handler:
+            self.node_handler.node_index.update(self)
+            self.node_handler.chunk_handler.update_static(self)
+        for child in self.children: child.update_static()
+
     def apply_force(self, force: glm.vec3, dt: float) -> None:
         """
         Applies a force at the center of the node
@@ -357,32 +505,20 @@ class Node():
         """
         return glm.vec3(self.model_matrix * glm.vec4(*self.mesh.points[index], 1))
 
-    def get_data(self) -> np.ndarray:
+    def get_data(self, lod: int=0, shader: Shader=None) -> np.ndarray:
         """
-        Gets the node batch data for chunk batching
+        Gets the node batch data for chunk batching at the given level of detail.
+        The data is laid out for the given shader, which defaults to the node's shader
         """
         
-        # Get data from the mesh node
-        mesh_data = self.mesh.data
-        node_data = np.array([*self.position, *self.rotation, *self.scale, 0])
+        return get_batch_data(self.mesh, self.position, self.rotation, self.scale, self.material, shader if shader else self.shader, lod)
 
-        per_vertex_mtl = isinstance(self.material, list)
-
-        if not per_vertex_mtl: node_data[-1] = self.material.index
-
-        # Create an array to hold the node's data
-        width = 25 if not self.mesh.custom else 11 + mesh_data.shape[1]
-        data = np.zeros(shape=(mesh_data.shape[0], width), dtype='f4')
-
-
-        data[:,:mesh_data.shape[1]] = mesh_data
-        data[:,mesh_data.shape[1]:] = node_data
-
-        if per_vertex_mtl: data[:,-1] = self.material
-
-        if self.shader and not self.mesh.custom: data = np.take(data, self.shader.attribute_indices, axis=1)
-
-        return data
+    def get_instance_data(self) -> np.ndarray:
+        """
+        Gets the node instance data for instanced chunk rendering
+        """
+        
+        return get_instance_data(self.position, self.rotation, self.scale, self.material)
 
     def write_materials(self):
         """
@@ -416,15 +552,21 @@ class Node():
     @property
     def rotation(self): return self.internal_rotation
     @property
+    def relative_position(self): return self._relative_position
+    @property
+    def relative_scale(self):    return self._relative_scale
+    @property
+    def relative_rotation(self): return self._relative_rotation
+    @property
     def forward(self):  return self._forward
     @property
     def mesh(self):     return self._mesh
     @property
     def material(self): return self._material
     @property
-    def velocity(self): return self._velocity
+    def velocity(self): return Vec3View(self.get_motion(self._velocity, self.transform_store.velocities if self.transform_store else None))
     @property
-    def rotational_velocity(self): return self._rotational_velocity
+    def rotational_velocity(self): return Vec3View(self.get_motion(self._rotational_velocity, self.transform_store.rotational_velocities if self.transform_store else None))
     @property
     def mass(self): 
         if self.physics_body: return self.physics_body.mass
@@ -451,7 +593,10 @@ class Node():
     def tags(self): return self._tags
     @property
     def static(self):
-        return self._static if self._static is not None else not(self.physics or any(self.velocity) or any(self.rotational_velocity) or (self.parent and not self.parent.static))
+        if self._is_static is None: self._is_static = self._static if self._static is not None else not(self.physics or any(self.velocity) or any(self.rotational_velocity) or (self.parent and not self.parent.static))
+        return self._is_static
+    @property
+    def occluder(self): return self._occluder
     @property
     def x(self): return self.internal_position.data.x
     @property
@@ -531,6 +676,21 @@ class Node():
         # # compute relative rotation
         # if self.parent and self.relative_rotation: self.relative_rotation = self.rotation * glm.inverse(self.parent.rotation)
 
+    @relative_position.setter
+    def relative_position(self, value: glm.vec3 | None):
+        self._relative_position = None if value is None else glm.vec3(value)
+        if self.transform_store and self.parent: self.transform_store.link(self)
+
+    @relative_scale.setter
+    def relative_scale(self, value: glm.vec3 | None):
+        self._relative_scale = None if value is None else glm.vec3(value)
+        if self.transform_store and self.parent: self.transform_store.link(self)
+
+    @relative_rotation.setter
+    def relative_rotation(self, value: glm.quat | None):
+        self._relative_rotation = None if value is None else glm.quat(value)
+        if self.transform_store and self.parent: self.transform_store.link(self)
+
     @forward.setter
     def forward(self, value: tuple | list | glm.vec3 | np.ndarray):
         if isinstance(value, glm.vec3): self._forward = value
@@ -543,9 +703,11 @@ class Node():
     def mesh(self, value: Mesh | None):
         if isinstance(value, Mesh):
             self._mesh = value
+            if self.node_handler: self.node_handler.node_index.update(self)
             if self.chunk: self.chunk.update()
         elif isinstance(value, type(None)):
             self._mesh = None
+            if self.node_handler: self.node_handler.node_index.update(self)
             if not self.chunk: return
             self.chunk.remove(self)
             self.chunk.update()
@@ -553,6 +715,7 @@ class Node():
     
     @material.setter
     def material(self, value: Material):
+        per_vertex = isinstance(self._material, list)
         if isinstance(value, list):
             self._mtl_list = value
             if not self.node_handler: 
@@ -573,25 +736,28 @@ class Node():
             else: self._material = None
 
         else: raise TypeError(f'Node: Invalid material value type {type(value)}')
+        if self.node_handler: self.node_handler.node_index.update(self)
         if not self.chunk: return
+        # Per vertex materials cannot be instanced or indexed, so the node is moved between batches or rewritten when its vertex count changes
+        if self.data_length and ((self.chunk.get_batch(self) is not self.chunk.batch) != self.chunk.instanced(self) or isinstance(self._material, list) != per_vertex): self.chunk.chunk_handler.move(self)
         self.chunk.node_update_callback(self)
     
     @velocity.setter
     def velocity(self, value: tuple | list | glm.vec3 | np.ndarray | Vec3):
-        if isinstance(value, glm.vec3): self._velocity = glm.vec3(value)
-        elif isinstance(value, Vec3): self._velocity = glm.vec3(value.data)
+        if isinstance(value, glm.vec3): self._velocity.data = glm.vec3(value)
+        elif isinstance(value, Vec3): self._velocity.data = glm.vec3(value.data)
         elif isinstance(value, tuple) or isinstance(value, list) or isinstance(value, np.ndarray):
             if len(value) != 3: raise ValueError(f'Node: Invalid number of values for velocity. Expected 3, got {len(value)}')
-            self._velocity = glm.vec3(value)
+            self._velocity.data = glm.vec3(value)
         else: raise TypeError(f'Node: Invalid velocity value type {type(value)}')
         
     @rotational_velocity.setter
     def rotational_velocity(self, value: tuple | list | glm.vec3 | np.ndarray | Vec3):
-        if isinstance(value, glm.vec3): self._rotational_velocity = glm.vec3(value)
-        elif isinstance(value, Vec3): self._rotational_velocity = glm.vec3(value.data)
+        if isinstance(value, glm.vec3): self._rotational_velocity.data = glm.vec3(value)
+        elif isinstance(value, Vec3): self._rotational_velocity.data = glm.vec3(value.data)
         elif isinstance(value, tuple) or isinstance(value, list) or isinstance(value, np.ndarray):
             if len(value) != 3: raise ValueError(f'Node: Invalid number of values for rotational velocity. Expected 3, got {len(value)}')
-            self._rotational_velocity = glm.vec3(value)
+            self._rotational_velocity.data = glm.vec3(value)
         else: raise TypeError(f'Node: Invalid rotational velocity value type {type(value)}')
         
     @mass.setter
@@ -599,6 +765,7 @@ class Node():
         if not self.physics_body: raise RuntimeError('Node: Cannot set the mass of a node that has no physics body')
         if isinstance(value, int) or isinstance(value, float): self.physics_body.mass = value
         else: raise TypeError(f'Node: Invalid mass value type {type(value)}')
+        if self.transform_store: self.transform_store.write_physics(self)
         
     @static_friction.setter
     def static_friction(self, value: int | float):
@@ -628,18 +795,28 @@ class Node():
     def name(self, value: str):
         if isinstance(value, str): self._name = value
         else: raise TypeError(f'Node: Invalid name value type {type(value)}')
+        if self.node_handler: self.node_handler.node_index.update(self)
         
     @tags.setter
     def tags(self, value: list[str]):
         if isinstance(value, list) or isinstance(value, tuple):
             for tag in value:
                 if not isinstance(tag, str): raise TypeError(f'Node: Invalid tag value in tags list of type {type(tag)}')
-            self._tags = value
+            self._tags = Tags(value, callback=self.tags_callback)
         else: raise TypeError(f'Node: Invalid tags value type {type(value)}')
+        self.tags_callback()
         
     @static.setter
     def static(self, value: bool):
         self._static = value
+        self.update_static()
+
+    @occluder.setter
+    def occluder(self, value: bool):
+        self._occluder = bool(value)
+        if not self.node_handler: return
+        if self._occluder: self.node_handler.chunk_handler.occluders.add(self)
+        else: self.node_handler.chunk_handler.occluders.discard(self)
 
     @x.setter
     def x(self, value: int | float):
@@ -670,6 +847,9 @@ class Node():
         elif not self.physics:
             self.physics_body = PhysicsBody(mass = 1)
             if self.node_handler: self.physics_body.physics_engine = self.node_handler.scene.physics_engine
+        if self.transform_store: self.transform_store.write_physics(self)
+        if self.node_handler: self.node_handler.node_index.update(self)
+        self.update_static()
 
             
     @collision.setter
@@ -687,4 +867,16 @@ class Node():
                 if self.node_handler: self.collider.collider_handler = self.node_handler.scene.collider_handler
         elif not self.collider:
             self.collider = Collider(self)
-            if self.node_handler: self.collider.collider_handler = self.node_handler.scene.collider_handler
\ No newline at end of file
+            if self.node_handler: self.collider.collider_handler = self.node_handler.scene.collider_handler
+        if self.node_handler: self.node_handler.node_index.update(self)
+
+
+def copy_custom(value: Vec3 | Quat, callback) -> Vec3 | Quat:
+    """
+    Copies a Vec3 or Quat with a new callback without going through the data setter, so no callback is sent
+    """
+    copy = value.__class__.__new__(value.__class__)
+    copy._data     = value.data.__copy__()
+    copy.prev_data = value.data.__copy__()
+    copy.callback  = callback
+    return copy
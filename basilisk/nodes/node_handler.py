@@ -1,5 +1,12 @@
+import gc
 import glm
+import numpy as np
+from contextlib import contextmanager
 from .node import Node
+from .static_instance import StaticInstance
+from .transform_store import TransformStore, DIRTY_POSITION, DIRTY_ROTATION, DIRTY_SCALE, rotate_inverse
+from .node_index import NodeIndex
+from ..generic.registry import Registry
 from .helper import node_is
 from ..render.chunk_handler import ChunkHandler
 from ..mesh.mesh import Mesh
@@ -9,8 +16,16 @@ from ..render.material import Material
 class NodeHandler():
     scene: ...
     """Back reference to the scene"""
-    nodes: list[Node]
-    """The list of root nodes in the scene"""
+    nodes: Registry
+    """All the nodes in the scene, each with a stable integer handle"""
+    instances: Registry
+    """All the static instances in the scene. Instances are not included in node queries"""
+    transform_store: TransformStore
+    """Contiguous arrays containing the transforms and velocities of all nodes in the scene"""
+    node_index: NodeIndex
+    """Secondary indexes used to answer get and get_all queries"""
+    bulk_depth: int
+    """Number of currently open bulk blocks. Handler work is deferred while this is nonzero"""
     
     def __init__(self, scene):
         """
@@ -20,7 +35,11 @@ class NodeHandler():
         
         self.scene = scene
         self.engine = scene.engine
-        self.nodes = []
+        self.nodes = Registry()
+        self.instances = Registry()
+        self.transform_store = TransformStore()
+        self.node_index = NodeIndex()
+        self.bulk_depth = 0
         self.chunk_handler = ChunkHandler(scene)
 
     def update(self):
@@ -28,10 +47,20 @@ class NodeHandler():
         Updates the nodes and chunks in the scene
         """
         dt = self.scene.engine.delta_time
-        if dt < 0.5:
-            for node in self.nodes: 
-                # if not node.static: TODO determine better solution to this line
-                    node.update(dt)
+        # Integrate all nodes in a single pass
+        if dt < 0.5: rows, flags = self.transform_store.integrate(dt, self.scene.physics_engine)
+        else: rows, flags = np.zeros(0, dtype='i4'), np.zeros(0, dtype='u1')
+
+        # Update the children in dirty subtrees, then send one update to each node that moved
+        self.transform_store.sync(rows, flags)
+        self.transform_store.clear_dirty()
+
+    def update_chunks(self):
+        """
+        Rebatches changed chunks and writes the data of all nodes that changed this frame.
+        Called after collisions are resolved so each node is written at most once per frame
+        """
+        
         self.chunk_handler.update()
 
     def render(self):
@@ -41,11 +70,12 @@ class NodeHandler():
         
         self.chunk_handler.render()
 
-    def add(self, node: Node) -> Node:
+    def add(self, node: Node | StaticInstance) -> Node | StaticInstance:
         """
         Adds a new node to the node handler
         """
-        if node in self.nodes: return
+        if node.node_handler is self: return
+        if isinstance(node, StaticInstance): return self.add_instance(node)
         
         for n in node.get_all(): # gets all nodes including the node to be added
             
@@ -58,16 +88,160 @@ class NodeHandler():
             n.init_scene(self.scene)
             
             # Add the node to internal data
-            self.nodes.append(n)
+            n.handle = self.nodes.add(n)
+            self.transform_store.add(n)
+            self.node_index.add(n)
             self.chunk_handler.add(n)
+            if n.occluder: self.chunk_handler.occluders.add(n)
 
         return node
         
+    def add_instance(self, instance: StaticInstance) -> StaticInstance:
+        """
+        Adds a static instance directly to its chunk. Instances skip the transform store and node index
+        """
+        if instance.node_handler is self: return
+
+        self.engine.shader_handler.add(instance.shader)
+        if not instance.material: instance.material = self.engine.material_handler.base
+        self.engine.material_handler.add(instance.material)
+        if not instance.mesh: instance.mesh = self.engine.cube
+
+        instance.node_handler = self
+        instance.handle = self.instances.add(instance)
+        self.chunk_handler.add(instance)
+
+        return instance
+
+    def from_handle(self, handle: int) -> Node | None:
+        """
+        Returns the node with the given handle, or None if no node in the scene has it
+        """
+
+        return self.nodes.get(handle)
+
+    def add_many(self, nodes: list[Node]) -> list[Node]:
+        """
+        Adds all the given nodes in a single bulk block
+        """
+
+        with self.bulk(): return [self.add(node) for node in nodes]
+
+    def instantiate(self, prefab: Node, positions: np.ndarray, rotations: np.ndarray=None, scales: np.ndarray=None) -> list[Node]:
+        """
+        Adds a copy of the prefab node and its children at each of the given transforms in a single bulk block.
+        Positions and scales are (n, 3) arrays and rotations are (n, 4) arrays of w, x, y, z quaternions. Missing rotations or scales are taken from the prefab.
+        The copies share the prefab's mesh, materials and shader and skip the node constructor, so only their transforms, physics bodies and colliders are created per copy.
+        """
+
+        positions = np.asarray(positions, dtype='f4')
+        n = len(positions)
+        positions = validate_array('instantiate', positions, n, 3)
+        if rotations is None: rotations = np.tile(np.array(prefab.rotation.data, dtype='f4'), (n, 1))
+        else: 
+            rotations = validate_array('instantiate', rotations, n, 4)
+            rotations = rotations / np.linalg.norm(rotations, axis=1, keepdims=True)
+        if scales is None: scales = np.tile(np.array(prefab.scale.data, dtype='f4'), (n, 1))
+        else: scales = validate_array('instantiate', scales, n, 3)
+        if not n: return []
+
+        with self.bulk():
+            
+            # Resolve the shared state on the first copy, the remaining copies are made from it
+            template = self.resolve(prefab.clone(children=True))
+            copies = [template] + [template.clone(children=True) for _ in range(n - 1)]
+            
+            # Write the transforms of the copies
+            for copy, position, rotation, scale in zip(copies, positions.tolist(), rotations.tolist(), scales.tolist()):
+                copy.internal_position._data = glm.vec3(position)
+                copy.internal_rotation._data = glm.quat(rotation)
+                copy.internal_scale._data    = glm.vec3(scale)
+                copy.internal_position.prev_data = glm.vec3(position)
+                copy.internal_rotation.prev_data = glm.quat(rotation)
+                copy.internal_scale.prev_data    = glm.vec3(scale)
+
+            # Compute the bounds of all copies at once so the BVH build does not compute them one collider at a time
+            if template.collider: set_bounds(copies, positions, rotations, scales)
+
+            nodes = [node for copy in copies for node in copy.get_all()] if template.children else copies
+            self.attach(nodes, copies, positions, rotations, scales)
+
+        return copies
+
+    def resolve(self, template: Node) -> Node:
+        """
+        Internal function to add the shaders and materials of a template node and its children to the engine and give them the scene.
+        Clones of a resolved template share its resolved state, so they can be attached without resolving each copy
+        """
+
+        for node in template.get_all():
+            self.engine.shader_handler.add(node.shader)
+            if not node.material: node.material = self.engine.material_handler.base
+            self.engine.material_handler.add(node.material)
+            node.init_scene(self.scene)
+
+        return template
+
+    def attach(self, nodes: list[Node], roots: list[Node], positions: np.ndarray, rotations: np.ndarray, scales: np.ndarray, velocities: np.ndarray=None, rotational_velocities: np.ndarray=None) -> None:
+        """
+        Internal function to add clones of resolved templates inside a bulk block. Nodes lists all clones with parents before their children.
+        The roots are the clones without a parent, in the order of the given transform arrays, and are written to the transform store in one write
+        """
+
+        for node in nodes:
+            node.scene = self.scene
+            node.engine = self.engine
+            node.node_handler = self
+            if node.physics_body: node.physics_body.physics_engine = self.scene.physics_engine
+            if node.collider: node.collider.collider_handler = self.scene.collider_handler
+            node.handle = self.nodes.add(node)
+
+        # Children are added after all roots so their parents have rows
+        self.transform_store.add_many(roots, positions, rotations, scales, velocities, rotational_velocities)
+        if len(roots) != len(nodes):
+            for node in nodes:
+                if node.parent: self.transform_store.add(node)
+
+        self.node_index.add_many(nodes)
+        for node in nodes: 
+            self.chunk_handler.add(node)
+            if node.occluder: self.chunk_handler.occluders.add(node)
+
+    @contextmanager
+    def bulk(self):
+        """
+        Context manager for adding many nodes at once. 
+        Material texture regeneration and BVH insertion are deferred until the outermost block exits and are then performed once.
+        Chunks touched inside the block are batched once on the next update.
+        Garbage collection is paused inside the block since creating many nodes would otherwise trigger repeated full collections.
+        """
+
+        material_handler = self.engine.material_handler
+        collider_handler = self.scene.collider_handler
+        collecting = False
+
+        if not self.bulk_depth:
+            material_handler.defer()
+            collider_handler.defer()
+            collecting = gc.isenabled()
+            gc.disable()
+
+        self.bulk_depth += 1
+        try: yield self
+        finally:
+            self.bulk_depth -= 1
+            if not self.bulk_depth:
+                material_handler.flush()
+                collider_handler.flush()
+            if collecting: gc.enable()
+
     def get(self, position: glm.vec3=None, scale: glm.vec3=None, rotation: glm.quat=None, forward: glm.vec3=None, mesh: Mesh=None, material: Material=None, velocity: glm.vec3=None, rotational_velocity: glm.quat=None, physics: bool=None, mass: float=None, collisions: bool=None, static_friction: float=None, kinetic_friction: float=None, elasticity: float=None, collision_group: float=None, name: str=None, tags: list[str]=None,static: bool=None) -> Node:
         """
         Returns the first node with the given traits
         """
-        for node in self.nodes:
+        nodes = self.node_index.get_nodes(self.node_index.query(mesh, material, physics, collisions, name, tags, static))
+        if not needs_filter(position, scale, rotation, forward, material, velocity, rotational_velocity, mass, static_friction, kinetic_friction, elasticity, collision_group): return nodes[0] if nodes else None
+        for node in nodes:
             if node_is(node, position, scale, rotation, forward, mesh, material, velocity, rotational_velocity, physics, mass, collisions, static_friction, kinetic_friction, elasticity, collision_group, name, tags, static): return node
         return None
     
@@ -75,10 +249,9 @@ class NodeHandler():
         """
         Returns all nodes with the given traits
         """
-        nodes = []
-        for node in self.nodes:
-            if node_is(node, position, scale, rotation, forward, mesh, material, velocity, rotational_velocity, physics, mass, collisions, static_friction, kinetic_friction, elasticity, collision_group, name, tags, static): nodes.append(node)
-        return nodes
+        nodes = self.node_index.get_nodes(self.node_index.query(mesh, material, physics, collisions, name, tags, static))
+        if not needs_filter(position, scale, rotation, forward, material, velocity, rotational_velocity, mass, static_friction, kinetic_friction, elasticity, collision_group): return nodes
+        return [node for node in nodes if node_is(node, position, scale, rotation, forward, mesh, material, velocity, rotational_velocity, physics, mass, collisions, static_friction, kinetic_friction, elasticity, collision_group, name, tags, static)]
     
     def remove(self, node: Node) -> None: 
         """
@@ -86,13 +259,143 @@ class NodeHandler():
         """
 
         if node == None: return
+        if isinstance(node, StaticInstance): return self.remove_instance(node)
 
         # TODO add support for recursive nodes
-        if node in self.nodes:
+        if node.node_handler is self:
             if node.physics_body: self.scene.physics_engine.remove(node.physics_body)
             if node.collider: self.scene.collider_handler.remove(node.collider)
             self.chunk_handler.remove(node)
+            self.chunk_handler.occluders.discard(node)
+            self.transform_store.remove(node)
+            self.node_index.remove(node)
             self.nodes.remove(node)
+            node.handle = -1
             node.node_handler = None
             
-        for child in node.children: self.remove(child)
\ No newline at end of file
+        for child in node.children: self.remove(child)
+
+    def remove_instance(self, instance: StaticInstance) -> None:
+        """
+        Removes a static instance from its chunk
+        """
+
+        if instance.node_handler is not self: return
+
+        self.chunk_handler.remove(instance)
+        self.instances.remove(instance)
+        instance.handle = -1
+        instance.node_handler = None
+
+    def get_positions(self, nodes: list[Node]) -> np.ndarray:
+        """
+        Returns an (n, 3) array of the positions of the given nodes
+        """
+        return self.transform_store.positions[self.transform_store.get_rows(nodes)]
+
+    def get_rotations(self, nodes: list[Node]) -> np.ndarray:
+        """
+        Returns an (n, 4) array of the rotations of the given nodes stored as w, x, y, z
+        """
+        return self.transform_store.rotations[self.transform_store.get_rows(nodes)]
+
+    def get_scales(self, nodes: list[Node]) -> np.ndarray:
+        """
+        Returns an (n, 3) array of the scales of the given nodes
+        """
+        return self.transform_store.scales[self.transform_store.get_rows(nodes)]
+
+    def get_velocities(self, nodes: list[Node]) -> np.ndarray:
+        """
+        Returns an (n, 3) array of the velocities of the given nodes
+        """
+        return self.transform_store.velocities[self.transform_store.get_rows(nodes)]
+
+    def get_rotational_velocities(self, nodes: list[Node]) -> np.ndarray:
+        """
+        Returns an (n, 3) array of the rotational velocities of the given nodes
+        """
+        return self.transform_store.rotational_velocities[self.transform_store.get_rows(nodes)]
+
+    def set_positions(self, nodes: list[Node], positions: np.ndarray) -> None:
+        """
+        Sets the positions of the given nodes from an (n, 3) array
+        """
+        self.set_transforms(nodes, positions, self.transform_store.positions, DIRTY_POSITION, 'positions')
+
+    def set_rotations(self, nodes: list[Node], rotations: np.ndarray) -> None:
+        """
+        Sets the rotations of the given nodes from an (n, 4) array of w, x, y, z quaternions
+        """
+        rotations = np.asarray(rotations, dtype='f4')
+        if rotations.ndim == 2 and rotations.shape[1] == 4: 
+            rotations = rotations / np.linalg.norm(rotations, axis=1, keepdims=True)
+        self.set_transforms(nodes, rotations, self.transform_store.rotations, DIRTY_ROTATION, 'rotations')
+
+    def set_scales(self, nodes: list[Node], scales: np.ndarray) -> None:
+        """
+        Sets the scales of the given nodes from an (n, 3) array
+        """
+        self.set_transforms(nodes, scales, self.transform_store.scales, DIRTY_SCALE, 'scales')
+
+    def set_velocities(self, nodes: list[Node], velocities: np.ndarray) -> None:
+        """
+        Sets the velocities of the given nodes from an (n, 3) array
+        """
+        rows = self.transform_store.get_rows(nodes)
+        self.set_motion(nodes, rows, self.transform_store.velocities, validate_array('set_velocities', velocities, len(rows), 3))
+
+    def set_rotational_velocities(self, nodes: list[Node], rotational_velocities: np.ndarray) -> None:
+        """
+        Sets the rotational velocities of the given nodes from an (n, 3) array
+        """
+        rows = self.transform_store.get_rows(nodes)
+        self.set_motion(nodes, rows, self.transform_store.rotational_velocities, validate_array('set_rotational_velocities', rotational_velocities, len(rows), 3))
+
+    def set_motion(self, nodes: list[Node], rows: np.ndarray, column: np.ndarray, values: np.ndarray) -> None:
+        """
+        Internal function to write a velocity column for the given nodes and update the nodes that started or stopped moving
+        """
+        moving = column[rows].any(axis=1)
+        column[rows] = values
+        for i in np.flatnonzero(moving != values.any(axis=1)).tolist(): nodes[i].update_static()
+
+    def set_transforms(self, nodes: list[Node], values: np.ndarray, column: np.ndarray, flag: int, name: str) -> None:
+        """
+        Internal function to write a transform column for the given nodes and send one update per node
+        """
+        rows = self.transform_store.get_rows(nodes)
+        column[rows] = validate_array(f'set_{name}', values, len(rows), column.shape[1])
+        self.transform_store.dirty[rows] |= flag
+        for node in nodes: node.sync_transform(flag)
+
+
+def needs_filter(position, scale, rotation, forward, material, velocity, rotational_velocity, mass, static_friction, kinetic_friction, elasticity, collision_group) -> bool:
+    """
+    Determines if a query has traits that are not covered by the node index
+    """
+    return isinstance(material, list) or any(trait is not None for trait in (position, scale, rotation, forward, velocity, rotational_velocity, mass, static_friction, kinetic_friction, elasticity, collision_group))
+
+def validate_array(method: str, values: np.ndarray, n: int, width: int) -> np.ndarray:
+    """
+    Checks that the given values can be written to n rows of the given width
+    """
+    values = np.asarray(values, dtype='f4')
+    if values.shape != (n, width): raise ValueError(f'NodeHandler.{method}: Expected an array of shape {(n, width)}, got {values.shape}')
+    return values
+
+def set_bounds(nodes: list[Node], positions: np.ndarray, rotations: np.ndarray, scales: np.ndarray) -> None:
+    """
+    Sets the geometric centers and collider half dimensions of copies of one prefab from their transform arrays
+    """
+    n = len(nodes)
+    corners = np.array(nodes[0].collider.mesh.aabb_points, dtype='f4')
+    points  = rotate_inverse(np.repeat(rotations, 8, axis=0), (scales[:, None] * corners).reshape(-1, 3)).reshape(n, 8, 3) + positions[:, None]
+    centers = rotate_inverse(rotations, scales * np.array(nodes[0].mesh.geometric_center, dtype='f4')) + positions
+    half_dimensions = points.max(axis=1) - centers
+
+    for node, center, half in zip(nodes, centers.tolist(), half_dimensions.tolist()):
+        node._geometric_center = glm.vec3(center)
+        node.needs_geometric_center = False
+        node.collider._half_dimensions = glm.vec3(half)
+        node.collider.needs_half_dimensions = False
@@ -0,0 +1,220 @@
+import numpy as np
+
+
+class NodeIndex():
+    nodes: list
+    """List of indexed nodes in the order they were added. The position of a node in this list is its bit in every bitset"""
+    free_count: int
+    """Number of bits of removed nodes in the list. Bits are not reused, so bit order stays insertion order, and the list is compacted once half of it is free"""
+    names: dict[str, int]
+    """Bitsets of the nodes with each name"""
+    tags: dict[str, int]
+    """Bitsets of the nodes with each tag"""
+    meshes: dict
+    """Bitsets of the nodes with each mesh"""
+    materials: dict
+    """Bitsets of the nodes with each material. Nodes with per vertex material lists are not indexed by material"""
+    physics: int
+    """Bitset of the nodes with a physics body"""
+    collisions: int
+    """Bitset of the nodes with a collider"""
+    static: int
+    """Bitset of the static nodes"""
+    all: int
+    """Bitset of all indexed nodes"""
+
+    def __init__(self) -> None:
+        """
+        Secondary indexes of the nodes in a node handler.
+        Each node is given a bit and each indexed attribute value maps to a bitset of nodes, so queries are intersections of integers.
+        """
+
+        self.nodes = []
+        self.free_count = 0
+        self.keys = {}
+        self.clear_bitsets()
+
+    def clear_bitsets(self) -> None:
+        """
+        Internal function to empty the bitsets
+        """
+
+        self.names      = {}
+        self.tags       = {}
+        self.meshes     = {}
+        self.materials  = {}
+        self.physics    = 0
+        self.collisions = 0
+        self.static     = 0
+        self.all        = 0
+
+    def add(self, node) -> None:
+        """
+        Gives the node a bit and adds it to the indexes
+        """
+
+        if node in self.keys: return self.update(node)
+
+        bit = len(self.nodes)
+        self.nodes.append(node)
+        self.all |= 1 << bit
+        self.insert(node, bit)
+
+    def remove(self, node) -> None:
+        """
+        Removes the node from the indexes and frees its bit
+        """
+
+        if node not in self.keys: return
+
+        bit = self.keys[node][0]
+        self.discard(node)
+        self.all &= ~(1 << bit)
+        self.nodes[bit] = None
+        self.free_count += 1
+
+        # Renumber the remaining nodes once half of the bits are free so the bitsets stay small
+        if self.free_count > 64 and self.free_count * 2 > len(self.nodes): self.compact()
+
+    def compact(self) -> None:
+        """
+        Internal function to give the indexed nodes consecutive bits in the order they were added
+        """
+
+        nodes = [node for node in self.nodes if node is not None]
+        self.nodes = []
+        self.free_count = 0
+        self.keys = {}
+        self.clear_bitsets()
+        self.add_many(nodes)
+
+    def update(self, node) -> None:
+        """
+        Reindexes the node after one of its indexed attributes changed
+        """
+
+        if node not in self.keys: return
+
+        bit = self.keys[node][0]
+        self.discard(node)
+        self.insert(node, bit)
+
+    def add_many(self, nodes: list) -> None:
+        """
+        Gives each node a bit and adds them to the indexes.
+        Nodes with the same indexed attributes, such as copies of a prefab, are merged into one bitset so each index is updated once per group
+        """
+
+        groups = {}
+        for node in nodes:
+            if node in self.keys: 
+                self.update(node)
+                continue
+
+            bit = len(self.nodes)
+            self.nodes.append(node)
+            material = node.material if not isinstance(node.material, list) else None
+            tags = tuple(node.tags)
+            
+            self.keys[node] = (bit, node.name, tags, node.mesh, material)
+            groups.setdefault((node.name, tags, node.mesh, material, bool(node.physics_body), bool(node.collider), node.static), []).append(bit)
+
+        for key, bits in groups.items():
+            mask = to_bitset(bits)
+            self.all |= mask
+            self.insert_mask(mask, *key)
+
+    def insert(self, node, bit: int) -> None:
+        """
+        Internal function to add the node's current attributes to the indexes
+        """
+
+        material = node.material if not isinstance(node.material, list) else None
+        tags = tuple(node.tags)
+
+        self.insert_mask(1 << bit, node.name, tags, node.mesh, material, bool(node.physics_body), bool(node.collider), node.static)
+        self.keys[node] = (bit, node.name, tags, node.mesh, material)
+
+    def insert_mask(self, mask: int, name: str, tags: tuple, mesh, material, physics: bool, collider: bool, static: bool) -> None:
+        """
+        Internal function to add a bitset of nodes with the given attributes to the indexes
+        """
+
+        self.names[name] = self.names.get(name, 0) | mask
+        for tag in tags: self.tags[tag] = self.tags.get(tag, 0) | mask
+        self.meshes[mesh] = self.meshes.get(mesh, 0) | mask
+        if material is not None: self.materials[material] = self.materials.get(material, 0) | mask
+        if physics:  self.physics |= mask
+        if collider: self.collisions |= mask
+        if static:   self.static |= mask
+
+    def discard(self, node) -> None:
+        """
+        Internal function to remove the node's previously indexed attributes from the indexes
+        """
+
+        bit, name, tags, mesh, material = self.keys.pop(node)
+        mask = ~(1 << bit)
+
+        remove_bit(self.names, name, mask)
+        for tag in tags: remove_bit(self.tags, tag, mask)
+        remove_bit(self.meshes, mesh, mask)
+        if material is not None: remove_bit(self.materials, material, mask)
+        self.physics    &= mask
+        self.collisions &= mask
+        self.static     &= mask
+
+    def query(self, mesh=None, material=None, physics: bool=None, collisions: bool=None, name: str=None, tags: list[str]=None, static: bool=None) -> int:
+        """
+        Returns the bitset of nodes matching all of the given indexed attributes.
+        Candidate sets are intersected from smallest to largest so the result shrinks as quickly as possible.
+        """
+
+        candidates = []
+        if name is not None:     candidates.append(self.names.get(name, 0))
+        if tags:                 candidates.extend(self.tags.get(tag, 0) for tag in tags)
+        if mesh is not None:     candidates.append(self.meshes.get(mesh, 0))
+        if material is not None: candidates.append(self.materials.get(material, 0) if not isinstance(material, list) else self.all)
+        if physics is not None:    candidates.append(self.physics    if physics    else self.all & ~self.physics)
+        if collisions is not None: candidates.append(self.collisions if collisions else self.all & ~self.collisions)
+        if static is not None:     candidates.append(self.static     if static     else self.all & ~self.static)
+
+        if not candidates: return self.all
+
+        candidates.sort(key=int.bit_count)
+        bits = candidates[0]
+        for candidate in candidates[1:]:
+            if not bits: break
+            bits &= candidate
+
+        return bits
+
+    def get_nodes(self, bits: int) -> list:
+        """
+        Returns the nodes of the given bitset ordered by their bit
+        """
+
+        if not bits: return []
+
+        # Unpack the bitset with numpy instead of walking it bit by bit
+        data = np.frombuffer(bits.to_bytes((bits.bit_length() + 7) // 8, 'little'), dtype='u1')
+        return [self.nodes[bit] for bit in np.flatnonzero(np.unpackbits(data, bitorder='little')).tolist()]
+
+
+def remove_bit(index: dict, key, mask: int) -> None:
+    """
+    Clears a bit from the bitset of the given key, deleting the key when it becomes empty
+    """
+
+    bits = index[key] & mask
+    if bits: index[key] = bits
+    else: del index[key]
+
+def to_bitset(bits: list[int]) -> int:
+    """
+    Packs a list of bit positions into an integer bitset
+    """
+
+    flags = np.zeros(max(bits) + 1, dtype=bool)
+    flags[bits] = True
+    return int.from_bytes(np.packbits(flags, bitorder='little').tobytes(), 'little')
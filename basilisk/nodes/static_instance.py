@@ -0,0 +1,79 @@
+import glm
+import numpy as np
+from .helper import get_batch_data, get_instance_data
+from ..mesh.mesh import Mesh
+from ..render.material import Material
+from ..render.shader import Shader
+
+
+class StaticInstance():
+    __slots__ = ('position', 'rotation', 'scale', 'mesh', 'material', 'shader', 'node_handler', 'chunk', 'handle', 'data_index', 'data_length')
+
+    position: glm.vec3
+    """The position of the instance in meters"""
+    rotation: glm.quat
+    """The rotation of the instance"""
+    scale: glm.vec3
+    """The scale of the instance in meters in each direction"""
+    mesh: Mesh
+    """The mesh of the instance. The engine cube is used if none is given"""
+    material: Material
+    """The material of the instance. The base material is used if none is given"""
+    shader: Shader
+    """Shader that is used to render the instance. If none is given, engine default will be used"""
+    node_handler: ...
+    """Back reference to the node handler containing the instance. None if the instance is not in a scene"""
+    chunk: ...
+    """The chunk that batches the instance"""
+    handle: int
+    """Stable integer handle of the instance in its node handler. -1 if the instance is not in a scene"""
+    static: bool = True
+    """Instances never move, so they are always batched into static chunks"""
+
+    def __init__(self, position: glm.vec3=None, rotation: glm.quat=None, scale: glm.vec3=None, mesh: Mesh=None, material: Material=None, shader: Shader=None) -> None:
+        """
+        Lightweight static object that only stores a mesh, material and transform.
+        Uses a fraction of the memory of a node and is batched into the same static chunks, but has no physics, collisions, children or callbacks.
+        The transform is read when the instance is added to a scene, so remove and add the instance again to move it.
+        """
+
+        if not isinstance(mesh, (Mesh, type(None))): raise TypeError(f'StaticInstance: Invalid mesh value type {type(mesh)}')
+        if not isinstance(material, (Material, type(None))): raise TypeError(f'StaticInstance: Invalid material value type {type(material)}. Per vertex material lists are only supported by nodes')
+
+        self.position = glm.vec3(position) if position else glm.vec3(0, 0, 0)
+        self.rotation = glm.quat(rotation) if rotation else glm.quat(1, 0, 0, 0)
+        self.scale    = glm.vec3(scale)    if scale    else glm.vec3(1, 1, 1)
+        self.mesh     = mesh
+        self.material = material
+        self.shader   = shader
+
+        self.node_handler = None
+        self.chunk        = None
+        self.handle       = -1
+        self.data_index   = 0
+        self.data_length  = 0
+
+    def get_data(self, lod: int=0, shader: Shader=None) -> np.ndarray:
+        """
+        Gets the instance batch data for chunk batching at the given level of detail.
+        The data is laid out for the given shader, which defaults to the instance's shader
+        """
+
+        return get_batch_data(self.mesh, self.position, self.rotation, self.scale, self.material, shader if shader else self.shader, lod)
+
+    def get_instance_data(self) -> np.ndarray:
+        """
+        Gets the instance data for instanced chunk rendering
+        """
+
+        return get_instance_data(self.position, self.rotation, self.scale, self.material)
+
+    @property
+    def x(self): return self.position.x
+    @property
+    def y(self): return self.position.y
+    @property
+    def z(self): return self.position.z
+
+    def __repr__(self) -> str:
+        return f'<Basilisk StaticInstance | {self.mesh}, ({self.position})>'
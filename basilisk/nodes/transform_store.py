@@ -0,0 +1,450 @@
+import numpy as np
+import glm
+from numba import njit
+
+
+# Dirty flags for the rows of the transform store
+DIRTY_POSITION  = 1
+DIRTY_ROTATION  = 2
+DIRTY_SCALE     = 4
+DIRTY_TRANSFORM = DIRTY_POSITION | DIRTY_ROTATION | DIRTY_SCALE
+DIRTY_RELATIVE  = 8 # the relative transform of a child changed
+
+# Flags for which components of a child are relative to its parent
+RELATIVE_POSITION = 1
+RELATIVE_ROTATION = 2
+RELATIVE_SCALE    = 4
+
+# Columns of the store | name : (width, dtype, default). Width 0 is a one dimensional column
+columns = {
+    'positions'             : (3, 'f4', 0),
+    'rotations'             : (4, 'f4', 0),
+    'scales'                : (3, 'f4', 0),
+    'velocities'            : (3, 'f4', 0),
+    'rotational_velocities' : (3, 'f4', 0),
+    'masses'                : (0, 'f4', 1),
+    'physics'               : (0, 'u1', 0),
+    'dirty'                 : (0, 'u1', 0),
+    'parents'               : (0, 'i4', -1),
+    'relative_positions'    : (3, 'f4', 0),
+    'relative_rotations'    : (4, 'f4', 0),
+    'relative_scales'       : (3, 'f4', 0),
+    'relative_flags'        : (0, 'u1', 0),
+}
+
+
+@njit
+def integrate_transforms(positions, rotations, velocities, rotational_velocities, masses, physics, acceleration, force, rotational_acceleration, dt):
+    """
+    Advances the positions and rotations of all rows by their velocities, then applies the constant physics accelerations.
+    Returns an array of the dirty flags of the rows that moved.
+    """
+    n = len(masses)
+    changed = np.zeros(n, dtype=np.uint8)
+    
+    for i in range(n):
+        # translation
+        vx, vy, vz = velocities[i, 0], velocities[i, 1], velocities[i, 2]
+        if vx != 0 or vy != 0 or vz != 0:
+            positions[i, 0] += dt * vx
+            positions[i, 1] += dt * vy
+            positions[i, 2] += dt * vz
+            changed[i] |= 1
+        
+        # rotation: q = normalize(q - dt / 2 * q * quat(0, w))
+        wx, wy, wz = rotational_velocities[i, 0], rotational_velocities[i, 1], rotational_velocities[i, 2]
+        if wx != 0 or wy != 0 or wz != 0:
+            qw, qx, qy, qz = rotations[i, 0], rotations[i, 1], rotations[i, 2], rotations[i, 3]
+            h = dt / 2
+            rw = qw - h * (-qx * wx - qy * wy - qz * wz)
+            rx = qx - h * ( qw * wx + qy * wz - qz * wy)
+            ry = qy - h * ( qw * wy - qx * wz + qz * wx)
+            rz = qz - h * ( qw * wz + qx * wy - qy * wx)
+            length = np.sqrt(rw * rw + rx * rx + ry * ry + rz * rz)
+            rotations[i, 0] = rw / length
+            rotations[i, 1] = rx / length
+            rotations[i, 2] = ry / length
+            rotations[i, 3] = rz / length
+            changed[i] |= 2
+            
+        # constant accelerations and forces from the physics engine
+        if physics[i]:
+            for j in range(3):
+                velocities[i, j] += (acceleration[j] + force[j] / masses[i]) * dt
+                rotational_velocities[i, j] += rotational_acceleration[j] * dt
+    
+    return changed
+
+def multiply_quats(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Hamilton product of two (n, 4) arrays of w, x, y, z quaternions
+    """
+    aw, ax, ay, az = a[:, 0], a[:, 1], a[:, 2], a[:, 3]
+    bw, bx, by, bz = b[:, 0], b[:, 1], b[:, 2], b[:, 3]
+    return np.stack([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    ], axis=1)
+
+def rotate_inverse(quats: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """
+    Rotates an (n, 3) array of vectors by the inverse of an (n, 4) array of unit quaternions. Matches glm.transpose(glm.mat4_cast(q)) * v
+    """
+    u = -quats[:, 1:]
+    w = quats[:, :1]
+    t = 2 * np.cross(u, vectors)
+    return vectors + w * t + np.cross(u, t)
+
+integrate_transforms(np.zeros((1, 3), 'f4'), np.zeros((1, 4), 'f4'), np.zeros((1, 3), 'f4'), np.zeros((1, 3), 'f4'), np.ones(1, 'f4'), np.zeros(1, 'u1'), np.zeros(3, 'f4'), np.zeros(3, 'f4'), np.zeros(3, 'f4'), 1.0)
+
+
+class TransformStore():
+    nodes: list
+    """List of the nodes in the store. The index of a node in this list is its row in the arrays"""
+    capacity: int
+    """The number of rows allocated in the arrays"""
+    positions: np.ndarray
+    """(capacity, 3) array containing the position of each node"""
+    rotations: np.ndarray
+    """(capacity, 4) array containing the rotation of each node stored as w, x, y, z"""
+    scales: np.ndarray
+    """(capacity, 3) array containing the scale of each node"""
+    velocities: np.ndarray
+    """(capacity, 3) array containing the translational velocity of each node"""
+    rotational_velocities: np.ndarray
+    """(capacity, 3) array containing the rotational velocity of each node"""
+    masses: np.ndarray
+    """(capacity,) array containing the mass of each node with a physics body"""
+    physics: np.ndarray
+    """(capacity,) array of flags for nodes that are affected by the physics engine"""
+    parents: np.ndarray
+    """(capacity,) array containing the row of each node's parent. -1 for nodes without a parent in the store"""
+    levels: list[np.ndarray]
+    """Child rows grouped by their depth in the hierarchy. Parents are always in an earlier level than their children"""
+    dirty: np.ndarray
+    """(capacity,) array of dirty flags. Set when a row is changed and cleared by the node handler each frame"""
+
+    def __init__(self, capacity: int=64) -> None:
+        """
+        Contiguous structure of arrays containing the transforms of every node in a node handler.
+        Nodes keep a row index into the arrays and read/write their transform through it.
+        """
+
+        self.nodes = []
+        self.capacity = 0
+        self.resize(max(capacity, 1))
+
+        # Topologically ordered hierarchy table, rebuilt when parentage changes
+        self.levels = []
+        self.parent_rows = np.zeros(0, dtype='i4')
+        self.needs_order = False
+
+    def resize(self, capacity: int) -> None:
+        """
+        Reallocates all columns to the given capacity, keeping existing rows
+        """
+
+        size = len(self.nodes)
+        for name, (width, dtype, default) in columns.items():
+            shape = (capacity, width) if width else (capacity,)
+            array = np.full(shape=shape, fill_value=default, dtype=dtype)
+            if self.capacity: array[:size] = getattr(self, name)[:size]
+            setattr(self, name, array)
+
+        self.capacity = capacity
+
+    def add(self, node) -> int:
+        """
+        Adds a node to the end of the store and copies its current transform into its row. Returns the row of the node
+        """
+
+        if len(self.nodes) == self.capacity: self.resize(self.capacity * 2)
+
+        row = len(self.nodes)
+        self.nodes.append(node)
+
+        # Copy the node's transform into the store
+        self.positions[row]             = node.internal_position.data
+        self.rotations[row]             = node.internal_rotation.data
+        self.scales[row]                = node.internal_scale.data
+        self.velocities[row]            = node._velocity.data
+        self.rotational_velocities[row] = node._rotational_velocity.data
+        self.dirty[row]                 = DIRTY_TRANSFORM
+
+        node.transform_store = self
+        node.transform_index = row
+        self.write_physics(node)
+        self.link(node)
+
+        return row
+
+    def add_many(self, nodes: list, positions: np.ndarray, rotations: np.ndarray, scales: np.ndarray, velocities: np.ndarray=None, rotational_velocities: np.ndarray=None) -> np.ndarray:
+        """
+        Adds nodes without a parent in the store to the end of the store. 
+        Transforms are copied from the given (n, 3), (n, 4) and (n, 3) arrays in one write instead of from each node. Returns the rows of the nodes.
+        Velocities are copied from the nodes unless (n, 3) arrays of them are given
+        """
+
+        n, start = len(nodes), len(self.nodes)
+        capacity = self.capacity
+        while capacity < start + n: capacity *= 2
+        if capacity != self.capacity: self.resize(capacity)
+
+        rows = slice(start, start + n)
+        self.nodes.extend(nodes)
+
+        # Copy the transforms into the store
+        self.positions[rows] = positions
+        self.rotations[rows] = rotations
+        self.scales[rows]    = scales
+        self.velocities[rows]            = velocities            if velocities            is not None else np.array([node._velocity.data for node in nodes], dtype='f4').reshape(n, 3)
+        self.rotational_velocities[rows] = rotational_velocities if rotational_velocities is not None else np.array([node._rotational_velocity.data for node in nodes], dtype='f4').reshape(n, 3)
+        self.physics[rows] = [node.physics_body is not None for node in nodes]
+        self.masses[rows]  = [node.physics_body.mass if node.physics_body else 1.0 for node in nodes]
+        self.parents[rows] = -1
+        self.dirty[rows]   = DIRTY_TRANSFORM
+
+        for row, node in enumerate(nodes, start):
+            node.transform_store = self
+            node.transform_index = row
+
+        return np.arange(start, start + n)
+
+    def remove(self, node) -> None:
+        """
+        Removes a node from the store by swapping the last row into its place
+        """
+
+        row  = node.transform_index
+        last = len(self.nodes) - 1
+
+        # The node keeps its velocities after it leaves the store
+        node.get_motion(node._velocity, self.velocities)
+        node.get_motion(node._rotational_velocity, self.rotational_velocities)
+
+        # Detach the node's children from its row
+        parents = self.parents
+        if parents[row] != -1: self.needs_order = True
+        for child in node.children:
+            if child.transform_store is not self or parents[child.transform_index] != row: continue
+            parents[child.transform_index] = -1
+            self.needs_order = True
+
+        # Move the last row into the removed row
+        if row != last:
+            for name in columns:
+                array = getattr(self, name)
+                array[row] = array[last]
+            moved = self.nodes[last]
+            self.nodes[row] = moved
+            moved.transform_index = row
+
+            # Point the moved node's children at its new row
+            for child in moved.children:
+                if child.transform_store is not self or parents[child.transform_index] != last: continue
+                parents[child.transform_index] = row
+                self.needs_order = True
+            if parents[row] != -1: self.needs_order = True
+        parents[last] = -1
+
+        self.nodes.pop()
+        node.transform_store = None
+        node.transform_index = -1
+
+    def push(self, node, flags: int) -> None:
+        """
+        Writes the node's transform wrappers into its row and marks the row as dirty
+        """
+
+        row = node.transform_index
+        if flags & DIRTY_POSITION: self.positions[row] = node.internal_position.data
+        if flags & DIRTY_ROTATION: self.rotations[row] = glm.normalize(node.internal_rotation.data) # quats normalize after their callback
+        if flags & DIRTY_SCALE:    self.scales[row]    = node.internal_scale.data
+        self.dirty[row] |= flags
+
+    def link(self, node) -> None:
+        """
+        Updates the parent and relative transform of the node's row from the node
+        """
+
+        row = node.transform_index
+        parent = node.parent
+
+        if parent is None or parent.transform_store is not self:
+            if self.parents[row] != -1: self.needs_order = True
+            self.parents[row] = -1
+            return
+        
+        # Copy the relative transforms
+        flags = 0
+        if node.relative_position is not None: self.relative_positions[row] = node.relative_position; flags |= RELATIVE_POSITION
+        if node.relative_rotation is not None: self.relative_rotations[row] = node.relative_rotation; flags |= RELATIVE_ROTATION
+        if node.relative_scale    is not None: self.relative_scales[row]    = node.relative_scale;    flags |= RELATIVE_SCALE
+        self.relative_flags[row] = flags
+
+        if self.parents[row] != parent.transform_index: self.needs_order = True
+        self.parents[row] = parent.transform_index
+        self.dirty[row] |= DIRTY_RELATIVE
+
+    def build_order(self) -> None:
+        """
+        Sorts the child rows of the store by their depth in the hierarchy
+        """
+
+        parents = self.parents[:len(self.nodes)]
+        children = np.flatnonzero(parents >= 0)
+        self.needs_order = False
+
+        if not len(children):
+            self.levels = []
+            self.parent_rows = np.zeros(0, dtype='i4')
+            return
+
+        # Walk up the hierarchy one level at a time until every depth is known
+        depths = np.zeros(len(parents), dtype='i4')
+        while True:
+            new_depths = np.where(parents >= 0, depths[parents] + 1, 0)
+            if np.array_equal(new_depths, depths): break
+            depths = new_depths
+
+        children = children[np.argsort(depths[children], kind='stable')]
+        bounds = np.flatnonzero(np.diff(depths[children])) + 1
+        self.levels = np.split(children, bounds)
+        self.parent_rows = np.unique(parents[children])
+
+    def propagate(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Recomputes the transforms of children whose parent moved or whose relative transform changed.
+        Levels are processed in order so changes reach the whole dirty subtree in one pass.
+        Returns the rows that changed and their dirty flags.
+        """
+
+        empty = np.zeros(0, dtype='i4'), np.zeros(0, dtype='u1')
+
+        if self.needs_order: self.build_order()
+        if not self.levels: return empty
+
+        # Nothing to do if no parent moved and no relative transform changed
+        dirty = self.dirty
+        if not (dirty[self.parent_rows] & DIRTY_TRANSFORM).any() and not (dirty[:len(self.nodes)] & DIRTY_RELATIVE).any(): return empty
+
+        changed_rows, changed_flags = [], []
+        for level in self.levels:
+            parents = self.parents[level]
+            mask = ((dirty[parents] & DIRTY_TRANSFORM) != 0) | ((dirty[level] & DIRTY_RELATIVE) != 0)
+            if not mask.any(): continue
+
+            rows, parents = level[mask], parents[mask]
+            relative = self.relative_flags[rows]
+            has_position = (relative & RELATIVE_POSITION) != 0
+            has_rotation = (relative & RELATIVE_ROTATION) != 0
+            has_scale    = (relative & RELATIVE_SCALE)    != 0
+
+            parent_scales    = self.scales[parents]
+            parent_rotations = self.rotations[parents]
+
+            # position = translate(parent) * transpose(rotation(parent)) * scale(parent) * relative position
+            positions = self.relative_positions[rows]
+            positions = np.where(has_scale[:, None], positions * parent_scales, positions)
+            positions = np.where(has_rotation[:, None], rotate_inverse(parent_rotations, positions), positions)
+            positions = positions + self.positions[parents]
+            self.positions[rows] = np.where(has_position[:, None], positions, self.positions[rows])
+
+            # scale and rotation are composed with the parent's
+            self.scales[rows] = np.where(has_scale[:, None], self.relative_scales[rows] * parent_scales, self.scales[rows])
+            rotations = multiply_quats(self.relative_rotations[rows], parent_rotations)
+            rotations /= np.linalg.norm(rotations, axis=1, keepdims=True)
+            self.rotations[rows] = np.where(has_rotation[:, None], rotations, self.rotations[rows])
+
+            flags = has_position * DIRTY_POSITION | has_rotation * DIRTY_ROTATION | has_scale * DIRTY_SCALE
+            flags = flags.astype('u1')
+            dirty[rows] |= flags
+            changed_rows.append(rows)
+            changed_flags.append(flags)
+
+        if not changed_rows: return empty
+        return np.concatenate(changed_rows), np.concatenate(changed_flags)
+
+    def write_physics(self, node) -> None:
+        """
+        Updates the physics flag and mass of the node's row
+        """
+
+        row = node.transform_index
+        self.physics[row] = node.physics_body is not None
+        self.masses[row]  = node.physics_body.mass if node.physics_body else 1.0
+
+    def integrate(self, dt: float, physics_engine, rows: np.ndarray=None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Integrates the velocities of all rows, or only the given rows, over the given time step. Returns the rows that moved and their dirty flags
+        """
+
+        n = len(self.nodes)
+        if not n: return np.zeros(0, dtype='i4'), np.zeros(0, dtype='u1')
+
+        # Combine the constant accelerations and forces of the physics engine
+        acceleration            = np.zeros(3, dtype='f4')
+        force                   = np.zeros(3, dtype='f4')
+        rotational_acceleration = np.zeros(3, dtype='f4')
+        for value in physics_engine.accelerations:            acceleration            += value
+        for value in physics_engine.forces:                   force                   += value
+        for value in physics_engine.rotational_accelerations: rotational_acceleration += value
+
+        if rows is not None:
+            # Selected rows are integrated on copies that are written back
+            positions, rotations, velocities, rotational_velocities = self.positions[rows], self.rotations[rows], self.velocities[rows], self.rotational_velocities[rows]
+            changed = integrate_transforms(positions, rotations, velocities, rotational_velocities, self.masses[rows], self.physics[rows], acceleration, force, rotational_acceleration, dt)
+            self.positions[rows], self.rotations[rows], self.velocities[rows], self.rotational_velocities[rows] = positions, rotations, velocities, rotational_velocities
+            rows = rows[changed != 0]
+            flags = changed[changed != 0]
+            self.dirty[rows] |= flags
+            return rows, flags
+
+        changed = integrate_transforms(
+            self.positions[:n], self.rotations[:n], 
+            self.velocities[:n], self.rotational_velocities[:n], 
+            self.masses[:n], self.physics[:n], 
+            acceleration, force, rotational_acceleration, dt
+        )
+
+        rows = np.flatnonzero(changed)
+        flags = changed[rows]
+        self.dirty[rows] |= flags
+        return rows, flags
+
+    def sync(self, rows: np.ndarray, flags: np.ndarray) -> None:
+        """
+        Propagates the transforms to the children of dirty rows, then sends one update to each node whose row changed, including the given rows
+        """
+
+        changed = np.zeros(self.size, dtype='u1')
+        changed[rows] = flags
+
+        # Recompute the transforms of children in dirty subtrees
+        rows, flags = self.propagate()
+        changed[rows] |= flags
+
+        nodes = self.nodes
+        rows = np.flatnonzero(changed)
+        for row, flag in zip(rows.tolist(), changed[rows].tolist()): nodes[row].sync_transform(flag)
+
+    def get_rows(self, nodes: list) -> np.ndarray:
+        """
+        Returns an array of the rows of the given nodes
+        """
+
+        rows = np.fromiter((node.transform_index if node.transform_store is self else -1 for node in nodes), dtype='i4', count=len(nodes))
+        if len(rows) and rows.min() < 0: raise ValueError('TransformStore: Cannot get the rows of nodes that are not in this store')
+        return rows
+
+    def clear_dirty(self) -> None:
+        """
+        Clears the dirty flags of all rows
+        """
+
+        self.dirty[:len(self.nodes)] = 0
+
+    @property
+    def size(self): return len(self.nodes)
@@ -38,9 +38,13 @@ class ParticleRenderer:
         self.particle_instances = np.zeros(shape=(1, 12), dtype='f4')
         self.instance_buffer = self.ctx.buffer(reserve=(12 * 3) * (self.particle_cube_size ** 3))
         
+        self.vbo = self.ctx.buffer(np.ascontiguousarray(mesh.vertices, dtype='f4'))
+        self.ibo = self.ctx.buffer(mesh.vertex_indices)
+        
         self.vao = self.ctx.vertex_array( self.shader.program, 
-                                        [(self.ctx.buffer(mesh.data), '3f 2f 3f 3f 3f', *['in_position', 'in_uv', 'in_normal', 'in_tangent', 'in_bitangent']), 
+                                        [(self.vbo, '3f 2f 3f 3f 3f', *['in_position', 'in_uv', 'in_normal', 'in_tangent', 'in_bitangent']), 
                                          (self.instance_buffer, '3f 1f 1f 1f /i', 'in_instance_pos', 'in_instance_mtl', 'scale', 'life')], 
+                                          index_buffer=self.ibo, index_element_size=4,
                                           skip_errors=True)
 
     def render(self) -> None:
@@ -52,7 +56,8 @@ class ParticleRenderer:
         alive_particles = get_alive(self.particle_instances)
         n = len(alive_particles)
 
-        # Write and render
+        # Orphan the buffer before writing so the driver gives a fresh allocation instead of waiting on the previous frame's draw
+        self.instance_buffer.orphan()
         self.instance_buffer.write(np.array(alive_particles[:,:6], order='C'))
         self.vao.render(instances=n)
 
@@ -90,4 +95,6 @@ class ParticleRenderer:
 
     def __del__(self):
         self.instance_buffer.release()
+        self.vbo.release()
+        self.ibo.release()
         self.vao.release()
\ No newline at end of file
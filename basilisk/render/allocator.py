@@ -0,0 +1,97 @@
+import bisect
+
+
+class Allocator():
+    capacity: int
+    """Number of units that can be allocated"""
+    free: list[list[int]]
+    """Sorted list of the [start, length] of each free range. Adjacent free ranges are always merged"""
+    used: int
+    """Number of allocated units"""
+
+    def __init__(self, capacity: int=0) -> None:
+        """
+        Free list allocator for sub allocating ranges of a GPU buffer.
+        Units are abstract, so batches may count vertices, indices or instances
+        """
+
+        self.capacity = capacity
+        self.free = [[0, capacity]] if capacity else []
+        self.used = 0
+
+    def allocate(self, length: int) -> int | None:
+        """
+        Finds the first free range that fits the given length and takes its start.
+        Returns the start of the allocated range, or None if the allocator needs to grow
+        """
+
+        for i, (start, size) in enumerate(self.free):
+            if size < length: continue
+
+            if size == length: del self.free[i]
+            else: self.free[i] = [start + length, size - length]
+
+            self.used += length
+            return start
+
+        return None
+
+    def release(self, start: int, length: int) -> None:
+        """
+        Returns a range to the free list, merging it with its neighbours
+        """
+
+        if not length: return
+
+        self.used -= length
+        i = bisect.bisect_left(self.free, [start, 0])
+
+        # Merge with the next range
+        if i < len(self.free) and self.free[i][0] == start + length:
+            length += self.free[i][1]
+            del self.free[i]
+
+        # Merge with the previous range
+        if i > 0 and sum(self.free[i - 1]) == start:
+            self.free[i - 1][1] += length
+        else: self.free.insert(i, [start, length])
+
+    def grow(self, capacity: int) -> None:
+        """
+        Extends the allocator to the given capacity. The new units are free
+        """
+
+        if capacity <= self.capacity: return
+
+        if self.free and sum(self.free[-1]) == self.capacity: self.free[-1][1] += capacity - self.capacity
+        else: self.free.append([self.capacity, capacity - self.capacity])
+        self.capacity = capacity
+
+    def reset(self, capacity: int, used: int) -> None:
+        """
+        Clears the allocator to the given capacity with the first used units allocated
+        """
+
+        self.capacity = capacity
+        self.used = used
+        self.free = [[used, capacity - used]] if capacity > used else []
+
+    @property
+    def end(self) -> int:
+        """
+        One past the last allocated unit. Units after this never need to be drawn
+        """
+
+        if self.free and sum(self.free[-1]) == self.capacity: return self.free[-1][0]
+        return self.capacity
+
+    @property
+    def holes(self) -> int:
+        """
+        Number of free units before the end of the allocated ranges
+        """
+
+        return self.end - self.used
+
+    def __repr__(self) -> str:
+        return f'<Basilisk Allocator | {self.used} / {self.capacity} used, {len(self.free)} free ranges>'
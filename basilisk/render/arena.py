@@ -0,0 +1,158 @@
+import numpy as np
+import moderngl as mgl
+from .allocator import Allocator
+from .stream_buffer import StreamBuffer
+
+# Size in bytes of one DrawElementsIndirectCommand | count, instance count, first index, base vertex, base instance
+command_size = 20
+
+
+class Arena():
+    chunk_handler: ...
+    """Back reference to the parent chunk handler"""
+    ctx: mgl.Context
+    """Reference to the context of the parent engine"""
+    shader: ...
+    """The bsk.Shader used to draw the arena"""
+    static: bool
+    """Type of chunk that the arena holds"""
+    stride: int
+    """Size of a single vertex in the arena in bytes"""
+    vbo: StreamBuffer
+    """Vertex buffer shared by the batches of all chunks in the arena"""
+    ibo: mgl.Buffer
+    """Index buffer shared by the batches of all chunks in the arena. Indices are absolute vertex indices in the arena"""
+    vertices: Allocator
+    """Allocator of the vertex buffer. Each batch owns one range of vertices"""
+    indices: Allocator
+    """Allocator of the index buffer. Each batch owns one range of indices"""
+    vaos: list[mgl.VertexArray]
+    """The vertex arrays of the arena, one for each region of the vertex buffer"""
+    commands: mgl.Buffer
+    """Indirect command buffer rebuilt every frame from the visible batches"""
+    indirect: bool
+    """True if the context supports multi draw indirect (OpenGL 4.3). Otherwise each batch is drawn with its own call"""
+
+    def __init__(self, chunk_handler, shader, static: bool, stride: int) -> None:
+        """
+        Shared vertex and index buffers for the batches of every chunk with the same shader, chunk type and vertex format.
+        All visible batches of the arena are submitted with a single indirect draw
+        """
+
+        # Back references
+        self.chunk_handler = chunk_handler
+        self.ctx = chunk_handler.ctx
+
+        self.shader = shader
+        self.static = static
+        self.stride = stride
+
+        # Set initial values
+        self.vertices = Allocator(1024)
+        self.indices  = Allocator(1024)
+        self.vbo = StreamBuffer(self.ctx, reserve=self.vertices.capacity * stride, count=1 if static else chunk_handler.engine.config.stream_buffers)
+        self.ibo = self.ctx.buffer(reserve=self.indices.capacity * 4)
+        self.commands = self.ctx.buffer(reserve=64 * command_size)
+        self.indirect = self.ctx.version_code >= 430
+
+        self.vaos = []
+        self.build_vao()
+
+    def allocate(self, allocator: Allocator, length: int) -> int:
+        """
+        Allocates a range of the given length in the vertex or index allocator, doubling the arena buffers if they are full.
+        Returns the start of the range
+        """
+
+        start = allocator.allocate(length)
+        if start is not None: return start
+
+        # Copy the old buffer into a buffer with at least double the capacity
+        capacity = max(allocator.capacity * 2, allocator.capacity + length)
+        if allocator is self.vertices: self.vbo.resize(capacity * self.stride)
+        else:
+            ibo = self.ctx.buffer(reserve=capacity * 4)
+            self.ctx.copy_buffer(ibo, self.ibo)
+            self.ibo.release()
+            self.ibo = ibo
+
+        allocator.grow(capacity)
+        self.build_vao()
+
+        return allocator.allocate(length)
+
+    def render(self, batches: list) -> int:
+        """
+        Draws the given batches of the arena in order. Uses one indirect draw if it is supported.
+        Returns the number of draw calls issued
+        """
+
+        batches = [batch for batch in batches if batch.index_count]
+        if not batches: return 0
+
+        vao = self.vao
+
+        if not self.indirect:
+            for batch in batches: vao.render(vertices=batch.index_count, first=batch.index_start)
+            return len(batches)
+
+        # One DrawElementsIndirectCommand per batch. Indices are absolute, so the base vertex is zero
+        commands = np.zeros((len(batches), 5), dtype='u4')
+        commands[:, 0] = [batch.index_count for batch in batches]
+        commands[:, 1] = 1
+        commands[:, 2] = [batch.index_start for batch in batches]
+
+        if commands.nbytes > self.commands.size:
+            size = max(commands.nbytes, self.commands.size * 2)
+            self.commands.release()
+            self.commands = self.ctx.buffer(reserve=size)
+        else: self.commands.orphan()
+
+        self.commands.write(commands)
+        vao.render_indirect(self.commands, count=len(batches))
+        return 1
+
+    @property
+    def vao(self) -> mgl.VertexArray:
+        """
+        The vertex array of the region used by the current frame
+        """
+
+        return self.vaos[self.vbo.index]
+
+    def release(self, vertex_start: int, vertex_length: int, index_start: int, index_length: int) -> None:
+        """
+        Frees the ranges of a batch. Writes still queued for the freed vertices are dropped
+        """
+
+        self.vbo.discard(vertex_start * self.stride, vertex_length * self.stride)
+        self.vertices.release(vertex_start, vertex_length)
+        self.indices.release(index_start, index_length)
+
+    def advance(self) -> None:
+        """
+        Moves the vertex buffer to its next region. Called once per frame after drawing
+        """
+
+        self.vbo.advance()
+
+    def build_vao(self) -> None:
+        """
+        Internal function to create a vertex array for each region of the vertex buffer with the index buffer
+        """
+
+        for vao in self.vaos: vao.release()
+        self.vaos = [self.ctx.vertex_array(self.shader.program, [(buffer, self.shader.fmt, *self.shader.attributes)], index_buffer=self.ibo, index_element_size=4, skip_errors=True) for buffer in self.vbo.buffers]
+
+    def __repr__(self) -> str:
+        return f'<Basilisk Arena | {self.vertices}, {self.indices}>'
+
+    def __del__(self) -> None:
+        """
+        Deallocates the arena buffers and vaos
+        """
+
+        self.vbo.release()
+        self.ibo.release()
+        self.commands.release()
+        for vao in self.vaos: vao.release()
@@ -1,6 +1,38 @@
 import numpy as np
 import moderngl as mgl
 from .shader import Shader
+from .allocator import Allocator
+from .arena import Arena
+
+class BatchData():
+    shader: Shader
+    """The shader the data is laid out for"""
+    lod: int
+    """Level of detail of the meshes in the data"""
+    lod_count: int
+    """Number of levels of detail of the most detailed mesh chain in the data"""
+    nodes: list
+    """The nodes in the data, in order"""
+    lengths: list[tuple[int, int]]
+    """Number of vertices and indices of each node"""
+    vertices: np.ndarray
+    """Vertex data of all the nodes"""
+    indices: np.ndarray
+    """Indices of all the nodes relative to the first vertex"""
+
+    def __init__(self, shader: Shader, lod: int, lod_count: int, nodes: list, lengths: list, vertices: np.ndarray, indices: np.ndarray) -> None:
+        """
+        Vertex and index data of a batch that is ready to upload
+        """
+
+        self.shader    = shader
+        self.lod       = lod
+        self.lod_count = lod_count
+        self.nodes     = nodes
+        self.lengths   = lengths
+        self.vertices  = vertices
+        self.indices   = indices
+
 
 class Batch():
     chunk: ...
@@ -9,25 +41,49 @@ class Batch():
     """Reference to the context of the parent engine"""
     shader: Shader
     """Reference to the bsk.Shader used by batches"""
-    vao: mgl.VertexArray
-    """The vertex array of the batch. Used for rendering"""
-    vbo: mgl.Buffer
-    """Buffer containing all the batch data"""
+    arena: Arena
+    """The arena holding the batch data. None if the batch is empty"""
+    vertex_start: int
+    """First vertex of the batch's range in the arena"""
+    index_start: int
+    """First index of the batch's range in the arena"""
+    stride: int
+    """Size of a single vertex in the batch in bytes"""
+    vertices: Allocator
+    """Allocator of the batch's vertex range. Each node in the batch owns one range of vertices"""
+    indices: Allocator
+    """Allocator of the batch's index range. Each node in the batch owns one range of indices"""
+    index_data: np.ndarray
+    """Copy of the batch's indices relative to its first vertex. Used to rebase the indices when the batch moves in the arena"""
+    index_ranges: dict
+    """The start and length of the index range of each node in the batch"""
+    lod: int
+    """Level of detail of the meshes in the batch. Set from the chunk's level when the batch is built"""
+    lod_count: int
+    """Number of levels of detail of the most detailed mesh chain in the batch. 1 if no mesh in the batch has simplified levels"""
 
     def __init__(self, chunk) -> None:
         """
         Basilik batch object
         Contains all the data for a chunk batch to be stored and rendered
         """
-        
+
         # Back references
         self.chunk = chunk
         self.ctx = chunk.chunk_handler.engine.ctx
         self.shader = self.chunk.get_shader()
 
         # Set intial values
-        self.vbo = None
-        self.vao = None
+        self.arena = None
+        self.vertex_start = 0
+        self.index_start = 0
+        self.stride = 0
+        self.vertices = Allocator()
+        self.indices  = Allocator()
+        self.index_data = np.zeros(0, dtype='u4')
+        self.index_ranges = {}
+        self.lod = 0
+        self.lod_count = 1
 
     def batch(self) -> bool:
         """
@@ -35,70 +91,229 @@ class Batch():
         Returns True if batch was successful.
         """
 
-        self.shader = self.chunk.get_shader()
+        return self.upload(self.prepare(self.get_nodes(), self.chunk.get_shader(), self.chunk.lod))
+
+    def get_nodes(self) -> list:
+        """
+        Gets the nodes of the chunk that are copied into the vertex batch
+        """
+
+        return [node for node in self.chunk.nodes if node.mesh and node.static == self.chunk.static and not self.chunk.instanced(node)]
+
+    def prepare(self, nodes: list, shader: Shader, lod: int) -> BatchData:
+        """
+        Assembles the vertex and index data of the given nodes for the given shader and level of detail.
+        Only reads the nodes and does not touch the GPU, so it can run on a worker thread while the current batch is drawn
+        """
 
         # Empty list to contain all vertex data of models in the chunk
         batch_data = []
+        batch_indices = []
+        lengths = []
+        lod_count = 1
 
-        # Loop through each node in the chunk, adding the nodes's mesh to batch_data
+        # Loop through each node, adding the nodes's mesh to batch_data
         index = 0
-        for node in self.chunk.nodes:
-            # Check that the node should be used
-            if not node.mesh: continue
-            if node.static != self.chunk.static: continue
-
+        for node in nodes:
             # Get the data from the node
-            node_data = node.get_data()
-            # Update the index
-            node.data_index = index
+            node_data = node.get_data(lod, shader)
+            node_indices = get_indices(node, lod)
+            lod_count = max(lod_count, get_lod_count(node))
+            batch_indices.append(node_indices + index)
+            lengths.append((len(node_data), len(node_indices)))
             index += len(node_data)
             # Add to the chunk mesh
             batch_data.append(node_data)
 
         # Combine all meshes into a single array
-        if len(batch_data) > 1: batch_data = np.vstack(batch_data)
+        if batch_data: batch_data = np.vstack(batch_data)
         else: batch_data = np.array(batch_data, dtype='f4')
+        batch_indices = np.concatenate(batch_indices) if batch_indices else np.zeros(0, dtype='u4')
+
+        return BatchData(shader, lod, lod_count, nodes, lengths, batch_data, batch_indices)
+
+    def upload(self, data: BatchData) -> bool:
+        """
+        Replaces the batch with data assembled by prepare. Must be called on the main thread.
+        Returns True if the batch has any vertices
+        """
 
+        self.shader = data.shader
+        self.lod = data.lod
+        self.lod_count = data.lod_count
+
+        # Update the range of each node
+        vertex_start = 0
+        index_start = 0
+        self.index_ranges = {}
+        for node, (vertex_length, index_length) in zip(data.nodes, data.lengths):
+            node.data_index = vertex_start
+            node.data_length = vertex_length
+            self.index_ranges[node] = (index_start, index_length)
+            vertex_start += vertex_length
+            index_start += index_length
+
+        batch_data = data.vertices
+
+        self.release()
 
         # If there are no verticies, delete the chunk
         if len(batch_data) == 0: return False
 
-        if self.vbo: self.vbo.release()
-        if self.vao: self.vao.release()
+        # The rebatched data is packed, so all free ranges are after the data
+        self.index_data = data.indices
+        self.stride = batch_data.shape[1] * batch_data.itemsize
+        self.vertices.reset(len(batch_data), len(batch_data))
+        self.indices.reset(len(self.index_data), len(self.index_data))
 
-        # Create the vbo and the vao from mesh data
-        self.vbo = self.ctx.buffer(batch_data)
-        self.vao = self.ctx.vertex_array(self.shader.program, [(self.vbo, self.shader.fmt, *self.shader.attributes)], skip_errors=True)
+        # Write the data to a range of the arena shared by chunks with the same shader
+        self.arena = self.chunk.chunk_handler.get_arena(self.shader, self.chunk.static, self.stride)
+        self.vertex_start = self.arena.allocate(self.arena.vertices, len(batch_data))
+        self.index_start  = self.arena.allocate(self.arena.indices, len(self.index_data))
+        self.arena.vbo.write(batch_data, self.vertex_start * self.stride)
+        self.arena.ibo.write(self.index_data + np.uint32(self.vertex_start), self.index_start * 4)
 
 
         return True
 
-    def swap_shader(self, shader):
+    def append(self, nodes: list) -> None:
+        """
+        Writes the data of the given nodes into free ranges of the batch.
+        Only the new nodes' data is uploaded. The batch's range doubles in size when there is no free range large enough
+        """
+
+        for node in nodes:
+            if not node.mesh: continue
+            if node.static != self.chunk.static: continue
+            if self.chunk.instanced(node): continue
+            if node in self.index_ranges: continue
+
+            node_data = self.get_data(node)
+            node_indices = get_indices(node, self.lod)
+            self.lod_count = max(self.lod_count, get_lod_count(node))
+
+            vertex_start = self.vertices.allocate(len(node_data))
+            index_start  = self.indices.allocate(len(node_indices))
+            if vertex_start is None or index_start is None:
+                if vertex_start is not None: self.vertices.release(vertex_start, len(node_data))
+                if index_start  is not None: self.indices.release(index_start, len(node_indices))
+                self.resize(max(self.vertices.capacity * 2, self.vertices.capacity + len(node_data)), max(self.indices.capacity * 2, self.indices.capacity + len(node_indices)))
+                vertex_start = self.vertices.allocate(len(node_data))
+                index_start  = self.indices.allocate(len(node_indices))
+
+            self.index_data[index_start:index_start + len(node_indices)] = node_indices + np.uint32(vertex_start)
+            self.write(node_data, vertex_start)
+            self.arena.ibo.write(self.index_data[index_start:index_start + len(node_indices)] + np.uint32(self.vertex_start), (self.index_start + index_start) * 4)
+
+            node.data_index = vertex_start
+            node.data_length = len(node_data)
+            self.index_ranges[node] = (index_start, len(node_indices))
+
+    def resize(self, vertex_capacity: int, index_capacity: int) -> None:
         """
-        Swap the shader without rebatching
+        Internal function to move the batch to larger ranges of the arena.
+        Vertices are copied on the GPU and the indices are rebased from the CPU copy
         """
-        
-        # Check there is actually something to swap
-        if not self.vao: return
-        
-        # Release old data
-        self.vao.release()
 
-        # Make new vao with old data
-        self.program = shader.program
-        self.vao = self.ctx.vertex_array(self.program, [(self.vbo, 
-                                                         '3f 2f 3f 3f 3f 3f 4f 3f 1f', 
-                                                         *['in_position', 'in_uv', 'in_normal', 'in_tangent', 'in_bitangent', 'obj_position', 'obj_rotation', 'obj_scale', 'obj_material'])], 
-                                                         skip_errors=True)
+        arena = self.arena
+        vertex_start = arena.allocate(arena.vertices, vertex_capacity)
+        index_start  = arena.allocate(arena.indices, index_capacity)
 
+        arena.vbo.copy(self.vertex_start * self.stride, vertex_start * self.stride, self.vertices.capacity * self.stride)
+        self.index_data = np.concatenate([self.index_data, np.zeros(index_capacity - len(self.index_data), dtype='u4')])
+        arena.ibo.write(self.index_data + np.uint32(vertex_start), index_start * 4)
+
+        arena.release(self.vertex_start, self.vertices.capacity, self.index_start, self.indices.capacity)
+        self.vertex_start, self.index_start = vertex_start, index_start
+        self.vertices.grow(vertex_capacity)
+        self.indices.grow(index_capacity)
+
+    def write(self, data: np.ndarray, index: int) -> None:
+        """
+        Writes vertex data to the batch starting at the given vertex
+        """
+
+        if self.arena: self.arena.vbo.write(data, (self.vertex_start + index) * self.stride)
+
+    def remove(self, node) -> None:
+        """
+        Frees the ranges of the node. Its indices are zeroed so its triangles are degenerate until the ranges are reused
+        """
+
+        if node not in self.index_ranges: return
+
+        start, length = self.index_ranges.pop(node)
+        self.index_data[start:start + length] = 0
+        if self.arena: self.arena.ibo.write(bytes(length * 4), (self.index_start + start) * 4)
+        self.indices.release(start, length)
+        self.vertices.release(node.data_index, node.data_length)
+        node.data_length = 0
+
+    def release(self) -> None:
+        """
+        Returns the batch's ranges to its arena
+        """
+
+        if self.arena: self.arena.release(self.vertex_start, self.vertices.capacity, self.index_start, self.indices.capacity)
+        self.arena = None
+        self.vertices.reset(0, 0)
+        self.indices.reset(0, 0)
+        self.index_data = np.zeros(0, dtype='u4')
+
+    @property
+    def vertex_count(self) -> int:
+        """
+        Number of vertices in the batch up to the last allocated vertex, including holes
+        """
+
+        return self.vertices.end
+
+    @property
+    def index_count(self) -> int:
+        """
+        Number of indices in the batch up to the last allocated index, including holes
+        """
+
+        return self.indices.end
+
+    @property
+    def holes(self) -> int:
+        """
+        Number of free vertices between the allocated vertices of the batch
+        """
+
+        return self.vertices.holes
+
+    def get_data(self, node) -> np.ndarray:
+        """
+        Gets the per vertex data of the node at the batch's level of detail, laid out for the batch's shader
+        """
+
+        return node.get_data(self.lod, self.shader)
 
     def __repr__(self) -> str:
-        return f'<Basilisk Batch | {self.chunk.chunk_key}, {self.vbo.size / 1024  / 1024} mb>'
+        return f'<Basilisk Batch | {self.chunk.position}, {self.vertex_count} vertices, {self.index_count} indices>'
 
     def __del__(self) -> None:
         """
-        Deallocates the mesh vbo and vao
+        Returns the batch's ranges to its arena
         """
-        
-        if self.vbo: self.vbo.release()
-        if self.vao: self.vao.release()
\ No newline at end of file
+
+        self.release()
+
+
+def get_indices(node, lod: int=0) -> np.ndarray:
+    """
+    Gets the indices of the node's batch data at the given level of detail. Nodes with per vertex materials use the unwelded mesh data, so their indices are sequential
+    """
+
+    if isinstance(node.material, list): return np.arange(len(node.mesh.data), dtype='u4')
+    return node.mesh.get_lod(lod)[1]
+
+def get_lod_count(node) -> int:
+    """
+    Gets the number of levels of detail the node can be batched with. Nodes with per vertex materials are always batched at full detail
+    """
+
+    if isinstance(node.material, list): return 1
+    return len(node.mesh.lods)
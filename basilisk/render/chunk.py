@@ -1,4 +1,8 @@
+import numpy as np
+from concurrent.futures import Future, ThreadPoolExecutor
 from .batch import Batch
+from .instance_batch import InstanceBatch
+from ..nodes.helper import get_bounds
 
 
 class Chunk():
@@ -8,10 +12,24 @@ class Chunk():
     """The position of the chunk. Used as a key in the chunk handler"""
     batch: Batch
     """Batched mesh of the chunk"""
+    instance_batches: dict
+    """Instance batches of the chunk for each mesh. Only used when instancing is enabled in the config"""
     nodes: set
     """Set conaining references to all nodes in the chunk"""
     static: bool
     """Type of node that the chunk recognizes"""
+    dirty_nodes: set
+    """Nodes whose data changed since the last flush"""
+    lod: int
+    """Level of detail the chunk's batches are drawn with. Chosen each frame from the screen size of the chunk's largest mesh"""
+    version: int
+    """Counts the nodes added to and removed from the chunk. Used to detect background batch data that no longer matches the chunk's nodes"""
+    job: Future
+    """Background assembly of the chunk's next vertex batch. None if no batch is being assembled"""
+    job_version: int
+    """Version of the chunk when the background batch was started"""
+    job_dirty: set
+    """Nodes whose data changed while the background batch was assembled. They are written again after the batch is uploaded"""
 
     def __init__(self, chunk_handler, position: tuple, static: bool, shader=None) -> None:
         """
@@ -29,17 +47,27 @@ class Chunk():
         self.shader = shader
 
         # Create empty batch
+        self.lod = 0
         self.batch = Batch(self)
+        self.instance_batches = {}
 
         # Create empty set for chunk's nodes
         self.nodes = set()
+        self.dirty_nodes = set()
 
-    def render(self) -> None:
+        # No batch is assembled in the background until the first rebatch
+        self.version = 0
+        self.job = None
+        self.job_version = 0
+        self.job_dirty = set()
+
+    def enqueue(self, queue, depth: float) -> None:
         """
-        Renders the chunk mesh
+        Adds the chunk's instance batches to the render queue at the given view depth. The vertex batch is drawn by its arena with the batches of the other visible chunks
         """
 
-        if self.batch.vao: self.batch.vao.render()
+        for batch in self.instance_batches.values():
+            if batch.vao: queue.add(batch.shader, depth, batch.vao, batch.render)
 
     def update(self) -> bool:
         """
@@ -49,13 +77,273 @@ class Chunk():
         # Check if there are no nodes in the chunk
         if not self.nodes: return False
         # Batch the chunk nodes, return success bit
-        return self.batch.batch()
+        self.dirty_nodes.clear()
+        self.cancel()
+
+        groups = self.update_instances()
+
+        # Fit the bounds to the current nodes since moved and removed nodes may have left them too large
+        self.update_bounds()
+
+        return self.batch.batch() or bool(groups)
+
+    def update_async(self, pool: ThreadPoolExecutor) -> bool:
+        """
+        Batches all the node meshes in the chunk, assembling the vertex batch data on the given thread pool.
+        The current vertex batch stays on screen until finish uploads the new data. Instance batches are rebuilt immediately.
+        Chunks without an uploaded vertex batch have nothing to keep on screen, so they are batched immediately
+        """
+
+        if not self.nodes:
+            self.cancel()
+            return False
+
+        groups = self.update_instances()
+        self.update_bounds()
+
+        # Batches without nodes are cleared immediately and new batches are drawn on the frame their nodes are added
+        nodes = self.batch.get_nodes()
+        if not nodes or not self.batch.arena:
+            self.dirty_nodes.clear()
+            self.cancel()
+            return self.batch.batch() or bool(groups)
+
+        # Replace any batch that is still being assembled from older nodes
+        self.cancel()
+        self.job = pool.submit(self.batch.prepare, nodes, self.get_shader(), self.lod)
+        self.job_version = self.version
+        self.chunk_handler.pending_chunks.add(self)
+
+        return True
+
+    def finish(self) -> bool:
+        """
+        Uploads the vertex batch assembled in the background once it is ready. Returns True if no batch is being assembled anymore.
+        If nodes were added to or removed from the chunk in the meantime, the data is discarded and the chunk is rebatched
+        """
+
+        if not self.job: return True
+        if not self.job.done(): return False
+
+        job, self.job = self.job, None
+        dirty, self.job_dirty = self.job_dirty, set()
+
+        if self.version != self.job_version:
+            self.chunk_handler.updated_chunks.add(self)
+            return True
+
+        self.batch.upload(job.result())
+
+        # Nodes that changed after the data was assembled are written to the new batch on the next flush
+        if dirty:
+            self.dirty_nodes |= dirty
+            self.chunk_handler.dirty_chunks.add(self)
+
+        return True
+
+    def cancel(self) -> None:
+        """
+        Stops waiting for the vertex batch being assembled in the background. The current batch is kept
+        """
+
+        if self.job: self.job.cancel()
+        self.job = None
+        self.job_dirty = set()
+
+    def update_instances(self) -> dict:
+        """
+        Internal function to rebuild the instance batches of the chunk. Returns the instanced nodes grouped by mesh
+        """
+
+        # Nodes drawn as instances are batched by mesh, the rest are copied into the vertex batch
+        groups = self.get_instance_groups(self.nodes)
+        for mesh in [mesh for mesh in self.instance_batches if mesh not in groups]: self.instance_batches.pop(mesh).release()
+        for mesh, nodes in groups.items():
+            if mesh not in self.instance_batches: self.instance_batches[mesh] = InstanceBatch(self, mesh)
+            self.instance_batches[mesh].batch(nodes)
+
+        return groups
+
+    def append(self, nodes: list) -> None:
+        """
+        Writes nodes that were added or moved into this chunk into the free ranges of the existing batches without rebatching
+        """
+
+        nodes = [node for node in nodes if node in self.nodes and not node.data_length]
+        if not nodes: return
+        self.update_bounds(nodes)
+
+        for mesh, group in self.get_instance_groups(nodes).items():
+            if mesh not in self.instance_batches: self.instance_batches[mesh] = InstanceBatch(self, mesh)
+            self.instance_batches[mesh].append(group)
+
+        nodes = [node for node in nodes if not self.instanced(node)]
+        if not nodes: return
+        if self.batch.arena: self.batch.append(nodes)
+        elif self.job: self.chunk_handler.updated_chunks.add(self) # The batch being assembled does not contain the nodes
+        else: self.batch.batch()
+
+    def instanced(self, node) -> bool:
+        """
+        Determines if the node is drawn as an instance of its mesh instead of being copied into the vertex batch.
+        Nodes with custom mesh formats or per vertex materials are always copied
+        """
+
+        return self.chunk_handler.engine.config.instancing and bool(node.mesh) and not node.mesh.custom and not isinstance(node.material, list)
+
+    def get_instance_groups(self, nodes) -> dict:
+        """
+        Internal function to group the given nodes that are drawn as instances by their mesh
+        """
+
+        groups = {}
+        if not self.chunk_handler.engine.config.instancing: return groups
+
+        for node in nodes:
+            if node.static == self.static and self.instanced(node): groups.setdefault(node.mesh, []).append(node)
+        return groups
+
+    def get_batch(self, node) -> Batch | InstanceBatch:
+        """
+        Returns the batch containing the node's data
+        """
+
+        batch = self.instance_batches.get(node.mesh)
+        if batch and node in batch.nodes: return batch
+        return self.batch
+
+    @property
+    def batched(self) -> bool:
+        """
+        True if the chunk has batch data that new nodes can be appended to
+        """
+
+        return self.batch.arena is not None or bool(self.instance_batches)
+
+    @property
+    def size(self) -> int:
+        """
+        Number of vertices and instances in the chunk's batches, including holes
+        """
+
+        return self.batch.vertex_count + sum(batch.instance_count for batch in self.instance_batches.values())
+
+    def update_bounds(self, nodes=None) -> None:
+        """
+        Grows the bounding box of the chunk in the chunk index to contain the meshes of the given nodes.
+        If no nodes are given, the box is fit to all the nodes in the chunk
+        """
+
+        index = self.chunk_handler.chunk_index
+        if nodes is None:
+            nodes = self.nodes
+            index.set_bounds(self, np.inf, -np.inf)
+
+        nodes = [node for node in nodes if node.mesh]
+        if not nodes: return
+
+        minimums, maximums = get_bounds(nodes)
+        radius = np.linalg.norm(maximums - minimums, axis=1).max() / 2
+        index.expand_bounds(self, minimums.min(axis=0), maximums.max(axis=0), radius)
+
+    @property
+    def lod_count(self) -> int:
+        """
+        Number of levels of detail of the most detailed mesh chain in the chunk's batches
+        """
+
+        return max([self.batch.lod_count] + [len(mesh.lods) for mesh in self.instance_batches])
+
+    def select_lod(self, level: float) -> None:
+        """
+        Changes the chunk's level of detail if the given continuous level passed the current level's bounds by the hysteresis margin.
+        Instance batches switch their mesh buffers immediately, the vertex batch is rebuilt at the new level on the next update
+        """
+
+        margin = self.chunk_handler.engine.config.lod_hysteresis
+        if self.lod - margin <= level < self.lod + 1 + margin: return
+
+        lod = min(max(int(np.floor(level)), 0), self.lod_count - 1)
+        if lod == self.lod: return
+
+        self.lod = lod
+        for batch in self.instance_batches.values(): batch.set_lod(lod)
+        if self.batch.lod_count > 1: self.chunk_handler.updated_chunks.add(self)
+
+    def advance(self) -> None:
+        """
+        Moves the streaming buffers of the chunk's instance batches to their next region. The vertex batch is advanced by its arena
+        """
+
+        for batch in self.instance_batches.values(): batch.advance()
+
+    @property
+    def stream_count(self) -> int:
+        """
+        Number of regions in the vertex and instance buffers of the chunk's batches. Static chunks are rarely written, so they use a single region
+        """
+
+        return 1 if self.static else self.chunk_handler.engine.config.stream_buffers
+
+    @property
+    def holes(self) -> int:
+        """
+        Number of free vertices and instances between the allocated ranges of the chunk's batches
+        """
+
+        return self.batch.holes + sum(batch.holes for batch in self.instance_batches.values())
+
+    def contains(self, node, margin: float) -> bool:
+        """
+        Determines if the node is within the bounds of the chunk, extended by the given margin on every side
+        """
+
+        size = self.chunk_handler.engine.config.chunk_size
+        x, y, z = self.position
+        return (x * size - margin <= node.x < (x + 1) * size + margin and
+                y * size - margin <= node.y < (y + 1) * size + margin and
+                z * size - margin <= node.z < (z + 1) * size + margin)
 
     def node_update_callback(self, node):
-        if not self.batch.vbo: return
-        
-        data = node.get_data()
-        self.batch.vbo.write(data, node.data_index * data.shape[1] * 4)
+        """
+        Records that the node's data changed. The data is written once when the chunk handler flushes
+        """
+
+        self.dirty_nodes.add(node)
+        self.chunk_handler.dirty_chunks.add(self)
+        if self.job: self.job_dirty.add(node)
+
+    def flush(self) -> None:
+        """
+        Writes the data of all changed nodes to their batches, merging nodes with adjacent ranges into single writes
+        """
+
+        # The bounds only grow between rebatches, so nodes moving within the chunk are never culled
+        if self.dirty_nodes: self.update_bounds(self.dirty_nodes)
+
+        # Nodes that are not in the current batch are written when the chunk is rebatched
+        nodes = sorted((node for node in self.dirty_nodes if node.data_length), key=lambda node: node.data_index)
+        self.dirty_nodes.clear()
+        if not nodes: return
+
+        # Write the nodes of each batch separately
+        batches = {}
+        for node in nodes: batches.setdefault(self.get_batch(node), []).append(node)
+
+        for batch, nodes in batches.items():
+            start  = end = nodes[0].data_index
+            run    = []
+
+            for node in nodes:
+                # Write the current run when the next node is not adjacent to it
+                if node.data_index != end:
+                    batch.write(np.vstack(run) if len(run) > 1 else run[0], start)
+                    start, run = node.data_index, []
+
+                run.append(batch.get_data(node))
+                end = node.data_index + node.data_length
+
+            batch.write(np.vstack(run) if len(run) > 1 else run[0], start)
 
     def add(self, node):
         """
@@ -63,7 +351,10 @@ class Chunk():
         """
 
         self.nodes.add(node)
+        self.version += 1
         node.chunk = self
+        # The node is not in this chunk's batch until the next rebatch
+        node.data_length = 0
 
         return node
 
@@ -75,7 +366,12 @@ class Chunk():
         if node == None: return
 
         self.nodes.remove(node)
-        if self.batch and self.batch.vbo: self.batch.vbo.clear()
+        self.version += 1
+        self.dirty_nodes.discard(node)
+
+        # Free the node's range instead of clearing the whole buffer. The range is reused by the next node appended to the batch
+        self.get_batch(node).remove(node)
+        node.data_length = 0
 
         return node
 
@@ -91,10 +387,21 @@ class Chunk():
 
     def swap_shader(self, shader):
         """
-        Swaps the batches shader to the given shader
+        Swaps the batches shader to the given shader. 
+        The vertex batch is rebatched into the arena of the new shader on the next update
         """
         
-        self.batch.swap_shader(shader)
+        if self.batch.arena: self.chunk_handler.updated_chunks.add(self)
+        for batch in self.instance_batches.values(): batch.swap_shader(shader)
+
+    def release(self) -> None:
+        """
+        Returns the vertex batch's ranges to its arena and deallocates the instance batches. Called when the chunk is removed, so the ranges are freed without waiting for garbage collection
+        """
+
+        self.batch.release()
+        for batch in self.instance_batches.values(): batch.release()
+        self.instance_batches.clear()
 
     def __repr__(self) -> str:
         return f'<Basilisk Chunk | {self.position}, {len(self.nodes)} nodes, {"static" if self.static else "dynamic"}>'
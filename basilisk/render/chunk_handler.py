@@ -1,6 +1,14 @@
 import numpy as np
 import moderngl as mgl
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 from .chunk import Chunk
+from .chunk_index import ChunkIndex
+from .arena import Arena
+from .frustum import Frustum
+from .occlusion import OcclusionBuffer
+from .render_queue import RenderQueue
+from .packing import pack_vertices
 from ..nodes.node import Node
 
 
@@ -17,6 +25,28 @@ class ChunkHandler():
     """List containing two dictionaries for dynamic and static chunks repsectivly"""
     updated_chunks: set
     """Set containing recently updated chunks"""
+    dirty_chunks: set
+    """Set containing chunks with node data that has not been written to the GPU"""
+    appended_chunks: dict
+    """Chunks with nodes that moved into them, which are appended to the existing batches instead of rebatching"""
+    mesh_buffers: dict
+    """Vertex and index buffers of the meshes drawn with instancing, shared by all chunks"""
+    arenas: dict
+    """Shared vertex and index buffers of the chunk batches, keyed by shader, chunk type and vertex size"""
+    chunk_index: ChunkIndex
+    """Bounding boxes of all existing chunks. Used to cull the chunks outside the camera's view"""
+    frustum: Frustum
+    """View frustum of the scene camera. Updated every render"""
+    occluders: set
+    """Nodes marked as occluders. Their meshes are drawn into the occlusion buffer every render"""
+    occlusion: OcclusionBuffer
+    """Software depth buffer of the occluders. Used to cull the chunks hidden behind them"""
+    queue: RenderQueue
+    """Sorts the draws of each frame by shader and depth. Holds the draw call and state change counts of the last frame"""
+    pool: ThreadPoolExecutor
+    """Worker threads that assemble chunk batch data in the background. None until the first background rebatch"""
+    pending_chunks: set
+    """Chunks with a vertex batch being assembled in the background"""
     
     def __init__(self, scene) -> None:
         # Reference to the scene hadlers and variables
@@ -34,26 +64,79 @@ class ChunkHandler():
         self.shader_groups = {None : ({}, {})}
         # self.chunks         = [{}, {}]
         self.updated_chunks = set()
+        self.dirty_chunks   = set()
+        self.appended_chunks = {}
+        self.mesh_buffers = {}
+        self.arenas = {}
+        self.chunk_index = ChunkIndex()
+        self.frustum = Frustum()
+        self.occluders = set()
+        self.occlusion = OcclusionBuffer()
+        self.queue = RenderQueue()
+        self.pool = None
+        self.pending_chunks = set()
 
 
     def render(self) -> None:
         """
-        Renders all the chunk batches in the camera's range
-        Includes some view culling, but not frustum culling. 
+        Renders all the chunk batches in the camera's view.
+        Chunks are culled by testing their bounding boxes against the camera frustum,
+        then the visible batches of each arena and the instance batches are submitted through the render queue, grouped by shader and front to back
         """
-        
-        # Gets a rectanglur prism of chunks in the cameras view
-        render_range_x, render_range_y, render_range_z = self.get_render_range()
 
-        chunk_keys = [(x, y, z) for x in range(*render_range_x) for y in range(*render_range_y) for z in range(*render_range_z)]
+        # Upload the batches that finished assembling and write any node changes made since the last update
+        self.collect()
+        self.flush()
+
+        chunks = self.get_visible_chunks()
+        self.select_lods(chunks)
+
+        # Chunks are queued nearest first so each arena's indirect commands are ordered front to back as well
+        distances = self.chunk_index.get_distances(chunks, self.scene.camera.position) if chunks else []
+        arenas = {}
+        for distance, chunk in sorted(zip(distances, chunks), key=lambda item: item[0]):
+            if chunk.batch.arena: arenas.setdefault(chunk.batch.arena, (distance, []))[1].append(chunk.batch)
+            chunk.enqueue(self.queue, distance)
+
+        for arena, (distance, batches) in arenas.items(): self.queue.add(arena.shader, distance, arena.vao, partial(arena.render, batches))
+        self.queue.submit()
+
+        # Dynamic chunks write the next frame's changes to regions the GPU is not drawing from
+        for arena in self.arenas.values(): arena.advance()
+        for group in self.shader_groups.values():
+            for chunk in group[0].values(): chunk.advance()
+
+    def get_visible_chunks(self) -> list[Chunk]:
+        """
+        Returns the chunks within the render distance that are at least partly inside the camera's frustum.
+        If there are occluders in the scene, chunks hidden behind them are removed
+        """
+
+        camera = self.scene.camera
+        matrix = camera.m_proj * camera.m_view
+        self.frustum.update(matrix)
+
+        chunk_size = self.engine.config.chunk_size
+        center = (int(camera.position.x // chunk_size), int(camera.position.y // chunk_size), int(camera.position.z // chunk_size))
+
+        if not self.occluders: return self.chunk_index.query(self.frustum, center, self.engine.config.render_distance)
+
+        self.occlusion.update(matrix, self.occluders)
+        return self.chunk_index.query(self.frustum, center, self.engine.config.render_distance, self.occlusion)
+
+    def select_lods(self, chunks: list[Chunk]) -> None:
+        """
+        Chooses the level of detail of each given chunk from the screen size of its largest mesh at the nearest point of the chunk's bounds.
+        Each level after the first is used when the size is half the size of the level before
+        """
 
-        # Loop through all chunks in view and render
-        for shader, group in self.shader_groups.items():
-            if shader == None: shader = self.engine.shader            
-            for chunk in chunk_keys:
-                # Render the chunk if it exists
-                if chunk in group[0]: group[0][chunk].render()
-                if chunk in group[1]: group[1][chunk].render()
+        chunks = [chunk for chunk in chunks if chunk.lod_count > 1]
+        if not chunks: return
+
+        camera = self.scene.camera
+        sizes = self.chunk_index.get_sizes(chunks, camera.position, camera.m_proj[1][1])
+        levels = np.log2(self.engine.config.lod_size / np.maximum(sizes, 1e-9))
+        for chunk, level in zip(chunks, levels.tolist()): chunk.select_lod(level)
 
 
     def update(self) -> None:           
@@ -63,20 +146,89 @@ class ChunkHandler():
 
         self.program = self.scene.engine.shader.program
 
-        # Loop through the set of updated chunk keys and update the chunk
+        # Upload the batches that finished assembling since the last frame
+        self.collect()
+
+        # Move nodes that left their chunks and append them to their new batches
+        self.migrate()
+        for chunk, nodes in self.appended_chunks.items():
+            if chunk in self.updated_chunks: continue # The nodes are included when the chunk is rebatched
+            chunk.append(nodes)
+        self.appended_chunks.clear()
+
+        # Loop through the set of updated chunk keys and update the chunk. The vertex batches are assembled in the background if enabled
         removes = []
+        pool = self.get_pool()
 
         for chunk in self.updated_chunks: 
-            if chunk.update(): continue
+            if chunk.update_async(pool) if pool else chunk.update(): continue
             removes.append(chunk)
 
         # Remove any empty chunks
         for chunk in removes:
             del self.shader_groups[chunk.shader][chunk.static][chunk.position]
+            self.chunk_index.remove(chunk)
+            self.pending_chunks.discard(chunk)
+            chunk.release()
 
         # Clears the set of updated chunks so that they are not updated unless they are updated again
         self.updated_chunks.clear()
 
+        # Write the nodes that changed in the remaining chunks
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the data of all nodes that changed since the last flush to their batches
+        """
+
+        for chunk in self.dirty_chunks: chunk.flush()
+        self.dirty_chunks.clear()
+
+    def collect(self) -> None:
+        """
+        Uploads the vertex batches assembled in the background that are ready
+        """
+
+        if not self.pending_chunks: return
+        self.pending_chunks = {chunk for chunk in self.pending_chunks if not chunk.finish()}
+
+    def get_pool(self) -> ThreadPoolExecutor | None:
+        """
+        Returns the thread pool used to assemble batch data in the background, creating it on first use. None if background batching is disabled in the config
+        """
+
+        threads = self.engine.config.batch_threads
+        if not threads: return None
+        if not self.pool: self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='basilisk-batch')
+        return self.pool
+
+    def get_mesh_buffers(self, mesh, indices: tuple, lod: int=0, packed: tuple=None) -> tuple[mgl.Buffer, mgl.Buffer]:
+        """
+        Returns a vertex buffer with the given attribute columns of the welded vertices of the mesh's level of detail and the level's index buffer.
+        If the (attribute, format) pairs of a packed shader are given, the vertices are packed into that format instead.
+        Buffers are shared by all instance batches of the mesh
+        """
+
+        lod = min(lod, len(mesh.lods) - 1)
+        key = (mesh, indices, lod, packed)
+        if key not in self.mesh_buffers: 
+            vertices, vertex_indices = mesh.get_lod(lod)
+            if packed: vbo = self.ctx.buffer(pack_vertices(vertices, [attribute for attribute, _ in packed], [fmt for _, fmt in packed]))
+            else: vbo = self.ctx.buffer(np.ascontiguousarray(np.take(vertices, indices, axis=1), dtype='f4'))
+            ibo = self.ctx.buffer(np.ascontiguousarray(vertex_indices, dtype='u4'))
+            self.mesh_buffers[key] = (vbo, ibo)
+        return self.mesh_buffers[key]
+
+    def get_arena(self, shader, static: bool, stride: int) -> Arena:
+        """
+        Returns the arena for batches with the given shader, chunk type and vertex size, creating it if it does not exist
+        """
+
+        key = (shader, static, stride)
+        if key not in self.arenas: self.arenas[key] = Arena(self, shader, static, stride)
+        return self.arenas[key]
+
     def update_all(self):
         self.program = self.scene.engine.shader.program
         for shader in self.shader_groups.values():
@@ -90,6 +242,21 @@ class ChunkHandler():
         Adds an existing node to its chunk. Updates the node's chunk reference
         """
 
+        # Add the node to the chunk
+        chunk = self.get_chunk(node)
+        chunk.add(node)
+
+        # Write the node into the existing batches of the chunk. New chunks are batched normally
+        if chunk.batched and chunk not in self.updated_chunks: self.appended_chunks.setdefault(chunk, []).append(node)
+        else: self.updated_chunks.add(chunk)
+
+        return Node
+
+    def get_chunk(self, node: Node) -> Chunk:
+        """
+        Returns the chunk that the node belongs in at its current position, creating it if it does not exist
+        """
+
         # The key of the chunk the node will be added to
         chunk_size = self.engine.config.chunk_size
         chunk_key = (int(node.x // chunk_size), int(node.y // chunk_size), int(node.z // chunk_size))
@@ -99,17 +266,38 @@ class ChunkHandler():
             self.shader_groups[shader] = ({}, {})
 
         # Ensure that the chunk exists
-        if chunk_key not in self.shader_groups[shader][node.static]:
-            chunk = Chunk(self, chunk_key, node.static, shader)
-            self.shader_groups[shader][node.static][chunk_key] = chunk
+        chunks = self.shader_groups[shader][node.static]
+        if chunk_key not in chunks: 
+            chunks[chunk_key] = Chunk(self, chunk_key, node.static, shader)
+            self.chunk_index.add(chunks[chunk_key])
 
-        # Add the node to the chunk
-        self.shader_groups[shader][node.static][chunk_key].add(node)
+        return chunks[chunk_key]
 
-        # Update the chunk
-        self.updated_chunks.add(self.shader_groups[shader][node.static][chunk_key])
+    def migrate(self) -> None:
+        """
+        Moves nodes that travelled past the border of their chunk into the chunk they are now in.
+        Nodes must pass the border by the hysteresis margin so that nodes jittering on a border do not move back and forth every frame.
+        """
 
-        return Node
+        margin = self.engine.config.chunk_size * self.engine.config.chunk_hysteresis
+
+        # Only nodes that changed since the last flush can have moved
+        moved = [node for chunk in self.dirty_chunks for node in chunk.dirty_nodes if not chunk.contains(node, margin)]
+        for node in moved: self.move(node)
+
+    def move(self, node: Node) -> None:
+        """
+        Moves a node to the chunk at its current position. 
+        The node's old ranges are freed and its data is written into the new chunk's batches on the next update
+        """
+
+        self.remove(node)
+        chunk = self.get_chunk(node)
+        chunk.add(node)
+
+        # New chunks are batched normally
+        if chunk.batched and chunk not in self.updated_chunks: self.appended_chunks.setdefault(chunk, []).append(node)
+        else: self.updated_chunks.add(chunk)
 
     def remove(self, node: Node) -> None:
         """
@@ -123,37 +311,18 @@ class ChunkHandler():
         chunk.remove(node)
         node.chunk = None
 
-        # Update the chunk
-        self.updated_chunks.add(chunk)
+        # Removed nodes leave free ranges that new nodes reuse, so the chunk is only compacted once it is empty or mostly holes
+        if not chunk.nodes or chunk.holes * 2 > chunk.size: self.updated_chunks.add(chunk)
 
-    def get_render_range(self) -> tuple:
+    def update_static(self, node: Node) -> None:
         """
-        Returns a rectangluar prism of chunks that are in the camera's view.
-        Tuple return is in form ((x1, x2), (y1, y2), (z1, z2))
+        Moves a node between the static and dynamic chunks after its static state changed
         """
-        
-        cam_position = self.scene.camera.position  # glm.vec3(x, y, z)
-        fov = 40  # The range in which a direction will not be culled
 
-        # Default to a cube of chunks around the camera extending view_distance chunks in each direction
-        chunk_size = self.engine.config.chunk_size
-        render_distance = self.engine.config.render_distance
-        render_range_x = [int(cam_position.x // chunk_size - render_distance), int(cam_position.x // chunk_size + render_distance + 1)]
-        render_range_y = [int(cam_position.y // chunk_size - render_distance), int(cam_position.y // chunk_size + render_distance + 1)]
-        render_range_z = [int(cam_position.z // chunk_size - render_distance), int(cam_position.z // chunk_size + render_distance + 1)]
+        if not node.chunk or node.chunk.static == node.static: return
 
-        # Remove chunks that the camera is facing away from
-        render_range_x[1] -= render_distance * (180 - fov < self.scene.camera.yaw < 180 + fov) - 1
-        render_range_x[0] += render_distance * (-fov < self.scene.camera.yaw < fov or self.scene.camera.yaw > 360 - fov) - 1
+        self.move(node)
 
-        render_range_y[0] += render_distance * (self.scene.camera.pitch > 25) - 1
-        render_range_y[1] -= render_distance * (self.scene.camera.pitch < -25) - 1
-
-        render_range_z[1] -= render_distance * (270 - fov < self.scene.camera.yaw < 270 + fov) - 1
-        render_range_z[0] += render_distance * (90 - fov < self.scene.camera.yaw < 90 + fov) - 1
-
-        return (render_range_x, render_range_y, render_range_z)
-    
     def swap_default(self, shader):
         """
         Swaps the shader of the default chunks
@@ -0,0 +1,132 @@
+import numpy as np
+from .frustum import Frustum
+from .occlusion import OcclusionBuffer
+
+
+class ChunkIndex():
+    chunks: list
+    """List of the indexed chunks. The position of a chunk in this list is its row in the arrays"""
+    keys: np.ndarray
+    """(capacity, 3) array of the chunk keys of each chunk"""
+    minimums: np.ndarray
+    """(capacity, 3) array of the minimum corner of the bounding box of each chunk"""
+    maximums: np.ndarray
+    """(capacity, 3) array of the maximum corner of the bounding box of each chunk"""
+    radii: np.ndarray
+    """(capacity,) array of the largest bounding radius of a mesh in each chunk. Used to choose the level of detail of the chunk"""
+
+    def __init__(self) -> None:
+        """
+        Flat index of the bounding boxes of all existing chunks.
+        Visibility is tested against every existing chunk at once with numpy instead of looking up every chunk key in range
+        """
+
+        self.chunks = []
+        self.rows = {}
+
+        self.keys     = np.zeros((16, 3), dtype='i4')
+        self.minimums = np.zeros((16, 3), dtype='f4')
+        self.maximums = np.zeros((16, 3), dtype='f4')
+        self.radii    = np.zeros(16, dtype='f4')
+
+    def add(self, chunk) -> None:
+        """
+        Adds a chunk to the index with an empty bounding box
+        """
+
+        if chunk in self.rows: return
+
+        # Double the arrays when they are full
+        row = len(self.chunks)
+        if row == len(self.keys):
+            self.keys     = np.concatenate([self.keys,     np.zeros_like(self.keys)])
+            self.minimums = np.concatenate([self.minimums, np.zeros_like(self.minimums)])
+            self.maximums = np.concatenate([self.maximums, np.zeros_like(self.maximums)])
+            self.radii    = np.concatenate([self.radii,    np.zeros_like(self.radii)])
+
+        self.chunks.append(chunk)
+        self.rows[chunk] = row
+        self.keys[row] = chunk.position
+        self.minimums[row] = np.inf
+        self.maximums[row] = -np.inf
+        self.radii[row] = 0
+
+    def remove(self, chunk) -> None:
+        """
+        Removes a chunk from the index by moving the last chunk into its row
+        """
+
+        if chunk not in self.rows: return
+
+        row  = self.rows.pop(chunk)
+        last = self.chunks.pop()
+        if last is chunk: return
+
+        self.chunks[row] = last
+        self.rows[last] = row
+        self.keys[row]     = self.keys[len(self.chunks)]
+        self.minimums[row] = self.minimums[len(self.chunks)]
+        self.maximums[row] = self.maximums[len(self.chunks)]
+        self.radii[row]    = self.radii[len(self.chunks)]
+
+    def set_bounds(self, chunk, minimum: np.ndarray, maximum: np.ndarray, radius: float=0) -> None:
+        """
+        Sets the bounding box and mesh radius of the chunk
+        """
+
+        row = self.rows.get(chunk)
+        if row is None: return
+        self.minimums[row] = minimum
+        self.maximums[row] = maximum
+        self.radii[row] = radius
+
+    def expand_bounds(self, chunk, minimum: np.ndarray, maximum: np.ndarray, radius: float=0) -> None:
+        """
+        Grows the bounding box of the chunk to contain the given box and its mesh radius to at least the given radius
+        """
+
+        row = self.rows.get(chunk)
+        if row is None: return
+        np.minimum(self.minimums[row], minimum, out=self.minimums[row])
+        np.maximum(self.maximums[row], maximum, out=self.maximums[row])
+        self.radii[row] = max(self.radii[row], radius)
+
+    def query(self, frustum: Frustum, center: tuple, distance: int, occlusion: OcclusionBuffer=None) -> list:
+        """
+        Returns the chunks with bounding boxes inside the frustum and keys within the given number of chunks of the center key.
+        If an occlusion buffer is given, chunks hidden behind its occluders are removed as well
+        """
+
+        n = len(self.chunks)
+        if not n: return []
+
+        # Chunks out of the render distance or with empty bounds are skipped before the plane tests
+        candidates = np.all(np.abs(self.keys[:n] - center) <= distance, axis=1) & np.all(self.minimums[:n] <= self.maximums[:n], axis=1)
+        rows = np.flatnonzero(candidates)
+        rows = rows[frustum.test_boxes(self.minimums[rows], self.maximums[rows])]
+        if occlusion: rows = rows[occlusion.test_boxes(self.minimums[rows], self.maximums[rows])]
+
+        return [self.chunks[row] for row in rows.tolist()]
+
+    def get_sizes(self, chunks: list, position, scale: float) -> np.ndarray:
+        """
+        Returns the screen size of the largest mesh of each given chunk as seen from the given position, as a fraction of the screen height.
+        The distance is measured to the nearest point of the chunk's bounding box and scale is the vertical scale of the projection
+        """
+
+        rows = np.array([self.rows[chunk] for chunk in chunks], dtype='i8')
+        return self.radii[rows] * scale / np.maximum(self.get_distances(chunks, position), 1e-6)
+
+    def get_distances(self, chunks: list, position) -> np.ndarray:
+        """
+        Returns the distance from the given position to the nearest point of the bounding box of each given chunk. Zero if the position is inside the box
+        """
+
+        rows = np.array([self.rows[chunk] for chunk in chunks], dtype='i8')
+        position = np.array(position, dtype='f4')
+
+        offsets = np.maximum(np.maximum(self.minimums[rows] - position, position - self.maximums[rows]), 0)
+        return np.linalg.norm(offsets, axis=1)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
@@ -41,8 +41,9 @@ class Frame:
         Renders the current frame to the screen
         """
 
-        for process in self.post_processes:
-            self.ping_pong_buffer = process.apply(self.framebuffer, self.ping_pong_buffer)
+        profiler = self.engine.profiler
+        for i, process in enumerate(self.post_processes):
+            with profiler.measure(f'post_process_{i}'): self.ping_pong_buffer = process.apply(self.framebuffer, self.ping_pong_buffer)
             
             temp = self.framebuffer
             self.framebuffer = self.ping_pong_buffer
@@ -51,7 +52,7 @@ class Frame:
         self.ctx.screen.use()
         self.shader.program['screenTexture'] = 0
         self.framebuffer.texture.use(location=0)
-        self.vao.render()
+        with profiler.measure('frame'): self.vao.render()
 
 
     def use(self) -> None:
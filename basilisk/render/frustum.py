@@ -0,0 +1,57 @@
+import numpy as np
+import glm
+
+
+class Frustum():
+    planes: np.ndarray
+    """(6, 4) array of the left, right, bottom, top, near and far planes. Each row is a normalized (normal.xyz, distance) with the normal facing inwards"""
+
+    def __init__(self, matrix: glm.mat4x4=None) -> None:
+        """
+        View frustum of a camera extracted from its combined projection and view matrix.
+        Used to cull axis aligned boxes that are not on screen
+        """
+
+        self.planes = np.zeros((6, 4), dtype='f4')
+        if matrix is not None: self.update(matrix)
+
+    def update(self, matrix: glm.mat4x4) -> None:
+        """
+        Extracts the planes from the given clip matrix, usually camera.m_proj * camera.m_view
+        """
+
+        # glm matrices are column major, so the transpose holds the rows of the matrix
+        rows = np.array(matrix.to_list(), dtype='f4').T
+
+        self.planes[0] = rows[3] + rows[0] # left
+        self.planes[1] = rows[3] - rows[0] # right
+        self.planes[2] = rows[3] + rows[1] # bottom
+        self.planes[3] = rows[3] - rows[1] # top
+        self.planes[4] = rows[3] + rows[2] # near
+        self.planes[5] = rows[3] - rows[2] # far
+
+        self.planes /= np.linalg.norm(self.planes[:, :3], axis=1, keepdims=True)
+
+    def test_boxes(self, minimums: np.ndarray, maximums: np.ndarray) -> np.ndarray:
+        """
+        Tests an (n, 3) array of box minimums and maximums against the frustum.
+        Returns a boolean array that is True for boxes that are at least partly inside. Boxes near the corners of the frustum may give false positives
+        """
+
+        centers = (minimums + maximums) / 2
+        extents = (maximums - minimums) / 2
+
+        # A box is outside if its corner furthest along the normal of any plane is behind that plane
+        distances = centers @ self.planes[:, :3].T + self.planes[:, 3]
+        radii     = extents @ np.abs(self.planes[:, :3]).T
+        return np.all(distances + radii >= 0, axis=1)
+
+    def test_box(self, minimum: glm.vec3, maximum: glm.vec3) -> bool:
+        """
+        Tests a single box against the frustum. Returns True if the box is at least partly inside
+        """
+
+        return bool(self.test_boxes(np.array([minimum], dtype='f4'), np.array([maximum], dtype='f4'))[0])
+
+    def __repr__(self) -> str:
+        return f'<Basilisk Frustum | {self.planes.tolist()}>'
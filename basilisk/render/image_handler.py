@@ -28,18 +28,22 @@ class ImageHandler():
         self.images = []
         self.texture_arrays = {size : [] for size in texture_sizes}
 
-    def add(self, image: any) -> None:
+    def add(self, image: any, regenerate: bool=True) -> bool:
         """
         Adds an existing basilisk image object to the handler for writting
         Args:
             image: bsk.Image
                 The existing image that is to be added to the scene.
+            regenerate: bool
+                Regenerates the texture arrays immediately. Pass False to regenerate once after adding many images.
+        Returns True if the image was not already in the handler
         """
         
-        if image in self.images: return
+        if image in self.images: return False
 
         self.images.append(image)
-        self.write(regenerate=True)
+        if regenerate: self.write(regenerate=True)
+        return True
 
     def generate_texture_array(self) -> None:
         """
@@ -0,0 +1,270 @@
+import numpy as np
+import moderngl as mgl
+from .shader import Shader, attribute_mappings, packed_attributes
+from .packing import pack_vertices, get_stride
+from .allocator import Allocator
+from .stream_buffer import StreamBuffer
+from ..mesh.mesh import Mesh
+
+# Number of floats in the vertex data of a mesh. Attributes mapped past this are read from the instance buffer
+mesh_width = 14
+
+
+class InstanceBatch():
+    chunk: ...
+    """Reference to the parent chunk of the batch"""
+    ctx: mgl.Context
+    """Reference to the context of the parent engine"""
+    mesh: Mesh
+    """The mesh drawn for every instance in the batch"""
+    shader: Shader
+    """Reference to the bsk.Shader used by the batch"""
+    vaos: list[mgl.VertexArray]
+    """The vertex arrays of the batch, one for each region of the instance buffer. Read vertex attributes from the mesh buffer and object attributes from the instance buffer"""
+    vbo: StreamBuffer
+    """Buffer containing the per instance data of the batch. Dynamic chunks rotate through several regions so that writes do not wait on draws"""
+    mesh_vbo: mgl.Buffer
+    """Vertex buffer of the mesh. Shared by all instance batches of the mesh"""
+    mesh_ibo: mgl.Buffer
+    """Index buffer of the mesh. Shared by all instance batches of the mesh"""
+    stride: int
+    """Size of a single instance in the batch in bytes"""
+    instances: Allocator
+    """Allocator of the instance buffer. Each node in the batch owns one instance"""
+    nodes: set
+    """Nodes that have an instance in the batch"""
+    lod: int
+    """Level of detail of the mesh drawn for the instances"""
+
+    def __init__(self, chunk, mesh: Mesh) -> None:
+        """
+        Basilisk instance batch object.
+        Draws all the nodes of a chunk that share a mesh with one mesh buffer and a per instance buffer
+        """
+
+        # Back references
+        self.chunk = chunk
+        self.ctx   = chunk.chunk_handler.engine.ctx
+        self.mesh  = mesh
+
+        # Set intial values
+        self.vbo = None
+        self.vaos = []
+        self.instances = Allocator()
+        self.nodes = set()
+        self.lod = chunk.lod
+
+        self.set_shader(chunk.get_shader())
+
+    def set_shader(self, shader: Shader) -> None:
+        """
+        Internal function to split the attributes of the shader between the mesh buffer and the instance buffer
+        """
+
+        self.shader = shader
+        self.vertex_attributes,   self.vertex_fmt,   self.vertex_indices    = [], [], []
+        self.instance_attributes, self.instance_fmt, self.instance_indices  = [], [], []
+
+        for attribute, fmt in zip(shader.attributes, shader.fmt.split()):
+            if attribute in packed_attributes: indices = packed_attributes[attribute][1]
+            else: indices = attribute_mappings.get(attribute, [0] * int(fmt[0]))
+            if (attribute in attribute_mappings or attribute in packed_attributes) and indices[0] >= mesh_width:
+                self.instance_attributes.append(attribute)
+                self.instance_fmt.append(fmt)
+                self.instance_indices.extend(index - mesh_width for index in indices)
+            else:
+                self.vertex_attributes.append(attribute)
+                self.vertex_fmt.append(fmt)
+                self.vertex_indices.extend(indices)
+
+        self.stride   = get_stride(self.instance_fmt)
+        self.mesh_vbo, self.mesh_ibo = self.get_mesh_buffers()
+
+    def set_lod(self, lod: int) -> None:
+        """
+        Draws the instances with the given level of detail of the mesh. Only the vertex arrays are rebuilt since the mesh buffers are shared
+        """
+
+        if lod == self.lod: return
+
+        self.lod = lod
+        self.mesh_vbo, self.mesh_ibo = self.get_mesh_buffers()
+        if not self.vbo: return
+        self.release_vaos()
+        self.build_vao()
+
+    def get_mesh_buffers(self) -> tuple[mgl.Buffer, mgl.Buffer]:
+        """
+        Internal function to get the shared mesh buffers with the vertex attributes of the shader at the batch's level of detail
+        """
+
+        packed = tuple(zip(self.vertex_attributes, self.vertex_fmt)) if self.shader.packed else None
+        return self.chunk.chunk_handler.get_mesh_buffers(self.mesh, tuple(self.vertex_indices), self.lod, packed)
+
+    def get_data(self, node) -> np.ndarray:
+        """
+        Gets the instance data of the node with the attributes used by the shader
+        """
+
+        if self.shader.packed: return pack_vertices(node.get_instance_data()[None], self.instance_attributes, self.instance_fmt, mesh_width)
+        return node.get_instance_data()[self.instance_indices]
+
+    def batch(self, nodes: list) -> bool:
+        """
+        Writes the instance data of the given nodes to a new instance buffer.
+        Returns True if there are any instances.
+        """
+
+        self.nodes = set(nodes)
+        self.instances.reset(len(nodes), len(nodes))
+        if self.vbo: self.vbo.release()
+        self.release_vaos()
+        self.vbo = None
+
+        if not nodes: return False
+
+        for index, node in enumerate(nodes):
+            node.data_index  = index
+            node.data_length = 1
+
+        self.vbo = StreamBuffer(self.ctx, np.vstack([self.get_data(node) for node in nodes]), count=self.chunk.stream_count)
+        self.build_vao()
+
+        return True
+
+    def append(self, nodes: list) -> None:
+        """
+        Writes the instance data of the given nodes into free instances of the batch.
+        The instance buffer doubles in size when it is full
+        """
+
+        if not self.vbo:
+            self.batch(nodes)
+            return
+
+        size = self.vbo.size
+        for node in nodes:
+            if node in self.nodes: continue
+
+            index = self.instances.allocate(1)
+            if index is None:
+                # Copy the old data into a buffer with double the capacity
+                capacity = self.instances.capacity * 2
+                self.vbo.resize(capacity * self.stride)
+                self.instances.grow(capacity)
+                index = self.instances.allocate(1)
+
+            self.vbo.write(self.get_data(node), index * self.stride)
+            node.data_index  = index
+            node.data_length = 1
+            self.nodes.add(node)
+
+        # The vertex arrays reference the old buffers if they grew
+        if self.vbo.size != size:
+            self.release_vaos()
+            self.build_vao()
+
+    def write(self, data: np.ndarray, index: int) -> None:
+        """
+        Writes instance data to the batch starting at the given instance
+        """
+
+        if self.vbo: self.vbo.write(data, index * self.stride)
+
+    def remove(self, node) -> None:
+        """
+        Frees the instance of the node and zeros its data so it is not drawn until the instance is reused
+        """
+
+        if node not in self.nodes: return
+
+        self.nodes.discard(node)
+        if self.vbo and node.data_length: 
+            self.vbo.write(bytes(self.stride), node.data_index * self.stride)
+            self.instances.release(node.data_index, 1)
+        node.data_length = 0
+
+    def advance(self) -> None:
+        """
+        Moves the instance buffer to its next region. Called once per frame after drawing
+        """
+
+        if self.vbo: self.vbo.advance()
+
+    def build_vao(self) -> None:
+        """
+        Internal function to create a vertex array from the mesh buffer and each region of the instance buffer
+        """
+
+        self.vaos = [self.ctx.vertex_array(self.shader.program, [
+            (self.mesh_vbo, ' '.join(self.vertex_fmt), *self.vertex_attributes),
+            (buffer, ' '.join(self.instance_fmt) + ' /i', *self.instance_attributes)
+        ], index_buffer=self.mesh_ibo, index_element_size=4, skip_errors=True) for buffer in self.vbo.buffers]
+
+    def release_vaos(self) -> None:
+        """
+        Internal function to release the vertex arrays of the batch
+        """
+
+        for vao in self.vaos: vao.release()
+        self.vaos = []
+
+    @property
+    def vao(self) -> mgl.VertexArray | None:
+        """
+        The vertex array of the region used by the current frame
+        """
+
+        return self.vaos[self.vbo.index] if self.vaos else None
+
+    def render(self) -> int:
+        """
+        Draws every instance in the batch with a single call. Returns the number of draw calls issued
+        """
+
+        if not self.vao: return 0
+        self.vao.render(instances=self.instance_count)
+        return 1
+
+    @property
+    def instance_count(self) -> int:
+        """
+        Number of instances in the batch up to the last allocated instance, including holes
+        """
+
+        return self.instances.end
+
+    @property
+    def holes(self) -> int:
+        """
+        Number of free instances between the allocated instances of the batch
+        """
+
+        return self.instances.holes
+
+    def swap_shader(self, shader: Shader) -> None:
+        """
+        Swaps the shader of the batch. The instance data is rebuilt since the new shader may use different attributes
+        """
+
+        self.set_shader(shader)
+        self.batch(list(self.nodes))
+
+    def __repr__(self) -> str:
+        return f'<Basilisk Instance Batch | {self.chunk.position}, {self.instance_count} instances>'
+
+    def release(self) -> None:
+        """
+        Deallocates the instance vbo and vaos. The mesh buffers are shared and owned by the chunk handler
+        """
+
+        if self.vbo: self.vbo.release()
+        self.vbo = None
+        self.release_vaos()
+
+    def __del__(self) -> None:
+        """
+        Deallocates the instance vbo and vaos
+        """
+
+        self.release()
@@ -23,6 +23,13 @@ class Light():
         self.intensity = intensity
         self.color = color
 
+    def changed(self) -> None:
+        """
+        Internal function to tell the light handler that the light changed. Changes are written once per frame when the scene renders
+        """
+
+        if self.light_handler: self.light_handler.changed(self)
+
     @property 
     def intensity(self): return self._intensity
     @property
@@ -34,7 +41,7 @@ class Light():
             self._intensity = value
         else:
             raise TypeError(f"Light: Invalid intensity value type {type(value)}. Expected float or int")
-        self.light_handler.write()
+        self.changed()
 
     @color.setter
     def color(self, value: tuple | list | glm.vec3 | np.ndarray):
@@ -45,7 +52,7 @@ class Light():
             self._color = glm.vec3(value)
         else:
             raise TypeError(f"Light: Invalid color value type {type(value)}. Expected tuple, list, glm.vec3, or numpy array")
-        self.light_handler.write()
+        self.changed()
 
 class DirectionalLight(Light):
     direction: glm.vec3
@@ -86,7 +93,7 @@ class DirectionalLight(Light):
             self._direction = glm.normalize(glm.vec3(value))
         else:
             raise TypeError(f"Light: Invalid direction value type {type(value)}. Expected tuple, list, glm.vec3, or numpy array")
-        self.light_handler.write()
+        self.changed()
         
     @ambient.setter
     def ambient(self, value: float | int):
@@ -94,4 +101,144 @@ class DirectionalLight(Light):
             self._ambient = value
         else:
             raise TypeError(f"Light: Invalid ambient value type {type(value)}. Expected float or int")
-        self.light_handler.write()
\ No newline at end of file
+        self.changed()
+
+
+class PointLight(Light):
+    position: glm.vec3
+    """The position of the light"""
+    radius: float
+    """Distance from the light where its brightness reaches zero. Fragments further away are not lit by the light"""
+
+    def __init__(self, position: tuple=(0, 0, 0), radius: float=10.0, intensity: float=1.0, color: tuple=(255, 255, 255), light_handler=None):
+        """
+        Point light for Basilisk Engine.
+        Shines in every direction from its position, fading out at its radius. Add it to a scene with scene.add
+        Args:
+            position: tuple
+                The position of the light
+            radius: float
+                Distance from the light where its brightness reaches zero
+            intensity: float
+                The brightness of the light
+            color: tuple
+                The color of the light
+        """
+
+        super().__init__(light_handler, intensity, color)
+        self.position = position
+        self.radius = radius
+
+    @property
+    def position(self): return self._position
+    @property
+    def radius(self):   return self._radius
+
+    @position.setter
+    def position(self, value: tuple | list | glm.vec3 | np.ndarray):
+        if isinstance(value, tuple) or isinstance(value, list) or isinstance(value, np.ndarray):
+            if len(value) != 3: raise ValueError(f"Light: Invalid number of values for position. Expected 3 values, got {len(value)} values")
+            self._position = glm.vec3(value)
+        elif isinstance(value, glm.vec3):
+            self._position = glm.vec3(value)
+        else:
+            raise TypeError(f"Light: Invalid position value type {type(value)}. Expected tuple, list, glm.vec3, or numpy array")
+        self.changed()
+
+    @radius.setter
+    def radius(self, value: float | int):
+        if isinstance(value, float) or isinstance(value, int):
+            if value <= 0: raise ValueError(f"Light: Invalid radius {value}. Expected a positive value")
+            self._radius = value
+        else:
+            raise TypeError(f"Light: Invalid radius value type {type(value)}. Expected float or int")
+        self.changed()
+
+    def get_data(self) -> list:
+        """
+        Gets the light data written to the light texture. Three rgba texels of position and radius, color and inner cone cosine, direction and outer cone cosine
+        """
+
+        color = self.color / 255.0 * self.intensity
+        return [*self.position, self.radius, *color, -1.0, 0.0, 0.0, -1.0, -2.0]
+
+
+class SpotLight(PointLight):
+    direction: glm.vec3
+    """The direction the light shines in"""
+    angle: float
+    """Angle in degrees between the direction and the edge of the cone of light"""
+    blend: float
+    """Fraction of the cone's angle over which the light fades out towards the edge"""
+
+    def __init__(self, position: tuple=(0, 0, 0), direction: tuple=(0, -1, 0), angle: float=30.0, blend: float=0.2, radius: float=10.0, intensity: float=1.0, color: tuple=(255, 255, 255), light_handler=None):
+        """
+        Spot light for Basilisk Engine.
+        Shines in a cone around its direction from its position, fading out at its radius. Add it to a scene with scene.add
+        Args:
+            position: tuple
+                The position of the light
+            direction: tuple
+                The direction the light shines in
+            angle: float
+                Angle in degrees between the direction and the edge of the cone of light
+            blend: float
+                Fraction of the cone's angle over which the light fades out towards the edge
+            radius: float
+                Distance from the light where its brightness reaches zero
+            intensity: float
+                The brightness of the light
+            color: tuple
+                The color of the light
+        """
+
+        super().__init__(position, radius, intensity, color, light_handler)
+        self.direction = direction
+        self.angle = angle
+        self.blend = blend
+
+    @property
+    def direction(self): return self._direction
+    @property
+    def angle(self):     return self._angle
+    @property
+    def blend(self):     return self._blend
+
+    @direction.setter
+    def direction(self, value: tuple | list | glm.vec3 | np.ndarray):
+        if isinstance(value, tuple) or isinstance(value, list) or isinstance(value, np.ndarray):
+            if len(value) != 3: raise ValueError(f"Light: Invalid number of values for direction. Expected 3 values, got {len(value)} values")
+            self._direction = glm.normalize(glm.vec3(value))
+        elif isinstance(value, glm.vec3):
+            self._direction = glm.normalize(glm.vec3(value))
+        else:
+            raise TypeError(f"Light: Invalid direction value type {type(value)}. Expected tuple, list, glm.vec3, or numpy array")
+        self.changed()
+
+    @angle.setter
+    def angle(self, value: float | int):
+        if isinstance(value, float) or isinstance(value, int):
+            if not 0 < value < 90: raise ValueError(f"Light: Invalid angle {value}. Expected a value between 0 and 90 degrees")
+            self._angle = value
+        else:
+            raise TypeError(f"Light: Invalid angle value type {type(value)}. Expected float or int")
+        self.changed()
+
+    @blend.setter
+    def blend(self, value: float | int):
+        if isinstance(value, float) or isinstance(value, int):
+            if not 0 <= value <= 1: raise ValueError(f"Light: Invalid blend {value}. Expected a value between 0 and 1")
+            self._blend = value
+        else:
+            raise TypeError(f"Light: Invalid blend value type {type(value)}. Expected float or int")
+        self.changed()
+
+    def get_data(self) -> list:
+        """
+        Gets the light data written to the light texture. Three rgba texels of position and radius, color and inner cone cosine, direction and outer cone cosine
+        """
+
+        color = self.color / 255.0 * self.intensity
+        outer = np.cos(np.radians(self.angle))
+        inner = np.cos(np.radians(self.angle * (1 - self.blend)))
+        return [*self.position, self.radius, *color, max(inner, outer + 1e-4), *self.direction, outer]
@@ -0,0 +1,135 @@
+import numpy as np
+import glm
+
+
+class LightClusters():
+    size: tuple
+    """Number of clusters across the screen width, the screen height and the view depth"""
+    near: float
+    """View depth where the first depth slice starts"""
+    far: float
+    """View depth where the last depth slice ends"""
+    grid: np.ndarray
+    """(depth, height * width, 2) array of the start and length of each cluster's range in the light indices"""
+    indices: np.ndarray
+    """Indices of the lights affecting each cluster, in order of the clusters"""
+
+    def __init__(self, size: tuple=(16, 9, 24), near: float=0.1, far: float=350) -> None:
+        """
+        Divides the view frustum into a grid of clusters and finds the lights that can reach each cluster.
+        Clusters split the screen into tiles and the view depth into slices of exponentially increasing thickness,
+        so clusters are roughly cube shaped at every depth
+        """
+
+        if len(size) != 3 or min(size) < 1: raise ValueError(f'LightClusters: Invalid cluster grid size {size}. Expected three positive integers')
+        if not 0 < near < far: raise ValueError(f'LightClusters: Invalid depth range {near} to {far}')
+
+        self.size    = tuple(int(count) for count in size)
+        self.near    = near
+        self.far     = far
+        self.grid    = np.zeros((self.size[2], self.size[0] * self.size[1], 2), dtype='f4')
+        self.indices = np.zeros(0, dtype='f4')
+
+    @property
+    def depth_scale(self) -> float:
+        """
+        Number of depth slices per unit of the log of the view depth. The slice of a depth is log(depth / near) * depth_scale
+        """
+
+        return self.size[2] / np.log(self.far / self.near)
+
+    def assign(self, view: glm.mat4x4, projection: glm.mat4x4, positions: np.ndarray, radii: np.ndarray) -> None:
+        """
+        Assigns lights given by (n, 3) world space positions and (n,) radii to every cluster their sphere of influence may touch.
+        The grid and indices are rebuilt every call
+        """
+
+        width, height, depth = self.size
+        self.grid[:] = 0
+        if not len(positions):
+            self.indices = np.zeros(0, dtype='f4')
+            return
+
+        # View space centers. Matrices are stored for multiplying row vectors
+        view_matrix = np.array(view.to_list(), dtype='f4')
+        projection_matrix = np.array(projection.to_list(), dtype='f4')
+        centers = np.hstack([positions, np.ones((len(positions), 1), dtype='f4')]) @ view_matrix
+        distances = -centers[:, 2]
+
+        # Depth range of each sphere, clamped to the clustered range
+        nearest  = np.maximum(distances - radii, self.near)
+        farthest = np.minimum(distances + radii, self.far)
+        in_range = nearest < farthest
+
+        # Screen bounds of the part of each sphere's box in front of the near plane
+        signs = np.array([[x, y] for x in (-1, 1) for y in (-1, 1)], dtype='f4')
+        corners = np.empty((len(positions), 8, 4), dtype='f4')
+        for i, corner_depth in enumerate((nearest, farthest)):
+            corners[:, i * 4:(i + 1) * 4, :2] = centers[:, None, :2] + signs[None] * radii[:, None, None]
+            corners[:, i * 4:(i + 1) * 4, 2] = -corner_depth[:, None]
+        corners[:, :, 3] = 1
+        clip = corners @ projection_matrix
+        screen = clip[:, :, :2] / np.maximum(clip[:, :, 3:], 1e-6) * 0.5 + 0.5
+        minimums, maximums = screen.min(axis=1), screen.max(axis=1)
+        in_range &= np.all(minimums < 1, axis=1) & np.all(maximums > 0, axis=1)
+
+        # Cluster ranges of each light
+        x0 = np.clip(np.floor(minimums[:, 0] * width), 0, width - 1).astype('i8')
+        x1 = np.clip(np.floor(maximums[:, 0] * width), 0, width - 1).astype('i8')
+        y0 = np.clip(np.floor(minimums[:, 1] * height), 0, height - 1).astype('i8')
+        y1 = np.clip(np.floor(maximums[:, 1] * height), 0, height - 1).astype('i8')
+        z0 = np.clip(np.floor(np.log(nearest / self.near) * self.depth_scale), 0, depth - 1).astype('i8')
+        z1 = np.clip(np.floor(np.log(np.maximum(farthest, self.near) / self.near) * self.depth_scale), 0, depth - 1).astype('i8')
+
+        lights = np.flatnonzero(in_range)
+        if not len(lights):
+            self.indices = np.zeros(0, dtype='f4')
+            return
+        x0, x1, y0, y1, z0, z1 = x0[lights], x1[lights], y0[lights], y1[lights], z0[lights], z1[lights]
+
+        # Expand each light's box of clusters into one (cluster, light) pair per cluster
+        spans = np.stack([x1 - x0 + 1, y1 - y0 + 1, z1 - z0 + 1], axis=1)
+        counts = np.prod(spans, axis=1)
+        owners = np.repeat(np.arange(len(lights)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        x = x0[owners] + local % spans[owners, 0]
+        y = y0[owners] + (local // spans[owners, 0]) % spans[owners, 1]
+        z = z0[owners] + local // (spans[owners, 0] * spans[owners, 1])
+        clusters = (z * height + y) * width + x
+
+        # Group the pairs by cluster
+        order = np.argsort(clusters, kind='stable')
+        self.indices = lights[owners[order]].astype('f4')
+        cluster_counts = np.bincount(clusters, minlength=width * height * depth)
+        self.grid[:, :, 0] = (np.cumsum(cluster_counts) - cluster_counts).reshape(depth, height * width)
+        self.grid[:, :, 1] = cluster_counts.reshape(depth, height * width)
+
+    def get_cluster(self, view: glm.mat4x4, projection: glm.mat4x4, position: glm.vec3) -> tuple | None:
+        """
+        Gets the (x, y, z) cluster containing the given world space position. None if the position is outside the clustered frustum
+        """
+
+        view_position = view * glm.vec4(position, 1.0)
+        clip = projection * view_position
+        distance = -view_position.z
+        if distance <= 0 or clip.w <= 0: return None
+
+        width, height, depth = self.size
+        x = int(np.floor((clip.x / clip.w * 0.5 + 0.5) * width))
+        y = int(np.floor((clip.y / clip.w * 0.5 + 0.5) * height))
+        z = int(np.floor(np.log(max(distance, self.near) / self.near) * self.depth_scale))
+        if not (0 <= x < width and 0 <= y < height and z < depth): return None
+        return x, y, min(max(z, 0), depth - 1)
+
+    def get_lights(self, cluster: tuple) -> np.ndarray:
+        """
+        Gets the indices of the lights assigned to the given (x, y, z) cluster
+        """
+
+        x, y, z = cluster
+        start, count = self.grid[z, y * self.size[0] + x].astype('i8')
+        return self.indices[start:start + count].astype('i8')
+
+    def __repr__(self) -> str:
+        return f'<Basilisk Light Clusters | {self.size[0]}x{self.size[1]}x{self.size[2]}, {len(self.indices)} light assignments>'
@@ -1,6 +1,17 @@
 import moderngl as mgl
 import glm
-from ..render.light import DirectionalLight
+import numpy as np
+from ..render.light import Light, DirectionalLight, PointLight
+from ..render.light_clusters import LightClusters
+from ..render.camera import NEAR, FAR
+
+# Texture units of the point light textures
+LIGHTS_SLOT   = 10
+CLUSTERS_SLOT = 11
+INDICES_SLOT  = 12
+
+# Width of the light index texture. Indices wrap onto the next row
+INDICES_WIDTH = 1024
 
 
 class LightHandler():
@@ -13,7 +24,23 @@ class LightHandler():
     directional_light: DirectionalLight
     """The directional light of the scene"""
     point_lights: list
-    """List of all the point lights in the scene"""
+    """List of all the point and spot lights in the scene"""
+    clusters: LightClusters
+    """Assigns the point lights to the clusters of the camera's view every frame"""
+    light_texture: mgl.Texture
+    """Texture with three rgba texels of data for each point light"""
+    cluster_texture: mgl.Texture
+    """Texture with the start and length of each cluster's range in the index texture"""
+    index_texture: mgl.Texture
+    """Texture with the indices of the lights affecting each cluster"""
+    directional_changed: bool
+    """Flag for if a directional light changed since the lights were last written"""
+    point_changed: bool
+    """Flag for if a point light was added, removed or changed since the lights were last written"""
+    written_shaders: set
+    """Shaders the directional lights have been written to"""
+    cluster_shaders: set
+    """Shaders the texture units and cluster grid of the point lights have been written to"""
 
     def __init__(self, scene) -> None:
         """
@@ -25,14 +52,97 @@ class LightHandler():
         self.engine = scene.engine
         self.ctx    = scene.engine.ctx
 
+        # Light changes are written once per frame
+        self.directional_changed = False
+        self.point_changed       = False
+        self.written_shaders     = set()
+        self.cluster_shaders     = set()
+
         # Intialize light variables
         self.directional_lights = None
         self.directional_lights = [DirectionalLight(self, direction=dir, intensity=intensity) for dir, intensity in zip(((1, -1, 1), (-.1, 3, -.1)), (1, .05))]
         self.point_lights       = []
 
+        # Point light data. Textures grow with the number of lights and light assignments
+        self.clusters        = LightClusters(self.engine.config.light_clusters, NEAR, FAR)
+        self.light_data      = np.zeros((0, 12), dtype='f4')
+        self.light_texture   = self.ctx.texture((3, 1), components=4, dtype='f4')
+        self.cluster_texture = self.ctx.texture((self.clusters.grid.shape[1], self.clusters.grid.shape[0]), components=2, dtype='f4')
+        self.index_texture   = self.ctx.texture((INDICES_WIDTH, 1), components=1, dtype='f4')
+        for texture in (self.light_texture, self.cluster_texture, self.index_texture): texture.filter = (mgl.NEAREST, mgl.NEAREST)
+
         # Initalize uniforms
         self.write()
 
+    def add(self, light: PointLight) -> PointLight:
+        """
+        Adds a point or spot light to the scene
+        """
+
+        if not isinstance(light, PointLight): raise TypeError(f'LightHandler.add: Invalid light type {type(light)}. Expected PointLight or SpotLight')
+        if light in self.point_lights: return light
+
+        light.light_handler = self
+        self.point_lights.append(light)
+        self.point_changed = True
+
+        return light
+
+    def remove(self, light: PointLight) -> PointLight | None:
+        """
+        Removes a point or spot light from the scene
+        """
+
+        if light not in self.point_lights: return None
+
+        self.point_lights.remove(light)
+        light.light_handler = None
+        self.point_changed = True
+
+        return light
+
+    def changed(self, light: Light) -> None:
+        """
+        Records that a light changed so it is written on the next render
+        """
+
+        if isinstance(light, PointLight): self.point_changed = True
+        else: self.directional_changed = True
+
+    def render(self) -> None:
+        """
+        Writes the lights that changed since the last frame, then assigns the point lights to the clusters of the camera's view
+        and writes the cluster data to every shader that uses it
+        """
+
+        # Directional lights are also written to shaders added since they were last written
+        if self.directional_changed or not self.written_shaders >= self.engine.shader_handler.shaders: self.write()
+        if self.point_changed: self.write_point_lights()
+
+        camera = self.scene.camera
+        self.clusters.assign(camera.m_view, camera.m_proj, self.light_data[:, :3], self.light_data[:, 3])
+        self.write_clusters()
+
+        for shader in self.engine.shader_handler.shaders:
+            if 'pointLightsTexture' not in shader.uniforms: continue
+
+            program = shader.program
+            program['numPointLights'].write(glm.int32(len(self.point_lights)))
+
+            # Texture units and the cluster grid do not change, so they are written once per shader
+            if shader in self.cluster_shaders: continue
+            self.cluster_shaders.add(shader)
+
+            program['pointLightsTexture']   = LIGHTS_SLOT
+            program['lightClustersTexture'] = CLUSTERS_SLOT
+            program['lightIndicesTexture']  = INDICES_SLOT
+            program['clusterGrid'].write(glm.ivec3(self.clusters.size))
+            program['clusterDepth'].write(glm.vec2(self.clusters.near, self.clusters.depth_scale))
+
+        self.light_texture.use(location=LIGHTS_SLOT)
+        self.cluster_texture.use(location=CLUSTERS_SLOT)
+        self.index_texture.use(location=INDICES_SLOT)
+
     def write(self, program: mgl.Program=None, directional=True, point=False) -> None:
         """
         Writes all the lights in a scene to the given shader program
@@ -42,7 +152,7 @@ class LightHandler():
 
         for shader in self.engine.shader_handler.shaders:
             if 'numDirLights' not in shader.uniforms: continue
-            
+
             program = shader.program
 
             if directional and self.directional_lights and 'numDirLights' in self.engine.shader.uniforms:
@@ -54,6 +164,54 @@ class LightHandler():
                     program[f'dirLights[{i}].intensity'].write(glm.float32(light.intensity))
                     program[f'dirLights[{i}].color'    ].write(light.color / 255.0)
                     program[f'dirLights[{i}].ambient'  ].write(glm.float32(light.ambient))
-            
-            if point:
-                ...
\ No newline at end of file
+
+        if directional:
+            self.directional_changed = False
+            self.written_shaders = set(self.engine.shader_handler.shaders)
+        if point: self.write_point_lights()
+
+    def write_point_lights(self) -> None:
+        """
+        Writes the data of all point lights to the light texture with a single write
+        """
+
+        self.point_changed = False
+        self.light_data = np.array([light.get_data() for light in self.point_lights], dtype='f4').reshape(-1, 12)
+        if not len(self.light_data): return
+
+        # The texture holds a power of two number of lights so it is rarely recreated
+        if self.light_texture.height < len(self.light_data):
+            self.light_texture.release()
+            self.light_texture = self.ctx.texture((3, 2 ** int(np.ceil(np.log2(len(self.light_data))))), components=4, dtype='f4')
+            self.light_texture.filter = (mgl.NEAREST, mgl.NEAREST)
+
+        self.light_texture.write(self.light_data, viewport=(0, 0, 3, len(self.light_data)))
+
+    def write_clusters(self) -> None:
+        """
+        Writes the cluster grid and the light indices of the clusters to their textures
+        """
+
+        self.cluster_texture.write(self.clusters.grid)
+
+        indices = self.clusters.indices
+        if not len(indices): return
+
+        # Indices are padded to whole rows. The texture holds a power of two number of rows so it is rarely recreated
+        rows = -(-len(indices) // INDICES_WIDTH)
+        if self.index_texture.height < rows:
+            self.index_texture.release()
+            self.index_texture = self.ctx.texture((INDICES_WIDTH, 2 ** int(np.ceil(np.log2(rows)))), components=1, dtype='f4')
+            self.index_texture.filter = (mgl.NEAREST, mgl.NEAREST)
+
+        data = np.zeros(rows * INDICES_WIDTH, dtype='f4')
+        data[:len(indices)] = indices
+        self.index_texture.write(data, viewport=(0, 0, INDICES_WIDTH, rows))
+
+    def __del__(self) -> None:
+        """
+        Releases the point light textures
+        """
+
+        for texture in (getattr(self, 'light_texture', None), getattr(self, 'cluster_texture', None), getattr(self, 'index_texture', None)):
+            if texture: texture.release()
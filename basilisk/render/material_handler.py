@@ -15,6 +15,8 @@ class MaterialHandler():
     """ModernGL texture containing all the material data for materials in the engine"""
     image_handler: ImageHandler=None
     """Handler for all images in the game"""
+    deferred: bool=False
+    """When True, texture regeneration is postponed until flush is called"""
   
     def __init__(self, engine) -> None:
         """
@@ -30,6 +32,12 @@ class MaterialHandler():
         self.materials = []
         self.data_texture = None
 
+        # Pending regenerations and writes while deferred
+        self.deferred = False
+        self.regenerate_images    = False
+        self.regenerate_materials = False
+        self.write_shaders        = False
+
         self.image_handler = ImageHandler(engine)
 
     def add(self, material: Material) -> None:
@@ -47,17 +55,44 @@ class MaterialHandler():
             # Update the material's handler
             mtl.material_handler = self
             # Add images
-            if mtl.texture: self.image_handler.add(mtl.texture)
-            if mtl.normal:  self.image_handler.add(mtl.normal)
+            if mtl.texture: self.regenerate_images |= self.image_handler.add(mtl.texture, regenerate=not self.deferred)
+            if mtl.normal:  self.regenerate_images |= self.image_handler.add(mtl.normal,  regenerate=not self.deferred)
 
-            # Add the material
+            # Add the material. The index matches the one given when the texture is generated
+            mtl.index = len(self.materials)
             self.materials.append(mtl)
 
             write = True
 
-        
+        if not write: return
+
         # Write materials
-        if write: self.write(regenerate=True)
+        if self.deferred: self.regenerate_materials = True
+        else: self.write(regenerate=True)
+
+    def defer(self) -> None:
+        """
+        Postpones image and material texture regeneration until flush is called
+        """
+
+        self.deferred = True
+
+    def flush(self) -> None:
+        """
+        Regenerates the image and material textures once if materials were added while deferred, then writes them to all shaders.
+        Nothing is written if no materials or shaders were added while deferred
+        """
+
+        self.deferred = False
+        if not (self.regenerate_images or self.regenerate_materials or self.write_shaders): return
+
+        if self.regenerate_images: self.image_handler.write(regenerate=True)
+        else: self.image_handler.write()
+        self.write(regenerate=self.regenerate_materials)
+
+        self.regenerate_images    = False
+        self.regenerate_materials = False
+        self.write_shaders        = False
 
     def generate_material_texture(self) -> None:
         """
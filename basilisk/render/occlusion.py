@@ -0,0 +1,230 @@
+import numpy as np
+import glm
+from numba import njit
+
+# Smallest clip space w of a rasterized point. Occluder triangles are clipped to this plane in front of the camera
+NEAR_W = 1e-3
+
+
+@njit
+def rasterize_triangle(depth, a, b, c):
+    """
+    Writes the nearest view depth of a clip space triangle in front of the camera to each depth pixel whose center it covers
+    """
+    height, width = depth.shape
+
+    # Screen positions in pixels and inverse depths, which are linear in screen space
+    ax, ay, aw = (a[0] / a[3] * 0.5 + 0.5) * width, (a[1] / a[3] * 0.5 + 0.5) * height, 1 / a[3]
+    bx, by, bw = (b[0] / b[3] * 0.5 + 0.5) * width, (b[1] / b[3] * 0.5 + 0.5) * height, 1 / b[3]
+    cx, cy, cw = (c[0] / c[3] * 0.5 + 0.5) * width, (c[1] / c[3] * 0.5 + 0.5) * height, 1 / c[3]
+
+    area = (bx - ax) * (cy - ay) - (cx - ax) * (by - ay)
+    if abs(area) < 1e-12: return
+
+    # Pixels whose centers are inside the bounds of the triangle
+    x0 = max(int(np.ceil(min(ax, bx, cx) - 0.5)), 0)
+    x1 = min(int(np.floor(max(ax, bx, cx) - 0.5)), width - 1)
+    y0 = max(int(np.ceil(min(ay, by, cy) - 0.5)), 0)
+    y1 = min(int(np.floor(max(ay, by, cy) - 0.5)), height - 1)
+
+    for y in range(y0, y1 + 1):
+        py = y + 0.5
+        for x in range(x0, x1 + 1):
+            px = x + 0.5
+            # Barycentric weights from the edge functions. Both windings are drawn
+            u = ((cx - bx) * (py - by) - (cy - by) * (px - bx)) / area
+            v = ((ax - cx) * (py - cy) - (ay - cy) * (px - cx)) / area
+            w = 1 - u - v
+            if u < 0 or v < 0 or w < 0: continue
+
+            distance = 1 / (u * aw + v * bw + w * cw)
+            if distance < depth[y, x]: depth[y, x] = distance
+
+@njit
+def rasterize_triangles(depth, corners):
+    """
+    Rasterizes an (n, 3, 4) array of clip space triangles into the depth buffer.
+    Triangles crossing the near plane are clipped so occluders next to the camera still hide what is behind them
+    """
+    for i in range(len(corners)):
+        inside = 0
+        for k in range(3):
+            if corners[i, k, 3] > NEAR_W: inside += 1
+        if inside == 0: continue
+        if inside == 3:
+            rasterize_triangle(depth, corners[i, 0], corners[i, 1], corners[i, 2])
+            continue
+
+        # Clip the triangle against the near plane into a polygon of up to four points, then draw it as a fan
+        polygon = np.zeros((4, 4))
+        count = 0
+        for k in range(3):
+            current, following = corners[i, k], corners[i, (k + 1) % 3]
+            if current[3] > NEAR_W:
+                polygon[count] = current
+                count += 1
+            if (current[3] > NEAR_W) != (following[3] > NEAR_W):
+                t = (NEAR_W - current[3]) / (following[3] - current[3])
+                polygon[count] = current + t * (following - current)
+                count += 1
+
+        for k in range(1, count - 1): rasterize_triangle(depth, polygon[0], polygon[k], polygon[k + 1])
+
+@njit
+def test_corners(corners, levels, offsets, widths, heights):
+    """
+    Tests the (n, 8, 4) clip space corners of boxes against the depth hierarchy.
+    Returns True for each box that may be visible. Boxes reaching behind the camera are always visible
+    """
+    n = len(corners)
+    visible = np.ones(n, dtype=np.bool_)
+    width, height = widths[0], heights[0]
+
+    for i in range(n):
+        nearest = np.inf
+        min_x, min_y, max_x, max_y = np.inf, np.inf, -np.inf, -np.inf
+        behind = False
+        for k in range(8):
+            w = corners[i, k, 3]
+            if w <= NEAR_W:
+                behind = True
+                break
+            x = (corners[i, k, 0] / w * 0.5 + 0.5) * width
+            y = (corners[i, k, 1] / w * 0.5 + 0.5) * height
+            nearest = min(nearest, w)
+            min_x, max_x = min(min_x, x), max(max_x, x)
+            min_y, max_y = min(min_y, y), max(max_y, y)
+        if behind: continue
+
+        # Boxes off the screen are left to the frustum test
+        min_x, max_x = max(min_x, 0.0), min(max_x, width - 1e-3)
+        min_y, max_y = max(min_y, 0.0), min(max_y, height - 1e-3)
+        if min_x > max_x or min_y > max_y: continue
+
+        # Use the first level where the box covers at most two pixels in each direction, so at most nine pixels are read
+        level = 0
+        size = max(max_x - min_x, max_y - min_y)
+        while size > 2 and level < len(offsets) - 1:
+            size /= 2
+            level += 1
+
+        scale = 2 ** level
+        farthest = 0.0
+        for y in range(int(min_y / scale), int(max_y / scale) + 1):
+            for x in range(int(min_x / scale), int(max_x / scale) + 1):
+                farthest = max(farthest, levels[offsets[level] + y * widths[level] + x])
+
+        visible[i] = nearest <= farthest
+
+    return visible
+
+rasterize_triangles(np.full((2, 2), np.inf, dtype='f4'), np.ones((1, 3, 4), dtype='f4'))
+test_corners(np.ones((1, 8, 4), dtype='f4'), np.full(5, np.inf, dtype='f4'), np.array([0, 4]), np.array([2, 1]), np.array([2, 1]))
+
+
+class OcclusionBuffer():
+    width: int
+    """Width of the full resolution depth buffer in pixels. Must be a power of two"""
+    height: int
+    """Height of the full resolution depth buffer in pixels. Must be a power of two"""
+    depth: np.ndarray
+    """(height, width) array of the view depth of the nearest occluder at each pixel. Pixels without an occluder are infinitely far"""
+    levels: np.ndarray
+    """Flattened depth hierarchy. Each level holds the farthest depth of each 2x2 block of the level before"""
+    offsets: np.ndarray
+    """Start of each level in the flattened hierarchy"""
+    matrix: np.ndarray
+    """(4, 4) clip matrix the buffer was last drawn with, stored for multiplying row vectors"""
+
+    def __init__(self, width: int=128, height: int=64) -> None:
+        """
+        Low resolution software depth buffer of the occluders in view, with a hierarchy of conservative farthest depths.
+        Boxes that are behind the occluders at every pixel they cover are hidden and do not need to be drawn
+        """
+
+        if width & (width - 1) or height & (height - 1): raise ValueError(f'OcclusionBuffer: Invalid resolution {width}x{height}. Expected powers of two')
+
+        self.width  = width
+        self.height = height
+        self.depth  = np.full((height, width), np.inf, dtype='f4')
+        self.matrix = np.identity(4, dtype='f4')
+
+        # Halve each dimension until the level is a single pixel
+        self.widths, self.heights = [width], [height]
+        while self.widths[-1] > 1 or self.heights[-1] > 1:
+            self.widths.append(max(self.widths[-1] // 2, 1))
+            self.heights.append(max(self.heights[-1] // 2, 1))
+        self.widths, self.heights = np.array(self.widths), np.array(self.heights)
+        self.offsets = np.concatenate([[0], np.cumsum(self.widths * self.heights)[:-1]])
+        self.levels = np.full(np.sum(self.widths * self.heights), np.inf, dtype='f4')
+
+    def update(self, matrix: glm.mat4x4, nodes) -> None:
+        """
+        Redraws the buffer with the meshes of the given nodes from the view of the given clip matrix, usually camera.m_proj * camera.m_view
+        """
+
+        self.matrix = np.array(matrix.to_list(), dtype='f4')
+        self.clear()
+
+        triangles = []
+        for node in nodes:
+            if not node.mesh: continue
+            model = np.array(node.model_matrix.to_list(), dtype='f4')
+            points = np.hstack([node.mesh.points, np.ones((len(node.mesh.points), 1), dtype='f4')]) @ (model @ self.matrix)
+            triangles.append(points[node.mesh.indices])
+
+        if triangles: self.rasterize(np.concatenate(triangles))
+        self.build_levels()
+
+    def clear(self) -> None:
+        """
+        Removes all occluders from the buffer
+        """
+
+        self.depth[:] = np.inf
+
+    def rasterize(self, triangles: np.ndarray) -> None:
+        """
+        Draws an (n, 3, 4) array of clip space triangles into the full resolution buffer. Call build_levels after drawing
+        """
+
+        rasterize_triangles(self.depth, np.ascontiguousarray(triangles, dtype='f4'))
+
+    def build_levels(self) -> None:
+        """
+        Builds the depth hierarchy from the full resolution buffer
+        """
+
+        level = self.depth
+        self.levels[:level.size] = level.reshape(-1)
+        for i in range(1, len(self.offsets)):
+            # Odd sized levels are padded with their last row or column
+            if level.shape[0] % 2: level = np.vstack([level, level[-1:]])
+            if level.shape[1] % 2: level = np.hstack([level, level[:, -1:]])
+            level = level.reshape(level.shape[0] // 2, 2, level.shape[1] // 2, 2).max(axis=(1, 3))
+            self.levels[self.offsets[i]:self.offsets[i] + level.size] = level.reshape(-1)
+
+    def test_boxes(self, minimums: np.ndarray, maximums: np.ndarray) -> np.ndarray:
+        """
+        Tests an (n, 3) array of box minimums and maximums against the occluders.
+        Returns a boolean array that is True for boxes that may be visible and False for boxes hidden behind the occluders
+        """
+
+        if not len(minimums): return np.zeros(0, dtype=bool)
+
+        # The eight corners of each box in clip space
+        signs = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype='f4')
+        corners = minimums[:, None, :] + signs[None, :, :] * (maximums - minimums)[:, None, :]
+        corners = np.concatenate([corners, np.ones((*corners.shape[:2], 1), dtype='f4')], axis=2) @ self.matrix
+
+        return test_corners(np.ascontiguousarray(corners, dtype='f4'), self.levels, self.offsets, self.widths, self.heights)
+
+    def test_box(self, minimum: glm.vec3, maximum: glm.vec3) -> bool:
+        """
+        Tests a single box against the occluders. Returns True if the box may be visible
+        """
+
+        return bool(self.test_boxes(np.array([minimum], dtype='f4'), np.array([maximum], dtype='f4'))[0])
+
+    def __repr__(self) -> str:
+        return f'<Basilisk Occlusion Buffer | {self.width}x{self.height}, {int(np.sum(np.isfinite(self.depth)))} covered pixels>'
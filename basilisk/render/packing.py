@@ -0,0 +1,112 @@
+import numpy as np
+from .shader import attribute_mappings, packed_attributes
+
+
+def pack_vertices(data: np.ndarray, attributes: list[str], fmts: list[str], offset: int=0) -> np.ndarray:
+    """
+    Packs rows of batch data into the vertex format of a shader. The data holds the columns of the full batch layout starting at the given column.
+    Returns an (n, stride) byte array. Attributes of the packed layout are encoded, other attributes are copied as floats
+    """
+
+    n = len(data)
+    data = np.asarray(data, dtype='f4').reshape(n, -1)
+    columns = []
+
+    for attribute, fmt in zip(attributes, fmts):
+        if attribute in packed_attributes: column = encoders[attribute](data, offset)
+        elif attribute in attribute_mappings: column = data[:, [index - offset for index in attribute_mappings[attribute]]]
+        else: column = np.zeros((n, int(fmt[0])), dtype='f4')
+        columns.append(np.ascontiguousarray(column).view('u1').reshape(n, -1))
+
+    return np.hstack(columns) if columns else np.zeros((n, 0), dtype='u1')
+
+def get_stride(fmts: list[str]) -> int:
+    """
+    Gets the size in bytes of a vertex with the given moderngl attribute formats, such as '3f', '2f2' or '1i4'
+    """
+
+    stride = 0
+    for fmt in fmts:
+        count, size = fmt[0], fmt[2:] if len(fmt) > 2 else '4'
+        stride += int(count) * int(size)
+    return stride
+
+def octahedral_encode(vectors: np.ndarray) -> np.ndarray:
+    """
+    Maps (n, 3) directions onto the [-1, 1] square by projecting them onto an octahedron and unfolding its lower half
+    """
+
+    vectors = np.nan_to_num(vectors.astype('f4'))
+    l1 = np.maximum(np.sum(np.abs(vectors), axis=1, keepdims=True), 1e-12)
+    square = vectors[:, :2] / l1
+
+    # The lower half is folded over the diagonals of the square
+    lower = vectors[:, 2] < 0
+    signs = np.where(square[lower] >= 0, 1.0, -1.0)
+    square[lower] = (1 - np.abs(square[lower][:, ::-1])) * signs
+
+    # Zero vectors map to the center of the square, which is the positive z axis
+    return np.clip(square, -1, 1)
+
+def encode_uv(data: np.ndarray, offset: int) -> np.ndarray:
+    """
+    Gets the uvs as half floats
+    """
+
+    return data[:, 3 - offset:5 - offset].astype('f2')
+
+def encode_normal(data: np.ndarray, offset: int) -> np.ndarray:
+    """
+    Gets the normals as octahedral coordinates in 16 bit signed normalized integers
+    """
+
+    return np.round(octahedral_encode(data[:, 5 - offset:8 - offset]) * 32767).astype('i2')
+
+def encode_tangent(data: np.ndarray, offset: int) -> np.ndarray:
+    """
+    Gets the tangents as octahedral coordinates in 16 bit integers. The lowest bit of the second coordinate is set if the bitangent is
+    opposite the cross product of the normal and tangent, so the shader can reconstruct the bitangent from the normal and tangent
+    """
+
+    normals    = np.nan_to_num(data[:, 5 - offset:8 - offset])
+    tangents   = np.nan_to_num(data[:, 8 - offset:11 - offset])
+    bitangents = np.nan_to_num(data[:, 11 - offset:14 - offset])
+
+    # Tangents are made perpendicular to the normal so the reconstructed bitangent is never zero
+    normals  = normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+    tangents = tangents - normals * np.sum(normals * tangents, axis=1, keepdims=True)
+    degenerate = np.linalg.norm(tangents, axis=1) < 1e-6
+    if np.any(degenerate):
+        axes = np.where(np.abs(normals[degenerate, :1]) < 0.9, [[1, 0, 0]], [[0, 1, 0]])
+        tangents[degenerate] = np.cross(np.cross(normals[degenerate], axes), normals[degenerate])
+
+    flipped = np.sum(np.cross(normals, tangents) * bitangents, axis=1) < 0
+    square = octahedral_encode(tangents)
+
+    packed = np.empty((len(data), 2), dtype='i2')
+    packed[:, 0] = np.round(square[:, 0] * 32767)
+    packed[:, 1] = np.round(square[:, 1] * 16383) * 2 + flipped
+    return packed
+
+def encode_rotation(data: np.ndarray, offset: int) -> np.ndarray:
+    """
+    Gets the rotation quaternions in 16 bit signed normalized integers
+    """
+
+    return np.round(np.clip(data[:, 17 - offset:21 - offset], -1, 1) * 32767).astype('i2')
+
+def encode_material(data: np.ndarray, offset: int) -> np.ndarray:
+    """
+    Gets the material indices as integers
+    """
+
+    return np.round(data[:, 24 - offset:25 - offset]).astype('i4')
+
+
+encoders = {
+    'in_uv_half'         : encode_uv,
+    'in_normal_oct'      : encode_normal,
+    'in_tangent_oct'     : encode_tangent,
+    'obj_rotation_snorm' : encode_rotation,
+    'obj_material_index' : encode_material,
+}
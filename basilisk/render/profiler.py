@@ -0,0 +1,158 @@
+import moderngl as mgl
+from collections import deque
+
+
+class NullQuery():
+    """
+    Stands in for a query when profiling is disabled or unsupported. Measures nothing
+    """
+
+    def __enter__(self): return self
+    def __exit__(self, *args): pass
+
+
+class Profiler():
+    ctx: mgl.Context
+    """Back reference to the parent context"""
+    supported: bool
+    """Flag for if the context supports time elapsed, primitives generated and samples passed queries"""
+    latency: int
+    """Number of frames the results of a frame are read after it was submitted, so reading does not wait for the GPU"""
+    window: int
+    """Number of frames the averages are taken over"""
+    frame: list
+    """The (name, query) of each pass measured in the current frame"""
+    pending: deque
+    """Measured passes of the submitted frames that have not been read yet, oldest first"""
+    history: dict
+    """The (time, primitives, samples) of each pass for the last frames it was measured in, keyed by pass name"""
+    queries: list
+    """Queries whose results have been read, reused for the next passes"""
+    null: NullQuery
+    """Returned by measure when profiling is disabled"""
+
+    def __init__(self, ctx: mgl.Context, enabled: bool=True, latency: int=3, window: int=60) -> None:
+        """
+        Measures how long render passes take on the GPU, and how many primitives and samples they draw.
+        Each pass is wrapped in a query, and its results are read a few frames late so the CPU never waits for the GPU.
+        Averages of the results over the last frames are given by get and averages. All measurements are no-ops if queries are not supported
+        """
+
+        if latency < 1: raise ValueError(f'Profiler: Invalid latency {latency}. Expected at least 1 frame')
+        if window < 1:  raise ValueError(f'Profiler: Invalid window {window}. Expected at least 1 frame')
+
+        self.ctx     = ctx
+        self.latency = latency
+        self.window  = window
+        self.frame   = []
+        self.pending = deque()
+        self.history = {}
+        self.queries = []
+        self.null    = NullQuery()
+
+        # Contexts without timer queries fail to create the query
+        try:
+            self.queries.append(ctx.query(samples=True, time=True, primitives=True))
+            self.supported = True
+        except mgl.Error:
+            self.supported = False
+
+        self.enabled = enabled
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Flag for if passes are measured. Always False if the context does not support queries
+        """
+
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool):
+        self._enabled = bool(value) and self.supported
+
+    def measure(self, name: str) -> mgl.Query | NullQuery:
+        """
+        Returns a context manager that measures the draws made inside it as the pass with the given name.
+        Passes measured more than once in a frame are summed. Passes must not be nested
+        """
+
+        if not self.enabled: return self.null
+
+        query = self.queries.pop() if self.queries else self.ctx.query(samples=True, time=True, primitives=True)
+        self.frame.append((name, query))
+        return query
+
+    def end_frame(self) -> None:
+        """
+        Submits the passes of the current frame and reads the results of the frame submitted latency frames ago.
+        Called once per frame after the frame is shown
+        """
+
+        # Nothing is left to read once profiling is disabled and the measured frames have been read
+        if not self.enabled and not any(self.pending):
+            self.pending.clear()
+            return
+
+        self.pending.append(self.frame)
+        self.frame = []
+
+        while len(self.pending) > self.latency: self.read(self.pending.popleft())
+
+    def read(self, frame: list) -> None:
+        """
+        Internal function to add the results of a frame's passes to their history and return the queries for reuse
+        """
+
+        results = {}
+        for name, query in frame:
+            time, primitives, samples = results.get(name, (0.0, 0, 0))
+            results[name] = (time + query.elapsed / 1e6, primitives + query.primitives, samples + query.samples)
+            self.queries.append(query)
+
+        for name, result in results.items():
+            if name not in self.history: self.history[name] = deque(maxlen=self.window)
+            self.history[name].append(result)
+
+    def get(self, name: str) -> dict | None:
+        """
+        Gets the average time in milliseconds, primitives generated and samples passed of the pass with the given name. None if the pass has no results yet
+        """
+
+        if name not in self.history: return None
+
+        results = self.history[name]
+        count = len(results)
+        return {
+            'time'       : sum(result[0] for result in results) / count,
+            'primitives' : sum(result[1] for result in results) / count,
+            'samples'    : sum(result[2] for result in results) / count,
+        }
+
+    @property
+    def averages(self) -> dict:
+        """
+        The averages of every measured pass, keyed by pass name
+        """
+
+        return {name: self.get(name) for name in self.history}
+
+    @property
+    def total(self) -> float:
+        """
+        Sum of the average times of all measured passes in milliseconds
+        """
+
+        return sum(average['time'] for average in self.averages.values())
+
+    def clear(self) -> None:
+        """
+        Removes all results. Passes that are still pending are read into the new history
+        """
+
+        self.history = {}
+
+    def __repr__(self) -> str:
+        if not self.supported: return '<Basilisk Profiler | unsupported>'
+        passes = ', '.join(f'{name} {average["time"]:.3f} ms' for name, average in self.averages.items())
+        return f'<Basilisk Profiler | {passes}>'
@@ -0,0 +1,57 @@
+import moderngl as mgl
+
+
+class RenderQueue():
+    items: list
+    """The (key, vao, shader, draw) of each draw queued this frame"""
+    shader_order: dict
+    """Order of each shader in the sort keys. Shaders keep their order between frames so the submission order is stable"""
+    draw_calls: int
+    """Number of draw calls issued by the last submit"""
+    state_changes: int
+    """Number of shader program and vertex array changes between the draws of the last submit"""
+
+    def __init__(self) -> None:
+        """
+        Collects the draws of a frame with sort keys and submits them grouped by shader.
+        Opaque draws are submitted front to back so the depth test rejects hidden fragments before the fragment shader runs.
+        Transparent draws are submitted after all opaque draws, back to front
+        """
+
+        self.items = []
+        self.shader_order = {}
+        self.draw_calls = 0
+        self.state_changes = 0
+
+    def add(self, shader, depth: float, vao: mgl.VertexArray, draw, transparent: bool=False) -> None:
+        """
+        Queues a draw. Draw is called with no arguments when the queue is submitted and returns the number of draw calls it issued
+        """
+
+        if shader not in self.shader_order: self.shader_order[shader] = len(self.shader_order)
+        key = (transparent, self.shader_order[shader], -depth if transparent else depth)
+        self.items.append((key, vao, shader, draw))
+
+    def submit(self) -> None:
+        """
+        Sorts the queued draws by their keys, draws them and clears the queue
+        """
+
+        self.items.sort(key=lambda item: item[0])
+
+        self.draw_calls = 0
+        self.state_changes = 0
+        shader, vao = None, None
+        for _, item_vao, item_shader, draw in self.items:
+            if item_shader is not shader: self.state_changes += 1
+            if item_vao is not vao: self.state_changes += 1
+            shader, vao = item_shader, item_vao
+            self.draw_calls += draw()
+
+        self.items.clear()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __repr__(self) -> str:
+        return f'<Basilisk Render Queue | {self.draw_calls} draw calls, {self.state_changes} state changes>'
@@ -13,6 +13,15 @@ attribute_mappings = {
     'obj_material' : [24],
 }
 
+# Attributes of the packed vertex layout. Each has a moderngl format and the columns of the full layout it is encoded from
+packed_attributes = {
+    'in_uv_half'         : ('2f2', [3, 4]),
+    'in_normal_oct'      : ('2i2', [5, 6, 7]),
+    'in_tangent_oct'     : ('2i2', [5, 6, 7, 8, 9, 10, 11, 12, 13]),
+    'obj_rotation_snorm' : ('4i2', [17, 18, 19, 20]),
+    'obj_material_index' : ('1i4', [24]),
+}
+
 
 class Shader:
     program: mgl.Program=None
@@ -29,6 +38,8 @@ class Shader:
     """String representation of the format for building vaos"""
     attributes: list[str]
     """List representation of the attributes for building vaos"""
+    packed: bool
+    """Flag for if the shader reads any attribute of the packed vertex layout. Batch data of packed shaders is stored as bytes"""
 
     def __init__(self, engine, vert: str=None, frag: str=None) -> None:
         """
@@ -48,6 +59,7 @@ class Shader:
         self.attribute_indices = []
         self.fmt               = ''
         self.attributes        = []
+        self.packed            = False
         self.bindings = 1
 
         # Default vertex and fragment shaders
@@ -87,6 +99,14 @@ class Shader:
                 elif any(list(map(lambda x: x in tokens, ['vec3']))): n = 3
                 elif any(list(map(lambda x: x in tokens, ['vec4']))): n = 4
                 else: n = 1
+
+                # Packed attributes use their own format and are encoded from several columns
+                if tokens[-1][:-1] in packed_attributes:
+                    fmt, indices = packed_attributes[tokens[-1][:-1]]
+                    self.fmt += f'{fmt} '
+                    self.attribute_indices.extend(indices)
+                    self.packed = True
+                    continue
                 self.fmt += f'{n}f '
 
                 if tokens[-1][:-1] in attribute_mappings:
@@ -44,10 +44,16 @@ class ShaderHandler:
         if shader in self.shaders: return shader
 
         self.shaders.add(shader)
-        
-        if self.engine.material_handler:
-            self.engine.material_handler.write()
-            self.engine.material_handler.image_handler.write()
+
+        # Samplers start on unit 0. The sky's unit is written even without a sky so its cube sampler never shares a unit with 2D samplers
+        if 'skyboxTexture' in shader.uniforms: shader.program['skyboxTexture'] = 8
+
+        # Materials are written to every shader when a deferred material handler is flushed
+        material_handler = self.engine.material_handler
+        if material_handler and material_handler.deferred: material_handler.write_shaders = True
+        elif material_handler:
+            material_handler.write()
+            material_handler.image_handler.write()
 
         return shader
 
@@ -0,0 +1,121 @@
+import numpy as np
+import moderngl as mgl
+
+
+class StreamBuffer():
+    ctx: mgl.Context
+    """Reference to the context of the parent engine"""
+    buffers: list[mgl.Buffer]
+    """The regions of the stream. Each region is a full copy of the data"""
+    index: int
+    """Index of the region used by the current frame"""
+    pending: list[dict]
+    """Writes made while another region was current, waiting to be applied to each region. Keyed by (offset, length)"""
+
+    def __init__(self, ctx: mgl.Context, data: np.ndarray=None, reserve: int=0, count: int=1) -> None:
+        """
+        Buffer that rotates through count regions, one per frame.
+        Writes go to the current region and are replayed to each other region when it becomes current again,
+        so a region is never written while the GPU may still be drawing from it in one of the previous count - 1 frames.
+        A stream with a single region behaves like a plain buffer
+        """
+
+        self.ctx = ctx
+        self.buffers = [ctx.buffer(data) if data is not None else ctx.buffer(reserve=reserve) for _ in range(count)]
+        self.index = 0
+        self.pending = [{} for _ in range(count)]
+
+    def write(self, data: np.ndarray | bytes, offset: int=0) -> None:
+        """
+        Writes data to the current region and queues it for the other regions
+        """
+
+        data = data.tobytes() if isinstance(data, np.ndarray) else bytes(data)
+        self.buffer.write(data, offset)
+
+        key = (offset, len(data))
+        for index, pending in enumerate(self.pending):
+            if index == self.index: continue
+            # A write to the same range replaces the queued one and moves to the back so the replay order is kept
+            pending.pop(key, None)
+            pending[key] = data
+
+    def copy(self, read_offset: int, write_offset: int, size: int) -> None:
+        """
+        Copies a range of every region to another range of the same region on the GPU.
+        Queued writes inside the copied range are queued again at the new range
+        """
+
+        for buffer in self.buffers: self.ctx.copy_buffer(buffer, buffer, size, read_offset, write_offset)
+
+        for pending in self.pending:
+            moved = [((offset - read_offset + write_offset, length), data) for (offset, length), data in pending.items() if read_offset <= offset and offset + length <= read_offset + size]
+            for key, data in moved:
+                pending.pop(key, None)
+                pending[key] = data
+
+    def discard(self, offset: int, size: int) -> None:
+        """
+        Drops the queued writes inside a range that is no longer used, so they cannot overwrite data later placed in the range
+        """
+
+        for index, pending in enumerate(self.pending):
+            self.pending[index] = {(start, length): data for (start, length), data in pending.items() if start + length <= offset or start >= offset + size}
+
+    def read(self, size: int=-1, offset: int=0) -> bytes:
+        """
+        Reads data from the current region
+        """
+
+        return self.buffer.read(size, offset)
+
+    def advance(self) -> None:
+        """
+        Moves to the next region and applies the writes it missed. Called once per frame after drawing
+        """
+
+        if len(self.buffers) == 1: return
+
+        self.index = (self.index + 1) % len(self.buffers)
+        for (offset, _), data in self.pending[self.index].items(): self.buffer.write(data, offset)
+        self.pending[self.index].clear()
+
+    def resize(self, size: int) -> None:
+        """
+        Copies every region into a new buffer of the given size in bytes
+        """
+
+        for index, buffer in enumerate(self.buffers):
+            self.buffers[index] = self.ctx.buffer(reserve=size)
+            self.ctx.copy_buffer(self.buffers[index], buffer)
+            buffer.release()
+
+    def release(self) -> None:
+        """
+        Releases the buffers of every region
+        """
+
+        for buffer in self.buffers: buffer.release()
+        self.buffers = []
+
+    @property
+    def buffer(self) -> mgl.Buffer:
+        """
+        The region used by the current frame
+        """
+
+        return self.buffers[self.index]
+
+    @property
+    def size(self) -> int:
+        """
+        Size of a single region in bytes
+        """
+
+        return self.buffers[0].size
+
+    def __len__(self) -> int:
+        return len(self.buffers)
+
+    def __repr__(self) -> str:
+        return f'<Basilisk Stream Buffer | {len(self.buffers)} regions, {self.size / 1024 / 1024} mb>'
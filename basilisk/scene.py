@@ -6,6 +6,7 @@ from .mesh.mesh import Mesh
 from .render.material import Material
 from .render.shader import Shader
 from .render.light_handler import LightHandler
+from .render.light import PointLight
 from .render.camera import Camera, FreeCamera
 from .nodes.node_handler import NodeHandler
 from .physics.physics_engine import PhysicsEngine
@@ -14,10 +15,12 @@ from .render.sky import Sky
 from .render.frame import Frame
 from .particles.particle_handler import ParticleHandler
 from .nodes.node import Node
+from .nodes.static_instance import StaticInstance
 from .generic.collisions import moller_trumbore
 from .generic.raycast_result import RaycastResult
 from .render.post_process import PostProcess
 from .render.framebuffer import Framebuffer
+from .snapshot import save_scene, load_scene
 
 class Scene():
     engine: ...=None
@@ -68,6 +71,9 @@ class Scene():
         if collisions and self.engine.delta_time < 0.5: # TODO this will cause physics to slow down when on low frame rate, this is probabl;y acceptable
             self.collider_handler.resolve_collisions()
 
+        # Write all node changes from this frame to the GPU at once
+        if nodes: self.node_handler.update_chunks()
+
         # Render by default to the engine frame
         if not render: return
 
@@ -88,9 +94,14 @@ class Scene():
 
         render_target.use()
         self.engine.shader_handler.write(self)
-        if self.sky: self.sky.render()
-        self.node_handler.render()
-        self.particle.render()
+        self.light_handler.render()
+
+        # Each pass is measured on the GPU if profiling is enabled
+        profiler = self.engine.profiler
+        if self.sky:
+            with profiler.measure('sky'): self.sky.render()
+        with profiler.measure('chunks'): self.node_handler.render()
+        with profiler.measure('particles'): self.particle.render()
 
 
         if self.engine.headless or not show: return
@@ -101,6 +112,8 @@ class Scene():
         Adds the given object(s) to the scene. Can pass in any scene objects:
         Argument overloads:
             object: Node - Adds the given node to the scene.
+            object: StaticInstance - Adds the given static instance to the scene.
+            object: PointLight - Adds the given point or spot light to the scene.
         """
         
         # List of all return values for the added objects
@@ -116,10 +129,18 @@ class Scene():
             # Add a node to the scene
             elif isinstance(bsk_object, Node):
                 returns.append(self.node_handler.add(bsk_object)); continue
+
+            # Add a static instance to the scene
+            elif isinstance(bsk_object, StaticInstance):
+                returns.append(self.node_handler.add_instance(bsk_object)); continue
             
             # Add a node to the scene
             elif isinstance(bsk_object, PostProcess):
                 returns.append(self.engine.frame.add_post_process(bsk_object)); continue
+
+            # Add a point or spot light to the scene
+            elif isinstance(bsk_object, PointLight):
+                returns.append(self.light_handler.add(bsk_object)); continue
             
             
             # Recived incompatable type
@@ -131,6 +152,38 @@ class Scene():
         if len(returns) == 1: return returns[0]
         return returns
 
+    def add_many(self, nodes: list[Node | StaticInstance]) -> list[Node | StaticInstance]:
+        """
+        Adds a list of nodes or static instances to the scene at once. 
+        Material textures and the collision BVH are regenerated once for the whole list instead of once per node
+        """
+
+        for node in nodes:
+            if not isinstance(node, (Node, StaticInstance)): raise ValueError(f'scene.add_many: Incompatable object add type {type(node)}')
+
+        return self.node_handler.add_many(nodes)
+
+    def instantiate(self, prefab: Node, positions, rotations=None, scales=None) -> list[Node]:
+        """
+        Adds a copy of the prefab node at each of the given transforms and returns the copies. The prefab itself is not added to the scene.
+        Positions and scales are (n, 3) arrays and rotations are (n, 4) arrays of w, x, y, z quaternions. Missing rotations or scales are taken from the prefab.
+        Much faster than adding deep copies one by one since copies share the prefab's mesh, materials and shader and are inserted in bulk.
+        """
+
+        if not isinstance(prefab, Node): raise ValueError(f'scene.instantiate: Incompatable prefab type {type(prefab)}')
+
+        return self.node_handler.instantiate(prefab, positions, rotations, scales)
+
+    def bulk(self):
+        """
+        Context manager that defers material texture regeneration and BVH insertion until the block exits.
+        Usage:
+            with scene.bulk():
+                for position in positions: scene.add(bsk.Node(position=position))
+        """
+
+        return self.node_handler.bulk()
+
     def remove(self, *objects: Node | None) -> None | Node | list:
         """
         Removes the given baskilsk object from the scene
@@ -150,6 +203,14 @@ class Scene():
             elif isinstance(bsk_object, Node):
                 returns.append(self.node_handler.remove(bsk_object)); continue
 
+            # Remove a static instance from the scene
+            elif isinstance(bsk_object, StaticInstance):
+                returns.append(self.node_handler.remove_instance(bsk_object)); continue
+
+            # Remove a point or spot light from the scene
+            elif isinstance(bsk_object, PointLight):
+                returns.append(self.light_handler.remove(bsk_object)); continue
+
             # Recived incompatable type
             else:
                 raise ValueError(f'scene.remove: Incompatable object remove type {type(bsk_object)}')
@@ -159,6 +220,23 @@ class Scene():
         if len(returns) == 1: return returns[0]
         return returns
 
+    def save(self, path: str) -> None:
+        """
+        Saves all nodes and static instances in the scene to a binary snapshot file.
+        Meshes, materials, images and shaders are stored once and referenced by index.
+        """
+
+        save_scene(self, path)
+
+    @staticmethod
+    def load(engine: ..., path: str) -> ...:
+        """
+        Creates a new scene from a snapshot file written by Scene.save.
+        The file is memory mapped and its nodes are inserted in bulk.
+        """
+
+        return load_scene(engine, path)
+
     def set_engine(self, engine: any) -> None:
         """
         Sets the back references to the engine and creates handlers with the context
@@ -252,13 +330,13 @@ class Scene():
         """
         Returns the first node with the given traits
         """
-        self.node_handler.get(position, scale, rotation, forward, mesh, material, velocity, rotational_velocity, physics, mass, collisions, static_friction, kinetic_friction, elasticity, collision_group, name, tags, static)
+        return self.node_handler.get(position, scale, rotation, forward, mesh, material, velocity, rotational_velocity, physics, mass, collisions, static_friction, kinetic_friction, elasticity, collision_group, name, tags, static)
     
     def get_all(self, position: glm.vec3=None, scale: glm.vec3=None, rotation: glm.quat=None, forward: glm.vec3=None, mesh: Mesh=None, material: Material=None, velocity: glm.vec3=None, rotational_velocity: glm.quat=None, physics: bool=None, mass: float=None, collisions: bool=None, static_friction: float=None, kinetic_friction: float=None, elasticity: float=None, collision_group: float=None, name: str=None, tags: list[str]=None,static: bool=None) -> list[Node]:
         """
         Returns all nodes with the given traits
         """
-        self.node_handler.get_all(position, scale, rotation, forward, mesh, material, velocity, rotational_velocity, physics, mass, collisions, static_friction, kinetic_friction, elasticity, collision_group, name, tags, static)
+        return self.node_handler.get_all(position, scale, rotation, forward, mesh, material, velocity, rotational_velocity, physics, mass, collisions, static_friction, kinetic_friction, elasticity, collision_group, name, tags, static)
 
     @property
     def camera(self): return self._camera
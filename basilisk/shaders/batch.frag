@@ -58,6 +58,16 @@ uniform int  numDirLights;
 uniform      textArray textureArrays[5];
 uniform samplerCube skyboxTexture;
 
+// Point and spot lights, assigned to clusters of the view frustum
+uniform mat4      projectionMatrix;
+uniform mat4      viewMatrix;
+uniform int       numPointLights;
+uniform sampler2D pointLightsTexture;
+uniform sampler2D lightClustersTexture;
+uniform sampler2D lightIndicesTexture;
+uniform ivec3     clusterGrid;
+uniform vec2      clusterDepth;
+
 
 float luminance(vec3 color) {
     return dot(color, vec3(0.299, 0.587, 0.114));
@@ -260,6 +270,47 @@ void main() {
         lightResult.clearcoat += dirLightResult.clearcoat * lightFactor;
     }
 
+    // Add result from each point and spot light affecting the fragment's cluster
+    if (numPointLights > 0) {
+        // Cluster of the fragment from its screen position and exponential depth slice
+        vec4 viewPosition = viewMatrix * vec4(position, 1.0);
+        vec4 clipPosition = projectionMatrix * viewPosition;
+        vec2 screen = clipPosition.xy / clipPosition.w * 0.5 + 0.5;
+        ivec3 cluster = ivec3(
+            clamp(int(floor(screen.x * clusterGrid.x)), 0, clusterGrid.x - 1),
+            clamp(int(floor(screen.y * clusterGrid.y)), 0, clusterGrid.y - 1),
+            clamp(int(floor(log(max(-viewPosition.z, clusterDepth.x) / clusterDepth.x) * clusterDepth.y)), 0, clusterGrid.z - 1)
+        );
+
+        vec2 range = texelFetch(lightClustersTexture, ivec2(cluster.x + cluster.y * clusterGrid.x, cluster.z), 0).rg;
+        int indicesWidth = textureSize(lightIndicesTexture, 0).x;
+
+        for (int i = int(range.x); i < int(range.x + range.y); i++) {
+            int index = int(texelFetch(lightIndicesTexture, ivec2(i % indicesWidth, i / indicesWidth), 0).r);
+            vec4 positionRadius = texelFetch(pointLightsTexture, ivec2(0, index), 0);
+            vec4 colorInner     = texelFetch(pointLightsTexture, ivec2(1, index), 0);
+            vec4 directionOuter = texelFetch(pointLightsTexture, ivec2(2, index), 0);
+
+            vec3 offset = position - positionRadius.xyz;
+            float dist = length(offset);
+            if (dist >= positionRadius.w) { continue; }
+
+            // Smooth falloff to zero at the radius, and to zero outside the cone of spot lights
+            float attenuation = sqr(clamp(1.0 - pow(dist / positionRadius.w, 4.0), 0.0, 1.0)) / (1.0 + dist * dist);
+            attenuation *= smoothstep(directionOuter.w, colorInner.w, dot(offset / max(dist, 0.0001), directionOuter.xyz));
+            if (attenuation <= 0.0) { continue; }
+
+            DirectionalLight light;
+            light.direction = offset / max(dist, 0.0001);
+
+            LightResult pointLightResult = PrincipledDiffuse(light, mtl, albedo, roughness, N, V, X, Y);
+            vec3 lightFactor = attenuation * colorInner.rgb;
+            lightResult.diffuse   += pointLightResult.diffuse   * lightFactor;
+            lightResult.specular  += pointLightResult.specular  * lightFactor;
+            lightResult.clearcoat += pointLightResult.clearcoat * lightFactor;
+        }
+    }
+
     lightResult.specular =  min(vec3(1.0), lightResult.specular);
     lightResult.specular *= mix(vec3(1.0), reflect_sky, mtl.metallicness) * luminance(reflect_sky);
     lightResult.diffuse  *= mix(vec3(1.0), ambient_sky, 0.25);
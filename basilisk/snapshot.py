@@ -0,0 +1,436 @@
+import os
+import json
+import struct
+import hashlib
+import tempfile
+import numpy as np
+import glm
+from .mesh.mesh import Mesh
+from .render.image import Image
+from .render.material import Material
+from .render.shader import Shader
+from .nodes.node import Node
+from .generic.tags import Tags
+from .nodes.static_instance import StaticInstance
+from .nodes.transform_store import RELATIVE_POSITION, RELATIVE_ROTATION, RELATIVE_SCALE
+
+
+magic = b'BSKSCENE'
+"""Identifies basilisk scene snapshot files"""
+version = 1
+"""Version of the snapshot layout written by save_scene"""
+header = struct.Struct('<8sIIQ')
+"""Magic, version, reserved and the byte length of the json table"""
+alignment = 64
+"""Byte alignment of every array in the data section so that memory mapped arrays can be used directly"""
+
+material_attributes = ('roughness', 'subsurface', 'sheen', 'sheen_tint', 'anisotropic', 'specular', 'metallicness', 'specular_tint', 'clearcoat', 'clearcoat_gloss')
+"""Float attributes of a material stored in the table"""
+material_images = ('texture', 'normal', 'roughness_map', 'ao_map')
+"""Image attributes of a material stored as references to the image table"""
+
+
+def save_scene(scene, path: str | os.PathLike) -> None:
+    """
+    Writes all nodes and static instances of the scene to a binary snapshot.
+    The file is a small header, a json table of meshes, materials, images, shaders and per node strings, then aligned raw arrays.
+    Meshes, images, materials and shaders are stored once and referenced by index. Meshes and images are deduplicated by content hash.
+    """
+
+    writer = SnapshotWriter(scene)
+
+    # Nodes in hierarchy order so that parents are always created before their children
+    nodes = [node for root in scene.node_handler.nodes if root.parent is None or root.parent.node_handler is not scene.node_handler for node in root.get_all()]
+    rows  = {node : row for row, node in enumerate(nodes)}
+    n     = len(nodes)
+
+    # Transform and motion columns
+    writer.array('positions',             [tuple(node.position.data) for node in nodes], 'f4', (n, 3))
+    writer.array('rotations',             [tuple(node.rotation.data) for node in nodes], 'f4', (n, 4))
+    writer.array('scales',                [tuple(node.scale.data)    for node in nodes], 'f4', (n, 3))
+    writer.array('forwards',              [tuple(node.forward)       for node in nodes], 'f4', (n, 3))
+    writer.array('velocities',            [tuple(node.velocity)            for node in nodes], 'f4', (n, 3))
+    writer.array('rotational_velocities', [tuple(node.rotational_velocity) for node in nodes], 'f4', (n, 3))
+
+    # Hierarchy table
+    writer.array('parents',            [rows.get(node.parent, -1) for node in nodes], 'i4', (n,))
+    writer.array('relative_flags',     [(node.relative_position is not None) * RELATIVE_POSITION | (node.relative_rotation is not None) * RELATIVE_ROTATION | (node.relative_scale is not None) * RELATIVE_SCALE for node in nodes], 'u1', (n,))
+    writer.array('relative_positions', [tuple(node.relative_position) if node.relative_position is not None else (0, 0, 0)    for node in nodes], 'f4', (n, 3))
+    writer.array('relative_rotations', [tuple(node.relative_rotation) if node.relative_rotation is not None else (1, 0, 0, 0) for node in nodes], 'f4', (n, 4))
+    writer.array('relative_scales',    [tuple(node.relative_scale)    if node.relative_scale    is not None else (1, 1, 1)    for node in nodes], 'f4', (n, 3))
+
+    # Resource references
+    writer.array('meshes',    [writer.mesh(node.mesh)     for node in nodes], 'i4', (n,))
+    writer.array('materials', [writer.material(node.material) if not isinstance(node.material, list) else -1 for node in nodes], 'i4', (n,))
+    writer.array('shaders',   [writer.shader(node.shader) for node in nodes], 'i4', (n,))
+    writer.array('statics',   [-1 if node._static is None else int(node._static) for node in nodes], 'i1', (n,))
+    writer.array('occluders', [node.occluder for node in nodes], 'u1', (n,))
+
+    # Physics and collider parameters
+    writer.array('physics', [node.physics_body is not None for node in nodes], 'u1', (n,))
+    writer.array('masses',  [node.physics_body.mass if node.physics_body else 0 for node in nodes], 'f4', (n,))
+    writer.array('collisions',        [node.collider is not None for node in nodes], 'u1', (n,))
+    writer.array('collider_meshes',   [writer.collider_mesh(node) for node in nodes], 'i4', (n,))
+    writer.array('static_frictions',  [node.collider.static_friction  if node.collider else 0 for node in nodes], 'f4', (n,))
+    writer.array('kinetic_frictions', [node.collider.kinetic_friction if node.collider else 0 for node in nodes], 'f4', (n,))
+    writer.array('elasticities',      [node.collider.elasticity       if node.collider else 0 for node in nodes], 'f4', (n,))
+    writer.array('collision_groups',  [writer.string(node.collider.collision_group) if node.collider else -1 for node in nodes], 'i4', (n,))
+
+    # Strings and per vertex material lists are kept in the table
+    writer.table['names'] = [node.name for node in nodes]
+    writer.table['tags']  = [list(node.tags) for node in nodes]
+    writer.table['material_lists'] = {str(row) : [writer.material(mtl) for mtl in node._mtl_list] for row, node in enumerate(nodes) if isinstance(node.material, list)}
+
+    # Static instances
+    instances = list(scene.node_handler.instances)
+    m = len(instances)
+    writer.array('instance_positions', [tuple(instance.position) for instance in instances], 'f4', (m, 3))
+    writer.array('instance_rotations', [tuple(instance.rotation) for instance in instances], 'f4', (m, 4))
+    writer.array('instance_scales',    [tuple(instance.scale)    for instance in instances], 'f4', (m, 3))
+    writer.array('instance_meshes',    [writer.mesh(instance.mesh)         for instance in instances], 'i4', (m,))
+    writer.array('instance_materials', [writer.material(instance.material) for instance in instances], 'i4', (m,))
+    writer.array('instance_shaders',   [writer.shader(instance.shader)     for instance in instances], 'i4', (m,))
+
+    writer.write(path)
+
+def load_scene(engine, path: str | os.PathLike, scene=None):
+    """
+    Reads a snapshot written by save_scene and bulk inserts its contents into the given scene, or a new scene if none is given.
+    The file is memory mapped and the arrays are read in place.
+    """
+
+    from .scene import Scene
+    if scene is None: scene = Scene(engine)
+
+    reader = SnapshotReader(engine, path)
+    table  = reader.table
+
+    # Shared resources
+    meshes    = [reader.mesh(i)     for i in range(len(table['meshes']))]
+    images    = [reader.image(i)    for i in range(len(table['images']))]
+    materials = [reader.material(i, images) for i in range(len(table['materials']))]
+    shaders   = [reader.shader(i)   for i in range(len(table['shaders']))]
+    strings   = table['strings']
+
+    def get(resources: list, index: int): return resources[index] if index >= 0 else None
+
+    # Columns stay memory mapped. Only the values the nodes hold as glm objects are converted to lists
+    arrays = {name : reader.array(name) for name in ('positions', 'rotations', 'scales', 'forwards', 'velocities', 'rotational_velocities', 'parents', 'relative_flags', 'relative_positions', 'relative_rotations', 'relative_scales', 'meshes', 'materials', 'shaders', 'statics', 'physics', 'masses', 'collisions', 'collider_meshes', 'static_frictions', 'kinetic_frictions', 'elasticities', 'collision_groups')}
+    count = len(arrays['positions'])
+    # Snapshots written before occluders were added have no occluder column
+    occluders = reader.array('occluders') if 'occluders' in table['arrays'] else np.zeros(count, dtype='u1')
+
+    # Nodes with the same resources are cloned from one template. Nodes with per face material lists get their own template
+    material_lists = table['material_lists']
+    keys = np.stack([arrays[name] for name in ('meshes', 'materials', 'shaders', 'physics', 'collisions', 'collider_meshes', 'collision_groups')] + [np.full(count, -1)], axis=1).astype('i8')
+    listed = np.array([int(row) for row in material_lists], dtype='i8')
+    listed = listed[arrays['materials'][listed] == -1]
+    keys[listed, -1] = listed
+    keys, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+
+    node_handler = scene.node_handler
+    with node_handler.bulk():
+
+        templates = [node_handler.resolve(Node(
+            mesh            = get(meshes, mesh),
+            material        = [materials[i] for i in material_lists[str(row)]] if row >= 0 else get(materials, material),
+            shader          = get(shaders, shader),
+            physics         = bool(physics),
+            collision       = bool(collision),
+            collider_mesh   = get(meshes, collider_mesh) if collision else None,
+            collision_group = get(strings, collision_group) if collision else None
+        )) for mesh, material, shader, physics, collision, collider_mesh, collision_group, row in keys.tolist()]
+        # The first node of each group is its template, so the template's physics body and collider are not left registered without a node
+        first = set(first.tolist())
+        nodes = [templates[key] if row in first else templates[key].clone() for row, key in enumerate(inverse.reshape(-1).tolist())]
+
+        # Write the per node values directly, the nodes are not in the scene yet
+        for node, position, rotation, scale, forward, name, tags, static, occluder in zip(nodes, 
+                arrays['positions'].tolist(), arrays['rotations'].tolist(), arrays['scales'].tolist(), arrays['forwards'].tolist(),
+                table['names'], table['tags'], arrays['statics'].tolist(), occluders.tolist()):
+            node.internal_position._data = glm.vec3(position)
+            node.internal_rotation._data = glm.quat(*rotation)
+            node.internal_scale._data    = glm.vec3(scale)
+            node.internal_position.prev_data = glm.vec3(position)
+            node.internal_rotation.prev_data = glm.quat(*rotation)
+            node.internal_scale.prev_data    = glm.vec3(scale)
+            node._forward  = glm.vec3(forward)
+            node._name     = name
+            node._tags     = Tags(tags, callback=node.tags_callback)
+            node._static   = None if static == -1 else bool(static)
+            node._occluder = bool(occluder)
+
+        for row in np.flatnonzero(arrays['physics']).tolist(): nodes[row].physics_body.mass = float(arrays['masses'][row])
+        for row in np.flatnonzero(arrays['collisions']).tolist():
+            collider = nodes[row].collider
+            collider.static_friction  = float(arrays['static_frictions'][row])
+            collider.kinetic_friction = float(arrays['kinetic_frictions'][row])
+            collider.elasticity       = float(arrays['elasticities'][row])
+
+        # Rebuild the hierarchy with the saved relative transforms. Children are added to the store one at a time, so their velocities are written to the nodes
+        parents = arrays['parents']
+        for row in np.flatnonzero(parents != -1).tolist():
+            node, parent, flags = nodes[row], nodes[int(parents[row])], int(arrays['relative_flags'][row])
+            node.parent = parent
+            parent.children.append(node)
+            node._relative_position = glm.vec3(arrays['relative_positions'][row].tolist())  if flags & RELATIVE_POSITION else None
+            node._relative_rotation = glm.quat(*arrays['relative_rotations'][row].tolist()) if flags & RELATIVE_ROTATION else None
+            node._relative_scale    = glm.vec3(arrays['relative_scales'][row].tolist())     if flags & RELATIVE_SCALE    else None
+            node._velocity._data            = glm.vec3(arrays['velocities'][row].tolist())
+            node._rotational_velocity._data = glm.vec3(arrays['rotational_velocities'][row].tolist())
+
+        # The mapped columns of the roots are written to the transform store directly
+        roots = np.flatnonzero(parents == -1)
+        columns = [arrays[name] if len(roots) == count else arrays[name][roots] for name in ('positions', 'rotations', 'scales', 'velocities', 'rotational_velocities')]
+        node_handler.attach(nodes, [nodes[row] for row in roots.tolist()], *columns)
+
+    instances = [StaticInstance(glm.vec3(position), glm.quat(*rotation), glm.vec3(scale), get(meshes, mesh), get(materials, material), get(shaders, shader)) for position, rotation, scale, mesh, material, shader in zip(
+        reader.array('instance_positions').tolist(), reader.array('instance_rotations').tolist(), reader.array('instance_scales').tolist(),
+        reader.array('instance_meshes').tolist(), reader.array('instance_materials').tolist(), reader.array('instance_shaders').tolist())]
+
+    # Insert the instances with a single texture regeneration and BVH build
+    if instances: scene.add_many(instances)
+
+    return scene
+
+
+class SnapshotWriter():
+    scene: ...
+    """Scene being saved"""
+    table: dict
+    """Json table written after the header"""
+    arrays: list[np.ndarray]
+    """Arrays of the data section in the order they are written"""
+
+    def __init__(self, scene) -> None:
+        """
+        Collects the resources and arrays of a scene snapshot and writes them to a file
+        """
+
+        self.scene  = scene
+        self.engine = scene.engine
+        self.table  = {'arrays' : {}, 'meshes' : [], 'images' : [], 'materials' : [], 'shaders' : [], 'strings' : []}
+        self.arrays = []
+        self.offset = 0
+
+        # Resource lookups, keyed by identity or content hash
+        self.mesh_indices     = {}
+        self.mesh_hashes      = {}
+        self.image_hashes     = {}
+        self.material_indices = {}
+        self.shader_indices   = {}
+        self.string_indices   = {}
+
+    def array(self, name: str, values, dtype: str, shape: tuple) -> None:
+        """
+        Adds an array to the data section, padded to the alignment
+        """
+
+        data = np.ascontiguousarray(np.array(values, dtype=dtype).reshape(shape))
+        self.table['arrays'][name] = {'offset' : self.offset, 'dtype' : data.dtype.str, 'shape' : list(data.shape)}
+        self.arrays.append(data)
+        self.offset += -(-data.nbytes // alignment) * alignment
+
+    def mesh(self, mesh: Mesh | None) -> int:
+        """
+        Returns the index of the mesh in the mesh table, adding it if needed. Meshes with the same data share an entry
+        """
+
+        if mesh is None: return -1
+        if id(mesh) in self.mesh_indices: return self.mesh_indices[id(mesh)]
+
+        if mesh is self.engine.cube: key, entry = 'cube', {'builtin' : 'cube'}
+        else:
+            key = content_hash(mesh.data)
+            entry = {'hash' : key, 'custom' : bool(mesh.custom), 'array' : f'mesh_{key}'}
+            if key not in self.mesh_hashes: self.array(f'mesh_{key}', mesh.data, mesh.data.dtype.str, mesh.data.shape)
+
+        if key not in self.mesh_hashes:
+            self.mesh_hashes[key] = len(self.table['meshes'])
+            self.table['meshes'].append(entry)
+
+        self.mesh_indices[id(mesh)] = self.mesh_hashes[key]
+        return self.mesh_hashes[key]
+
+    def collider_mesh(self, node: Node) -> int:
+        """
+        Returns the mesh index of the node's collider. -1 means the collider uses the node's mesh
+        """
+
+        if not node.collider or node.collider.mesh is node.mesh: return -1
+        if isinstance(node.collider.mesh, str): return self.mesh(self.engine.cube) # The collider is not in a scene yet, so 'box' is unresolved
+        return self.mesh(node.collider.mesh)
+
+    def image(self, image: Image | None) -> int:
+        """
+        Returns the index of the image in the image table. Images with the same pixels share an entry
+        """
+
+        if image is None: return -1
+
+        data = np.frombuffer(image.data, dtype='u1')
+        key  = content_hash(data)
+        if key not in self.image_hashes:
+            self.image_hashes[key] = len(self.table['images'])
+            self.table['images'].append({'hash' : key, 'name' : image.name, 'size' : image.size, 'array' : f'image_{key}'})
+            self.array(f'image_{key}', data, 'u1', data.shape)
+
+        return self.image_hashes[key]
+
+    def material(self, material: Material | None) -> int:
+        """
+        Returns the index of the material in the material table
+        """
+
+        if material is None: return -1
+        if material in self.material_indices: return self.material_indices[material]
+
+        if material is self.engine.material_handler.base: entry = {'builtin' : 'base'}
+        else:
+            entry = {'name' : material.name, 'color' : list(material.color)}
+            entry.update({attribute : getattr(material, attribute) for attribute in material_attributes})
+            entry.update({attribute : self.image(getattr(material, attribute)) for attribute in material_images})
+
+        self.material_indices[material] = len(self.table['materials'])
+        self.table['materials'].append(entry)
+        return self.material_indices[material]
+
+    def shader(self, shader: Shader | None) -> int:
+        """
+        Returns the index of the shader in the shader table. -1 is the scene's default shader
+        """
+
+        if shader is None: return -1
+        if shader not in self.shader_indices:
+            self.shader_indices[shader] = len(self.table['shaders'])
+            self.table['shaders'].append({'vertex' : shader.vertex_shader, 'fragment' : shader.fragment_shader})
+
+        return self.shader_indices[shader]
+
+    def string(self, value: str | None) -> int:
+        """
+        Returns the index of the string in the string table
+        """
+
+        if value is None: return -1
+        if value not in self.string_indices:
+            self.string_indices[value] = len(self.table['strings'])
+            self.table['strings'].append(value)
+
+        return self.string_indices[value]
+
+    def write(self, path: str | os.PathLike) -> None:
+        """
+        Writes the header, the json table and the aligned data section to the file
+        """
+
+        table = json.dumps(self.table, separators=(',', ':')).encode('utf-8')
+        start = -(-(header.size + len(table)) // alignment) * alignment
+
+        with open(path, 'wb') as file:
+            file.write(header.pack(magic, version, 0, len(table)))
+            file.write(table)
+            file.write(bytes(start - header.size - len(table)))
+
+            for data in self.arrays:
+                file.write(data.tobytes())
+                file.write(bytes(-data.nbytes % alignment))
+
+
+class SnapshotReader():
+    engine: ...
+    """Engine that loaded resources are created with"""
+    table: dict
+    """Json table of the snapshot"""
+    data: np.ndarray
+    """Memory mapped bytes of the data section"""
+
+    def __init__(self, engine, path: str | os.PathLike) -> None:
+        """
+        Memory maps a snapshot file and creates the resources it references
+        """
+
+        self.engine = engine
+
+        raw = np.memmap(path, dtype='u1', mode='r')
+        if len(raw) < header.size: raise ValueError(f'Snapshot: {path} is not a basilisk scene snapshot')
+        file_magic, file_version, _, table_length = header.unpack(raw[:header.size].tobytes())
+        if file_magic != magic: raise ValueError(f'Snapshot: {path} is not a basilisk scene snapshot')
+        if file_version != version: raise ValueError(f'Snapshot: Unsupported snapshot version {file_version}. Expected version {version}')
+
+        self.table = json.loads(raw[header.size : header.size + table_length].tobytes())
+        start = -(-(header.size + table_length) // alignment) * alignment
+        self.data = raw[start:]
+
+    def array(self, name: str) -> np.ndarray:
+        """
+        Returns a read only view of the named array in the memory mapped data section
+        """
+
+        entry = self.table['arrays'][name]
+        dtype, shape = np.dtype(entry['dtype']), tuple(entry['shape'])
+        count = int(np.prod(shape))
+        return self.data[entry['offset'] : entry['offset'] + count * dtype.itemsize].view(dtype).reshape(shape)
+
+    def mesh(self, index: int) -> Mesh:
+        """
+        Creates the mesh at the given index of the mesh table
+        """
+
+        entry = self.table['meshes'][index]
+        if entry.get('builtin') == 'cube': return self.engine.cube
+        return Mesh(np.array(self.array(entry['array'])), custom_format=entry['custom'])
+
+    def image(self, index: int) -> Image:
+        """
+        Creates the image at the given index of the image table
+        """
+
+        entry = self.table['images'][index]
+
+        # The pixels are already resized to a texture size, so they are used directly instead of loading them through a surface
+        image = Image.__new__(Image)
+        image.name  = entry['name']
+        image.size  = entry['size']
+        image.data  = self.array(entry['array']).tobytes()
+        image.index = glm.ivec2(1, 1)
+        return image
+
+    def material(self, index: int, images: list[Image]) -> Material:
+        """
+        Creates the material at the given index of the material table
+        """
+
+        entry = self.table['materials'][index]
+        if entry.get('builtin') == 'base': return self.engine.material_handler.base
+
+        parameters = {attribute : entry[attribute] for attribute in material_attributes}
+        parameters.update({attribute : images[entry[attribute]] if entry[attribute] >= 0 else None for attribute in material_images})
+        return Material(name=entry['name'], color=tuple(entry['color']), **parameters)
+
+    def shader(self, index: int) -> Shader:
+        """
+        Returns a shader with the sources at the given index of the shader table, reusing a matching shader of the engine if there is one
+        """
+
+        entry = self.table['shaders'][index]
+        for shader in self.engine.shader_handler.shaders:
+            if shader.vertex_shader == entry['vertex'] and shader.fragment_shader == entry['fragment']: return shader
+
+        # Shaders are compiled from files, so the sources are written to temporary files
+        paths = []
+        for source, suffix in ((entry['vertex'], '.vert'), (entry['fragment'], '.frag')):
+            with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False) as file: file.write(source)
+            paths.append(file.name)
+
+        try: return Shader(self.engine, *paths)
+        finally:
+            for path in paths: os.remove(path)
+
+
+def content_hash(data: np.ndarray) -> str:
+    """
+    Returns a stable hash of the array contents
+    """
+
+    return hashlib.sha1(np.ascontiguousarray(data).tobytes()).hexdigest()[:16]
@@ -0,0 +1,105 @@
+import numpy as np
+from basilisk.render.allocator import Allocator
+
+
+def check(allocator: Allocator, occupied: np.ndarray) -> None:
+    """
+    Checks the free list against a model of which units are occupied
+    """
+
+    assert allocator.capacity == len(occupied)
+    assert allocator.used == np.sum(occupied)
+
+    free = np.zeros(len(occupied), dtype=bool)
+    for i, (start, length) in enumerate(allocator.free):
+        assert length > 0
+        if i: assert sum(allocator.free[i - 1]) < start # Sorted, disjoint and merged
+        free[start:start + length] = True
+    assert np.array_equal(free, ~occupied)
+
+    used = np.flatnonzero(occupied)
+    assert allocator.end == (used[-1] + 1 if len(used) else 0)
+    assert allocator.holes == allocator.end - allocator.used
+
+
+def test_first_fit():
+    allocator = Allocator(10)
+    assert [allocator.allocate(length) for length in (3, 3, 3)] == [0, 3, 6]
+    assert allocator.allocate(2) is None
+
+    allocator.release(3, 3)
+    assert allocator.allocate(4) is None
+    assert allocator.allocate(2) == 3
+    assert allocator.allocate(1) == 5
+    assert allocator.allocate(1) == 9
+    assert allocator.free == []
+
+def test_release_merges():
+    allocator = Allocator(12)
+    for _ in range(4): allocator.allocate(3)
+
+    allocator.release(0, 3)
+    allocator.release(6, 3)
+    assert allocator.free == [[0, 3], [6, 3]]
+    assert allocator.holes == 6
+
+    allocator.release(3, 3)
+    assert allocator.free == [[0, 9]]
+
+    allocator.release(9, 3)
+    assert allocator.free == [[0, 12]] and allocator.used == 0 and allocator.end == 0
+
+    allocator.release(0, 0)
+    assert allocator.free == [[0, 12]]
+
+def test_grow():
+    allocator = Allocator()
+    assert allocator.allocate(1) is None
+
+    allocator.grow(4)
+    assert allocator.allocate(4) == 0
+    allocator.grow(8)
+    assert allocator.free == [[4, 4]]
+
+    # A free range at the end is extended instead of adding a new range
+    allocator.grow(16)
+    allocator.grow(2)
+    assert allocator.free == [[4, 12]] and allocator.capacity == 16
+
+def test_reset():
+    allocator = Allocator(8)
+    allocator.allocate(5)
+    allocator.reset(16, 10)
+    assert allocator.free == [[10, 6]] and allocator.used == 10 and allocator.end == 10
+
+    allocator.reset(4, 4)
+    assert allocator.free == [] and allocator.end == 4
+
+def test_random():
+    random = np.random.default_rng(0)
+    allocator = Allocator(64)
+    occupied = np.zeros(64, dtype=bool)
+    ranges = []
+
+    for _ in range(2000):
+        if ranges and random.random() < 0.45:
+            start, length = ranges.pop(random.integers(len(ranges)))
+            allocator.release(start, length)
+            occupied[start:start + length] = False
+        else:
+            length = int(random.integers(1, 9))
+            start = allocator.allocate(length)
+
+            # First fit returns the lowest start with enough free units after it
+            fits = [i for i in range(len(occupied) - length + 1) if not occupied[i:i + length].any()]
+            assert start == (fits[0] if fits else None)
+
+            if start is None:
+                allocator.grow(len(occupied) * 2)
+                occupied = np.concatenate([occupied, np.zeros(len(occupied), dtype=bool)])
+                continue
+
+            occupied[start:start + length] = True
+            ranges.append((start, length))
+
+        check(allocator, occupied)
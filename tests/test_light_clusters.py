@@ -0,0 +1,76 @@
+import numpy as np
+import glm
+import pytest
+from basilisk.render.light_clusters import LightClusters
+
+VIEW = glm.lookAt(glm.vec3(0, 2, 10), glm.vec3(0, 0, 0), glm.vec3(0, 1, 0))
+PROJECTION = glm.perspective(glm.radians(50), 16 / 9, 0.1, 350)
+
+
+@pytest.fixture
+def lights() -> tuple[np.ndarray, np.ndarray]:
+    random = np.random.default_rng(0)
+    positions = random.uniform(-40, 40, (300, 3)).astype('f4')
+    radii = random.uniform(0.5, 10, 300).astype('f4')
+    return positions, radii
+
+
+def test_grid_ranges(lights):
+    clusters = LightClusters((16, 9, 24), 0.1, 350)
+    clusters.assign(VIEW, PROJECTION, *lights)
+
+    # Each cluster's range starts where the previous one ends
+    starts, counts = clusters.grid[:, :, 0].reshape(-1), clusters.grid[:, :, 1].reshape(-1)
+    assert counts.sum() == len(clusters.indices)
+    assert np.array_equal(starts, np.cumsum(counts) - counts)
+    assert np.all(clusters.indices < len(lights[0]))
+
+    # A light is assigned to a cluster at most once
+    for z in range(24):
+        for y in range(9):
+            for x in range(16):
+                indices = clusters.get_lights((x, y, z))
+                assert len(np.unique(indices)) == len(indices)
+
+def test_assign_against_brute_force(lights):
+    # Every point a light reaches must have the light in the cluster containing the point
+    positions, radii = lights
+    clusters = LightClusters((16, 9, 24), 0.1, 350)
+    clusters.assign(VIEW, PROJECTION, positions, radii)
+
+    random = np.random.default_rng(1)
+    tested = 0
+    for light, (position, radius) in enumerate(zip(positions.tolist(), radii.tolist())):
+        directions = random.normal(size=(40, 3))
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        points = np.array(position) + directions * radius * random.uniform(0, 0.99, (40, 1))
+
+        for point in points.tolist():
+            cluster = clusters.get_cluster(VIEW, PROJECTION, glm.vec3(point))
+            if cluster is None: continue
+            assert light in clusters.get_lights(cluster).tolist(), (light, cluster)
+            tested += 1
+
+    assert tested > 1000
+
+def test_lights_out_of_view():
+    clusters = LightClusters((8, 4, 12), 0.1, 100)
+
+    # Behind the camera, beyond the far plane and off to the side
+    positions = np.array([[0, 2, 30], [0, 2, -200], [300, 2, 0]], dtype='f4')
+    clusters.assign(VIEW, PROJECTION, positions, np.ones(3, dtype='f4'))
+    assert len(clusters.indices) == 0 and not clusters.grid.any()
+
+    # A light containing the camera reaches the nearest slice of every tile
+    clusters.assign(VIEW, PROJECTION, np.array([[0, 2, 10]], dtype='f4'), np.array([1], dtype='f4'))
+    assert np.all(clusters.grid[0, :, 1] == 1)
+
+def test_no_lights():
+    clusters = LightClusters()
+    clusters.assign(VIEW, PROJECTION, np.zeros((0, 3), dtype='f4'), np.zeros(0, dtype='f4'))
+    assert len(clusters.indices) == 0 and not clusters.grid.any()
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError): LightClusters((16, 9))
+    with pytest.raises(ValueError): LightClusters((16, 0, 24))
+    with pytest.raises(ValueError): LightClusters(near=10, far=1)
@@ -0,0 +1,144 @@
+import os
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from basilisk.nodes.node import Node
+from basilisk.nodes.node_index import NodeIndex
+from basilisk.nodes.helper import node_is
+from basilisk.mesh.mesh import Mesh
+from basilisk.render.material import Material
+
+TESTS = os.path.dirname(__file__)
+NAMES = ['a', 'b', 'c']
+TAGS  = ['x', 'y', 'z']
+
+
+@pytest.fixture(scope='module')
+def resources() -> tuple:
+    meshes = [Mesh(os.path.join(TESTS, 'cube.obj')), Mesh(os.path.join(TESTS, 'wedge.obj'))]
+    materials = [Material(color=(255, 0, 0)), Material(color=(0, 0, 255))]
+    return meshes, materials
+
+
+def make_node(random, meshes: list, materials: list) -> Node:
+    physics = bool(random.integers(2))
+    return Node(
+        mesh      = meshes[random.integers(len(meshes))],
+        material  = materials[random.integers(len(materials))] if random.integers(4) else [materials[0], materials[1]] * 6,
+        name      = NAMES[random.integers(len(NAMES))],
+        tags      = [tag for tag in TAGS if random.integers(2)],
+        physics   = physics,
+        collision = physics or bool(random.integers(2)),
+        velocity  = (int(random.integers(2)), 0, 0),
+        static    = None if random.integers(2) else bool(random.integers(2))
+    )
+
+def make_query(random, meshes: list, materials: list) -> dict:
+    options = {
+        'name'       : NAMES[random.integers(len(NAMES))],
+        'tags'       : [tag for tag in TAGS if random.integers(3) == 0],
+        'mesh'       : meshes[random.integers(len(meshes))],
+        'material'   : materials[random.integers(len(materials))],
+        'physics'    : bool(random.integers(2)),
+        'collisions' : bool(random.integers(2)),
+        'static'     : bool(random.integers(2)),
+    }
+    return {key : value for key, value in options.items() if random.integers(3) == 0}
+
+def check(index: NodeIndex, nodes: list, random, meshes: list, materials: list) -> None:
+    """
+    Compares random queries of the index to filtering the nodes with node_is
+    """
+
+    assert set(index.get_nodes(index.all)) == set(nodes)
+    for _ in range(50):
+        query = make_query(random, meshes, materials)
+        expected = {node for node in nodes if node_is(node, **query)}
+        assert set(index.get_nodes(index.query(**query))) == expected, query
+
+
+def test_empty():
+    index = NodeIndex()
+    assert index.query() == 0 and index.query(name='a') == 0
+    assert index.get_nodes(0) == []
+
+def test_add_remove(resources):
+    random = np.random.default_rng(0)
+    index = NodeIndex()
+    nodes = []
+
+    for _ in range(300):
+        if nodes and random.random() < 0.4:
+            node = nodes.pop(random.integers(len(nodes)))
+            index.remove(node)
+            index.remove(node)
+        else:
+            node = make_node(random, *resources)
+            index.add(node)
+            nodes.append(node)
+    check(index, nodes, random, *resources)
+
+    # Removed bits are compacted
+    assert len(index.nodes) < 300
+
+def test_insertion_order(resources):
+    random = np.random.default_rng(3)
+    index = NodeIndex()
+    nodes = []
+
+    # Query results keep the order nodes were added in across removals and compaction
+    for step in range(600):
+        if nodes and random.random() < 0.45: index.remove(nodes.pop(random.integers(len(nodes))))
+        else:
+            node = make_node(random, *resources)
+            if step % 5: index.add(node)
+            else: index.add_many([node])
+            nodes.append(node)
+
+        if step % 20 == 0:
+            assert index.get_nodes(index.all) == nodes
+            query = make_query(random, *resources)
+            assert index.get_nodes(index.query(**query)) == [node for node in nodes if node_is(node, **query)]
+
+    assert len(index.nodes) < 2 * len(nodes) + 65
+
+def test_add_many(resources):
+    random = np.random.default_rng(1)
+    index = NodeIndex()
+    nodes = [make_node(random, *resources) for _ in range(200)]
+    index.add(nodes[0])
+    index.add_many(nodes)
+    check(index, nodes, random, *resources)
+
+    # Copies with the same attributes are merged into one group
+    template = make_node(random, *resources)
+    copies = [template.clone() for _ in range(100)]
+    index.add_many(copies)
+    check(index, nodes + copies, random, *resources)
+
+    for node in nodes[::3] + copies[::2]: index.remove(node)
+    check(index, nodes[1::3] + nodes[2::3] + copies[1::2], random, *resources)
+
+def test_update(resources):
+    random = np.random.default_rng(2)
+    index = NodeIndex()
+    nodes = [make_node(random, *resources) for _ in range(100)]
+    index.add_many(nodes)
+
+    for node in nodes[::2]:
+        other = make_node(random, *resources)
+        node.name     = other.name
+        node.tags     = other.tags
+        node.mesh     = other.mesh
+        node.material = other.material
+        index.update(node)
+    check(index, nodes, random, *resources)
+
+    # Tags edited in place are reindexed by the node's handler. Only its index is needed here
+    node = nodes[1]
+    node.node_handler = SimpleNamespace(node_index=index)
+    node.tags = []
+    node.tags.append('w')
+    assert index.get_nodes(index.query(tags=['w'])) == [node]
+    node.tags.remove('w')
+    assert index.query(tags=['w']) == 0
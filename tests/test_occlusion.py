@@ -0,0 +1,120 @@
+import numpy as np
+import glm
+import pytest
+from basilisk.render import occlusion
+from basilisk.render.occlusion import OcclusionBuffer
+
+# Camera at the origin looking down -z
+MATRIX = glm.perspective(glm.radians(60), 2, 0.1, 100) * glm.lookAt(glm.vec3(0, 0, 0), glm.vec3(0, 0, -1), glm.vec3(0, 1, 0))
+
+
+def quad(a, b, c, d) -> np.ndarray:
+    """
+    Two clip space triangles of the quad with the given world space corners
+    """
+
+    points = np.hstack([np.array([a, b, c, d], dtype='f4'), np.ones((4, 1), dtype='f4')]) @ np.array(MATRIX.to_list(), dtype='f4')
+    return points[[[0, 1, 2], [0, 2, 3]]]
+
+def make_buffer(*quads) -> OcclusionBuffer:
+    """
+    Occlusion buffer with the given quads drawn into it
+    """
+
+    buffer = OcclusionBuffer(64, 32)
+    buffer.matrix = np.array(MATRIX.to_list(), dtype='f4')
+    if quads: buffer.rasterize(np.concatenate(quads))
+    buffer.build_levels()
+    return buffer
+
+def box(center, size) -> tuple:
+    center = np.array(center, dtype='f4')
+    return center - size / 2, center + size / 2
+
+def visible(buffer, *boxes) -> list[bool]:
+    minimums, maximums = zip(*boxes)
+    return buffer.test_boxes(np.array(minimums, dtype='f4'), np.array(maximums, dtype='f4')).tolist()
+
+
+@pytest.fixture
+def wall() -> OcclusionBuffer:
+    # Wall covering the middle of the screen 10 units in front of the camera
+    return make_buffer(quad((-4, -3, -10), (4, -3, -10), (4, 3, -10), (-4, 3, -10)))
+
+
+def test_wall_depth(wall):
+    assert wall.depth[16, 32] == pytest.approx(10, rel=1e-3)
+    assert np.isinf(wall.depth[0, 0]) and np.isinf(wall.depth[-1, -1])
+
+def test_boxes_behind_wall_are_hidden(wall):
+    assert visible(wall, box((0, 0, -20), 1), box((1, 1, -30), 2)) == [False, False]
+
+def test_boxes_in_front_of_wall_are_visible(wall):
+    assert visible(wall, box((0, 0, -5), 1), box((0, 0, -10), 1)) == [True, True]
+
+def test_boxes_beside_wall_are_visible(wall):
+    # The second box is behind the wall but reaches past its edge
+    assert visible(wall, box((12, 0, -20), 1), box((8, 0, -20), 2)) == [True, True]
+
+def test_boxes_off_screen_are_visible(wall):
+    assert visible(wall, box((200, 0, -20), 1), box((0, 0, 20), 1)) == [True, True]
+
+def test_boxes_crossing_near_plane_are_visible(wall):
+    assert visible(wall, box((0, 0, 0), 1), box((0, 0, -10), 30)) == [True, True]
+
+def test_empty_buffer():
+    buffer = make_buffer()
+    assert visible(buffer, box((0, 0, -20), 1)) == [True]
+    assert buffer.test_boxes(np.zeros((0, 3), dtype='f4'), np.zeros((0, 3), dtype='f4')).shape == (0,)
+
+def test_occluder_crossing_near_plane():
+    # Floor below the camera reaching behind it. Without clipping its triangles are skipped or folded over the screen
+    floor = make_buffer(quad((-100, -1, 50), (100, -1, 50), (100, -1, -100), (-100, -1, -100)))
+    assert np.all(np.isfinite(floor.depth[0]))
+    assert np.all(np.isinf(floor.depth[-1]))
+    assert visible(floor, box((0, -4, -20), 1), box((0, 2, -20), 1), box((0, -0.5, -5), 0.5)) == [False, True, True]
+
+def test_hierarchy_levels():
+    # Each level holds the farthest depth of its 2x2 blocks, so the single pixel level is the farthest depth
+    buffer = make_buffer(quad((-100, -100, -10), (100, -100, -10), (100, 100, -10), (-100, 100, -10)), quad((-1, -1, -5), (1, -1, -5), (1, 1, -5), (-1, 1, -5)))
+    assert buffer.levels[buffer.offsets[-1]] == pytest.approx(10, rel=1e-3)
+    for level in range(1, len(buffer.offsets)):
+        width, height = buffer.widths[level], buffer.heights[level]
+        previous = buffer.levels[buffer.offsets[level - 1]:buffer.offsets[level - 1] + buffer.widths[level - 1] * buffer.heights[level - 1]].reshape(buffer.heights[level - 1], -1)
+        current = buffer.levels[buffer.offsets[level]:buffer.offsets[level] + width * height].reshape(height, width)
+        assert np.all(current >= previous[::2, ::2][:height, :width])
+
+    # Large boxes are read from a coarse level. The small box behind the near quad is only hidden if it is read from a fine level
+    assert visible(buffer, box((0, 0, -40), 30), box((0, 0, -7), 1), box((0, 0, -7), 4)) == [False, False, True]
+
+def test_conservative_against_full_resolution():
+    # A box visible at any full resolution pixel it covers must never be hidden by the hierarchy
+    buffer = make_buffer(quad((-4, -3, -10), (4, -3, -10), (4, 3, -10), (-4, 3, -10)), quad((2, -6, -15), (9, -6, -15), (9, 1, -15), (2, 1, -15)))
+    random = np.random.default_rng(1)
+    minimums = random.uniform((-12, -6, -40), (12, 6, -6), (500, 3)).astype('f4')
+    maximums = minimums + random.uniform(0.1, 6, (500, 3)).astype('f4')
+    result = buffer.test_boxes(minimums, maximums)
+
+    signs = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype='f4')
+    for minimum, maximum, hierarchy in zip(minimums, maximums, result):
+        corners = np.hstack([minimum + signs * (maximum - minimum), np.ones((8, 1), dtype='f4')]) @ buffer.matrix
+        x = (corners[:, 0] / corners[:, 3] * 0.5 + 0.5) * buffer.width
+        y = (corners[:, 1] / corners[:, 3] * 0.5 + 0.5) * buffer.height
+        x0, x1 = int(max(x.min(), 0)), int(min(x.max(), buffer.width - 1e-3))
+        y0, y1 = int(max(y.min(), 0)), int(min(y.max(), buffer.height - 1e-3))
+        if x0 > x1 or y0 > y1: continue
+        if corners[:, 3].min() <= buffer.depth[y0:y1 + 1, x0:x1 + 1].max(): assert hierarchy
+    assert not result.all()
+
+def test_rasterize_clips_to_near_plane():
+    # Floor triangle reaching behind the camera. Clipping keeps the part in front of the camera
+    depth = np.full((32, 64), np.inf, dtype='f4')
+    occlusion.rasterize_triangles(depth, quad((-20, -1, -5), (20, -1, -5), (0, -1, 20), (0, -1, 20))[:1])
+    assert np.isfinite(depth[0, 32])
+    assert 3 < depth[np.isfinite(depth)].max() <= 5.001
+    assert np.all(np.isinf(depth[16:]))
+
+    # Triangles entirely behind the camera are skipped
+    depth[:] = np.inf
+    occlusion.rasterize_triangles(depth, quad((-1, -1, 5), (1, -1, 5), (0, 1, 5), (0, 1, 5))[:1])
+    assert np.all(np.isinf(depth))
@@ -0,0 +1,131 @@
+import os
+import re
+import numpy as np
+import pytest
+from basilisk.render.packing import pack_vertices, get_stride, octahedral_encode
+from basilisk.render.shader import packed_attributes
+
+# Attributes of shaders/batch_packed.vert
+ATTRIBUTES = ['in_position', 'in_uv_half', 'in_normal_oct', 'in_tangent_oct', 'obj_position', 'obj_rotation_snorm', 'obj_scale', 'obj_material_index']
+FMTS = ['3f', '2f2', '2i2', '2i2', '3f', '4i2', '3f', '1i4']
+
+
+def unpack(packed: np.ndarray, attributes: list[str], fmts: list[str]) -> dict:
+    """
+    Reads the attributes of packed vertices the way the vertex shader receives them
+    """
+
+    dtype = np.dtype([(attribute, f'<{fmt[1]}{fmt[2:] or 4}', (int(fmt[0]),)) for attribute, fmt in zip(attributes, fmts)])
+    records = np.ascontiguousarray(packed).view(dtype).reshape(-1)
+    return {attribute : records[attribute].astype('f8') if attribute != 'in_tangent_oct' else records[attribute].astype('i4') for attribute in attributes}
+
+def octahedral_decode(square: np.ndarray) -> np.ndarray:
+    """
+    Port of octahedralDecode in shaders/batch_packed.vert
+    """
+
+    direction = np.hstack([square, 1 - np.abs(square[:, :1]) - np.abs(square[:, 1:])])
+    fold = np.maximum(-direction[:, 2:], 0)
+    direction[:, :2] += np.where(direction[:, :2] >= 0, -fold, fold)
+    return direction / np.linalg.norm(direction, axis=1, keepdims=True)
+
+def decode(packed: np.ndarray) -> dict:
+    """
+    Port of the unpacking at the start of main in shaders/batch_packed.vert
+    """
+
+    values = unpack(packed, ATTRIBUTES, FMTS)
+    tangent_oct = values['in_tangent_oct']
+    normal = octahedral_decode(values['in_normal_oct'] / 32767)
+    tangent = octahedral_decode(np.stack([tangent_oct[:, 0] / 32767, (tangent_oct[:, 1] >> 1) / 16383], axis=1))
+    bitangent = np.cross(normal, tangent) * np.where((tangent_oct[:, 1:] & 1) == 1, -1, 1)
+    return {
+        'position' : values['in_position'],
+        'uv'       : values['in_uv_half'],
+        'normal'   : normal,
+        'tangent'  : tangent,
+        'bitangent': bitangent,
+        'obj_position' : values['obj_position'],
+        'rotation' : values['obj_rotation_snorm'] / 32767,
+        'scale'    : values['obj_scale'],
+        'material' : values['obj_material_index'][:, 0],
+    }
+
+def unit(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def random_data(random, n: int) -> np.ndarray:
+    """
+    Rows of the full 25 column batch layout with a random tangent frame
+    """
+
+    normals = unit(random.normal(size=(n, 3)))
+    tangents = unit(np.cross(normals, unit(random.normal(size=(n, 3)))))
+    bitangents = np.cross(normals, tangents) * np.where(random.random((n, 1)) < 0.5, -1, 1)
+
+    return np.hstack([
+        random.uniform(-50, 50, (n, 3)), random.uniform(0, 1, (n, 2)),
+        normals, tangents, bitangents,
+        random.uniform(-50, 50, (n, 3)), unit(random.normal(size=(n, 4))), random.uniform(0.1, 4, (n, 3)),
+        random.integers(0, 1000, (n, 1))
+    ]).astype('f4')
+
+
+def test_shader_layout():
+    # The decoded layout matches the inputs of the packed shader and the formats the shader parser gives them
+    path = os.path.join(os.path.dirname(__file__), '..', 'basilisk', 'shaders', 'batch_packed.vert')
+    with open(path) as file: inputs = re.findall(r'layout \(location = \d+\) in \w+\s+(\w+);', file.read())
+    assert inputs == ATTRIBUTES
+    assert all(packed_attributes[attribute][0] == fmt for attribute, fmt in zip(ATTRIBUTES, FMTS) if attribute in packed_attributes)
+
+def test_stride():
+    assert get_stride(FMTS) == 12 + 4 + 4 + 4 + 12 + 8 + 12 + 4
+    assert get_stride(['3f', '2f2', '1i4']) == 20
+
+def test_decode():
+    random = np.random.default_rng(0)
+    data = random_data(random, 5000)
+    packed = pack_vertices(data, ATTRIBUTES, FMTS)
+    assert packed.dtype == np.uint8 and packed.shape == (5000, get_stride(FMTS))
+
+    values = decode(packed)
+    assert np.array_equal(values['position'], data[:, 0:3])
+    assert np.allclose(values['uv'], data[:, 3:5], atol=1e-3)
+    assert np.array_equal(values['obj_position'], data[:, 14:17])
+    assert np.allclose(values['rotation'], data[:, 17:21], atol=1 / 32767)
+    assert np.array_equal(values['scale'], data[:, 21:24])
+    assert np.array_equal(values['material'], data[:, 24])
+
+    # Directions are within a fraction of a degree and the bitangent keeps its side
+    assert np.min(np.sum(values['normal']  * data[:, 5:8],  axis=1)) > np.cos(np.radians(0.05))
+    assert np.min(np.sum(values['tangent'] * data[:, 8:11], axis=1)) > np.cos(np.radians(0.1))
+    assert np.min(np.sum(values['bitangent'] * data[:, 11:14], axis=1)) > np.cos(np.radians(0.2))
+
+@pytest.mark.parametrize('direction', [(0, 0, 1), (0, 0, -1), (1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (1, 1, -1), (-1, 1, -1), (-1, -1, -1), (1, -1, -1)])
+def test_octahedral_axes(direction):
+    # Axes and the corners of the folded lower half round trip
+    direction = unit(np.array([direction], dtype='f4'))
+    assert np.allclose(octahedral_decode(np.round(octahedral_encode(direction) * 32767) / 32767), direction, atol=1e-4)
+
+def test_degenerate_frames():
+    data = np.zeros((3, 25), dtype='f4')
+    data[:, 5:8] = [[0, 0, 0], [0, 0, 1], [1, 0, 0]]
+    data[:, 8:11] = [[0, 0, 0], [0, 0, 1], [0, 0, 0]]
+
+    # Zero normals decode to the positive z axis and tangents parallel to the normal are replaced by a perpendicular one
+    values = decode(pack_vertices(data, ATTRIBUTES, FMTS))
+    assert np.allclose(values['normal'][0], [0, 0, 1])
+    assert np.all(np.isfinite(values['tangent'])) and np.all(np.isfinite(values['bitangent']))
+    assert np.allclose(np.sum(values['normal'][1:] * values['tangent'][1:], axis=1), 0, atol=1e-3)
+
+def test_offset_and_unknown_attributes():
+    random = np.random.default_rng(1)
+    data = random_data(random, 10)
+
+    # Node data starts at column 14 of the full layout
+    attributes, fmts = ['obj_position', 'obj_rotation_snorm', 'obj_material_index', 'in_unknown'], ['3f', '4i2', '1i4', '2f']
+    values = unpack(pack_vertices(data[:, 14:], attributes, fmts, offset=14), attributes, fmts)
+    assert np.array_equal(values['obj_position'], data[:, 14:17])
+    assert np.allclose(values['obj_rotation_snorm'] / 32767, data[:, 17:21], atol=1 / 32767)
+    assert np.array_equal(values['obj_material_index'][:, 0], data[:, 24])
+    assert not values['in_unknown'].any()
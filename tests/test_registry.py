@@ -0,0 +1,74 @@
+import numpy as np
+from basilisk.generic.registry import Registry
+
+
+class Item():
+    def __init__(self, value: int) -> None:
+        self.value = value
+
+
+def check(registry: Registry, model: dict) -> None:
+    """
+    Checks the registry against a dictionary of handles to items
+    """
+
+    assert len(registry) == len(model) and bool(registry) == bool(model)
+    assert {id(item) for item in registry} == {id(item) for item in model.values()}
+    for handle, item in model.items():
+        assert registry.get(handle) is item
+        assert registry.get_handle(item) == handle
+        assert item in registry
+        assert registry[registry.slots[handle]] is item
+
+
+def test_add_remove():
+    registry = Registry()
+    a, b, c = Item(0), Item(1), Item(2)
+    assert [registry.add(item) for item in (a, b, c)] == [0, 1, 2]
+    assert registry.add(b) == 1 and len(registry) == 3
+
+    # The last item is swapped into the removed slot and keeps its handle
+    assert registry.remove(a)
+    assert registry.items == [c, b]
+    assert registry.get(2) is c and registry.get(0) is None
+    assert not registry.remove(a)
+    assert registry.get_handle(a) == -1 and a not in registry
+
+    # Removed handles are reused
+    d = Item(3)
+    assert registry.add(d) == 0
+    check(registry, {0 : d, 1 : b, 2 : c})
+
+def test_invalid_handles():
+    registry = Registry()
+    registry.add(Item(0))
+    assert registry.get(-1) is None and registry.get(1) is None and registry.get(100) is None
+
+def test_clear():
+    registry = Registry()
+    items = [Item(i) for i in range(5)]
+    for item in items: registry.add(item)
+    registry.clear()
+    assert not registry and registry.get(0) is None and items[0] not in registry
+    assert registry.add(items[3]) == 0
+
+def test_random():
+    random = np.random.default_rng(0)
+    registry = Registry()
+    model = {}
+    items = [Item(i) for i in range(50)]
+
+    for _ in range(2000):
+        item = items[random.integers(len(items))]
+        if item in registry:
+            handle = registry.get_handle(item)
+            assert registry.remove(item)
+            del model[handle]
+        else:
+            handle = registry.add(item)
+            assert handle not in model
+            model[handle] = item
+        check(registry, model)
+
+    # Handles stay below the largest number of items registered at once
+    assert len(registry.slots) <= len(items)
@@ -0,0 +1,134 @@
+import os
+import numpy as np
+import pytest
+from basilisk.mesh.mesh import Mesh
+from basilisk.mesh.simplify import simplify, save_lods, load_lods
+
+TESTS = os.path.dirname(__file__)
+
+
+@pytest.fixture(scope='module')
+def sphere() -> Mesh:
+    return Mesh(os.path.join(TESTS, 'sphere.obj'))
+
+@pytest.fixture(scope='module')
+def monkey() -> Mesh:
+    return Mesh(os.path.join(TESTS, 'monkey.obj'))
+
+
+def get_radius(vertices: np.ndarray) -> float:
+    return np.linalg.norm(np.ptp(vertices[:, :3], axis=0)) / 2
+
+def get_edge_counts(vertices: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """
+    Number of triangles using each edge, with vertices welded by position so uv and normal seams are not counted as borders
+    """
+
+    _, positions = np.unique(vertices[:, :3], axis=0, return_inverse=True)
+    corners = positions.reshape(-1)[indices.reshape(-1, 3)]
+    edges = np.sort(np.concatenate([corners[:, [0, 1]], corners[:, [1, 2]], corners[:, [2, 0]]]), axis=1)
+    return np.unique(edges, axis=0, return_counts=True)[1]
+
+def get_distances(points: np.ndarray, vertices: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """
+    Distance from each point to the nearest triangle of the mesh
+    """
+
+    positions = vertices[:, :3].astype('f8')
+    triangles = positions[indices.reshape(-1, 3)]
+    distances = np.full(len(points), np.inf)
+
+    for a, b, c in triangles:
+        ab, ac, offsets = b - a, c - a, points - a
+        normal = np.cross(ab, ac)
+        normal /= np.linalg.norm(normal)
+
+        # Points projecting inside the triangle are at their plane distance, the rest are nearest to an edge
+        u, v = np.linalg.lstsq(np.stack([ab, ac], axis=1), offsets.T, rcond=None)[0]
+        inside = (u >= 0) & (v >= 0) & (u + v <= 1)
+        nearest = np.where(inside, np.abs(offsets @ normal), np.inf)
+        for start, end in ((a, b), (b, c), (c, a)):
+            t = np.clip((points - start) @ (end - start) / ((end - start) @ (end - start)), 0, 1)
+            nearest = np.minimum(nearest, np.linalg.norm(points - (start + t[:, None] * (end - start)), axis=1))
+        distances = np.minimum(distances, nearest)
+
+    return distances
+
+
+@pytest.mark.parametrize('target', [480, 240, 100])
+def test_target(sphere, target):
+    vertices, indices = simplify(sphere.vertices, sphere.vertex_indices, target, max_error=1.0)
+    assert 0 < len(indices) // 3 <= target
+    assert indices.dtype == np.uint32 and indices.max() < len(vertices)
+
+@pytest.mark.parametrize('max_error', [0.005, 0.01, 0.05])
+def test_error_bound(sphere, monkey, max_error):
+    # Every point of the original surface stays within the error of the simplified surface
+    for mesh in (sphere, monkey):
+        vertices, indices = simplify(mesh.vertices, mesh.vertex_indices, len(mesh.vertex_indices) // 6, max_error)
+        distances = get_distances(mesh.vertices[:, :3].astype('f8'), vertices, indices)
+        assert distances.max() <= max_error * get_radius(mesh.vertices)
+
+def test_error_stops_early(sphere):
+    vertices, indices = simplify(sphere.vertices, sphere.vertex_indices, 100, max_error=0.001)
+    assert len(indices) // 3 > 100
+
+def test_vertices_keep_attributes(sphere):
+    # Collapses move vertices onto neighbours, so every simplified vertex has an original position and original attributes
+    vertices, indices = simplify(sphere.vertices, sphere.vertex_indices, 240)
+    positions = {tuple(vertex[:3]) for vertex in sphere.vertices.tolist()}
+    attributes = {tuple(vertex[3:]) for vertex in sphere.vertices.tolist()}
+    assert all(tuple(vertex[:3]) in positions and tuple(vertex[3:]) in attributes for vertex in vertices.tolist())
+
+def test_seams_stay_welded(sphere, monkey):
+    # The sphere has uv seams, so it has more vertices than positions
+    assert len(np.unique(sphere.vertices[:, :3], axis=0)) < len(sphere.vertices)
+
+    # The closed sphere stays closed, and the open monkey gains no border edges
+    vertices, indices = simplify(sphere.vertices, sphere.vertex_indices, 240, max_error=1.0)
+    assert np.all(get_edge_counts(vertices, indices) == 2)
+
+    borders = np.sum(get_edge_counts(monkey.vertices, monkey.vertex_indices) == 1)
+    vertices, indices = simplify(monkey.vertices, monkey.vertex_indices, 400)
+    counts = get_edge_counts(vertices, indices)
+    assert np.all(counts <= 2) and 0 < np.sum(counts == 1) <= borders
+
+def test_generate_lods():
+    mesh = Mesh(os.path.join(TESTS, 'sphere.obj'))
+
+    # The chain stops once a level removes less than half of the triangles it was asked to
+    counts = [len(indices) // 3 for _, indices in mesh.generate_lods(4)]
+    assert counts == [960, 480, 284]
+    assert len(simplify(*mesh.lods[-1], 142)[1]) // 3 > 284 * 3 // 4
+
+    counts = [len(indices) // 3 for _, indices in mesh.generate_lods(4, max_error=0.2)]
+    assert len(counts) == 5
+    assert all(count <= previous * 3 // 4 for previous, count in zip(counts, counts[1:]))
+
+    assert mesh.get_lod(100) is mesh.lods[-1]
+    with pytest.raises(ValueError): mesh.generate_lods(2, ratio=1)
+
+def test_save_load_lods(sphere, tmp_path):
+    lods = [simplify(sphere.vertices, sphere.vertex_indices, 480), simplify(sphere.vertices, sphere.vertex_indices, 240)]
+    path = tmp_path / 'lods.npz'
+    save_lods(path, lods)
+
+    loaded = load_lods(path)
+    assert len(loaded) == 2
+    for (vertices, indices), (loaded_vertices, loaded_indices) in zip(lods, loaded):
+        assert loaded_vertices.dtype == vertices.dtype and np.array_equal(loaded_vertices, vertices)
+        assert loaded_indices.dtype == indices.dtype and np.array_equal(loaded_indices, indices)
+
+def test_lod_cache(tmp_path):
+    mesh = Mesh(os.path.join(TESTS, 'sphere.obj'))
+    generated = [tuple(array.copy() for array in lod) for lod in mesh.generate_lods(3, cache=tmp_path)]
+    assert len(os.listdir(tmp_path)) == 1
+
+    # The cached chain is loaded instead of generated, other arguments get their own file
+    cached = Mesh(os.path.join(TESTS, 'sphere.obj'))
+    assert [len(indices) for _, indices in cached.generate_lods(3, cache=tmp_path)] == [len(indices) for _, indices in generated]
+    for (vertices, indices), (cached_vertices, cached_indices) in zip(generated, cached.lods):
+        assert np.array_equal(vertices, cached_vertices) and np.array_equal(indices, cached_indices)
+
+    cached.generate_lods(3, max_error=0.2, cache=tmp_path)
+    assert len(os.listdir(tmp_path)) == 2
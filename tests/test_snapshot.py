@@ -0,0 +1,151 @@
+import os
+from types import SimpleNamespace
+import numpy as np
+import glm
+import pytest
+import basilisk as bsk
+from basilisk.snapshot import SnapshotWriter, SnapshotReader, content_hash, header, alignment
+
+TESTS = os.path.dirname(__file__)
+
+
+@pytest.fixture(scope='module')
+def engine():
+    # Scenes need an OpenGL context, which is not available on every machine that runs the tests
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    try: return bsk.Engine(headless=True)
+    except Exception as error: pytest.skip(f'No OpenGL context: {error}')
+
+
+def make_writer() -> SnapshotWriter:
+    # Only the builtin resources of the engine are read when meshes and materials are added
+    engine = SimpleNamespace(cube=None, material_handler=SimpleNamespace(base=None))
+    return SnapshotWriter(SimpleNamespace(engine=engine))
+
+def make_scene(engine) -> bsk.Scene:
+    """
+    A scene with shared and unique resources, physics, colliders, a hierarchy and static instances
+    """
+
+    scene = bsk.Scene(engine)
+    wedge = bsk.Mesh(os.path.join(TESTS, 'wedge.obj'))
+    red   = bsk.Material(name='red', color=(255, 0, 0), roughness=0.3)
+    blue  = bsk.Material(name='blue', color=(0, 0, 255), metallicness=0.8)
+
+    random = np.random.default_rng(0)
+    nodes = [bsk.Node(
+        position = tuple(random.uniform(-20, 20, 3).tolist()),
+        rotation = glm.angleAxis(float(random.uniform(0, 6)), glm.vec3(0, 1, 0)),
+        scale    = tuple(random.uniform(0.5, 2, 3).tolist()),
+        mesh     = wedge if i % 3 else None,
+        material = red if i % 2 else blue,
+        name     = f'node{i % 4}',
+        tags     = ['even'] if i % 2 == 0 else [],
+        velocity = (0, 0, float(i % 5 == 0)),
+        static   = True if i % 7 == 0 else None,
+    ) for i in range(60)]
+
+    body     = bsk.Node(position=(0, 10, 0), physics=True, mass=3, collision=True, static_friction=0.6, kinetic_friction=0.2, elasticity=0.5, collision_group='group', name='body')
+    child    = bsk.Node(position=(2, 10, 0), scale=(0.5, 0.5, 0.5), name='child')
+    listed   = bsk.Node(position=(0, -5, 0), material=[red, blue] * 6, name='listed')
+    occluder = bsk.Node(position=(0, 0, -30), scale=(10, 10, 1), occluder=True, name='occluder')
+    body.add(child)
+
+    scene.add_many(nodes)
+    scene.add(body, listed, occluder, bsk.StaticInstance(position=(5, 5, 5), mesh=wedge, material=red), bsk.StaticInstance(position=(-5, 5, 5)))
+    return scene
+
+def sort_nodes(nodes) -> list:
+    return sorted(nodes, key=lambda node: (node.name, tuple(node.position.data)))
+
+
+def test_arrays(tmp_path):
+    writer = make_writer()
+    writer.array('a', [[1, 2, 3], [4, 5, 6]], 'f4', (2, 3))
+    writer.array('b', [-1, 7, 3], 'i4', (3,))
+    writer.array('c', [True, False], 'u1', (2,))
+    writer.array('empty', [], 'f4', (0, 4))
+    writer.table['names'] = ['x', 'ü']
+    writer.write(tmp_path / 'arrays.bsk')
+
+    # Arrays are read back in place at aligned offsets
+    reader = SnapshotReader(None, tmp_path / 'arrays.bsk')
+    assert np.array_equal(reader.array('a'), [[1, 2, 3], [4, 5, 6]]) and reader.array('a').dtype == np.float32
+    assert np.array_equal(reader.array('b'), [-1, 7, 3]) and reader.array('b').dtype == np.int32
+    assert np.array_equal(reader.array('c'), [1, 0])
+    assert reader.array('empty').shape == (0, 4)
+    assert reader.table['names'] == ['x', 'ü']
+    assert all(entry['offset'] % alignment == 0 for entry in reader.table['arrays'].values())
+
+def test_shared_resources():
+    writer = make_writer()
+    cube, wedge = bsk.Mesh(os.path.join(TESTS, 'cube.obj')), bsk.Mesh(os.path.join(TESTS, 'wedge.obj'))
+    copy = bsk.Mesh(os.path.join(TESTS, 'cube.obj'))
+
+    # Meshes with the same data share an entry and their data is written once
+    assert [writer.mesh(mesh) for mesh in (cube, wedge, copy, cube, None)] == [0, 1, 0, 0, -1]
+    assert len(writer.table['meshes']) == 2 and len(writer.arrays) == 2
+    assert writer.table['meshes'][0]['hash'] == content_hash(cube.data)
+
+    material = bsk.Material(name='red', color=(255, 0, 0))
+    assert [writer.material(material), writer.material(bsk.Material()), writer.material(material), writer.material(None)] == [0, 1, 0, -1]
+    assert [writer.string('a'), writer.string('b'), writer.string('a'), writer.string(None)] == [0, 1, 0, -1]
+
+def test_invalid_files(tmp_path):
+    path = tmp_path / 'invalid.bsk'
+    path.write_bytes(b'BSK')
+    with pytest.raises(ValueError): SnapshotReader(None, path)
+
+    path.write_bytes(header.pack(b'NOTSCENE', 1, 0, 2) + b'{}')
+    with pytest.raises(ValueError): SnapshotReader(None, path)
+
+    path.write_bytes(header.pack(b'BSKSCENE', 1000, 0, 2) + b'{}')
+    with pytest.raises(ValueError): SnapshotReader(None, path)
+
+def test_round_trip(engine, tmp_path):
+    scene = make_scene(engine)
+    scene.save(tmp_path / 'scene.bsk')
+    loaded = bsk.Scene.load(engine, tmp_path / 'scene.bsk')
+
+    nodes, loaded_nodes = sort_nodes(scene.node_handler.nodes), sort_nodes(loaded.node_handler.nodes)
+    assert len(loaded_nodes) == len(nodes)
+    assert len(loaded.node_handler.instances) == len(scene.node_handler.instances)
+
+    for node, copy in zip(nodes, loaded_nodes):
+        assert copy.name == node.name and list(copy.tags) == list(node.tags)
+        assert np.allclose(copy.position.data, node.position.data, atol=1e-5)
+        assert np.allclose(copy.scale.data, node.scale.data, atol=1e-5)
+        assert abs(glm.dot(copy.rotation.data, node.rotation.data)) == pytest.approx(1, abs=1e-5)
+        assert np.allclose(copy.velocity, node.velocity) and np.allclose(copy.rotational_velocity, node.rotational_velocity)
+        assert copy.static == node.static and copy.occluder == node.occluder
+        assert np.array_equal(copy.mesh.data, node.mesh.data)
+        assert (copy.physics_body is None) == (node.physics_body is None) and (copy.collider is None) == (node.collider is None)
+
+        # Materials are recreated with the same parameters
+        materials, loaded_materials = (node._mtl_list, copy._mtl_list) if isinstance(node.material, list) else ([node.material], [copy.material])
+        assert [(material.name, tuple(material.color), material.roughness, material.metallicness) for material in loaded_materials] == [(material.name, tuple(material.color), material.roughness, material.metallicness) for material in materials]
+
+    # Shared resources stay shared
+    assert len({id(node.mesh) for node in loaded_nodes}) == len({id(node.mesh) for node in nodes})
+
+    # Physics and collider parameters
+    body = loaded.get(name='body')
+    assert body.mass == 3 and body.static_friction == pytest.approx(0.6) and body.kinetic_friction == pytest.approx(0.2)
+    assert body.elasticity == pytest.approx(0.5) and body.collision_group == 'group'
+    assert len(loaded.physics_engine.physics_bodies) == len(scene.physics_engine.physics_bodies) == 1
+    assert len(loaded.collider_handler.colliders) == len(scene.collider_handler.colliders)
+    assert len(loaded.node_handler.chunk_handler.occluders) == len(scene.node_handler.chunk_handler.occluders) == 1
+
+    # The hierarchy is restored and children follow their parents
+    child = loaded.get(name='child')
+    assert child.parent is body and body.children == [child]
+    original = scene.get(name='child')
+    assert np.allclose(child.relative_position, original.relative_position) and np.allclose(child.relative_scale, original.relative_scale)
+    assert abs(glm.dot(child.relative_rotation, original.relative_rotation)) == pytest.approx(1)
+    loaded.camera = bsk.StaticCamera()
+    body.position += (1, 0, 0)
+    loaded.update()
+    assert np.allclose(child.position.data, (3, 10, 0), atol=1e-4)
+
+    # Queries of the index see the loaded nodes
+    assert len(loaded.get_all(tags=['even'])) == 30
@@ -0,0 +1,252 @@
+from types import SimpleNamespace
+import numpy as np
+import glm
+import pytest
+from basilisk.nodes.node import Node
+from basilisk.nodes.transform_store import TransformStore, integrate_transforms, DIRTY_POSITION, DIRTY_ROTATION, DIRTY_TRANSFORM
+
+
+def reference_update(position, rotation, velocity, rotational_velocity, mass, physics_engine, dt) -> tuple:
+    """
+    The per node update that integrate_transforms replaced
+    """
+
+    if any(velocity): position = position + dt * velocity
+    if any(rotational_velocity): rotation = glm.normalize(rotation - dt / 2 * rotation * glm.quat(0, *rotational_velocity))
+
+    if physics_engine:
+        for acceleration in physics_engine.accelerations: velocity = velocity + acceleration * dt
+        for force in physics_engine.forces: velocity = velocity + force / mass * dt
+        for rotational_acceleration in physics_engine.rotational_accelerations: rotational_velocity = rotational_velocity + rotational_acceleration * dt
+
+    return position, rotation, velocity, rotational_velocity
+
+def random_rows(random, n: int) -> tuple:
+    positions = random.uniform(-10, 10, (n, 3)).astype('f4')
+    rotations = random.normal(size=(n, 4)).astype('f4')
+    rotations /= np.linalg.norm(rotations, axis=1, keepdims=True)
+    velocities = random.uniform(-2, 2, (n, 3)).astype('f4') * (random.random((n, 1)) < 0.7)
+    rotational_velocities = random.uniform(-2, 2, (n, 3)).astype('f4') * (random.random((n, 1)) < 0.7)
+    masses = random.uniform(0.5, 5, n).astype('f4')
+    physics = (random.random(n) < 0.5).astype('u1')
+    return positions, rotations, velocities, rotational_velocities, masses, physics
+
+def make_engine() -> SimpleNamespace:
+    # Only the constant accelerations and forces of the physics engine are read
+    return SimpleNamespace(accelerations=[glm.vec3(0, -9.8, 0), glm.vec3(1, 0, 0)], forces=[glm.vec3(0, 0, 3)], rotational_accelerations=[glm.vec3(0, 0.5, 0)])
+
+
+def test_integrate_transforms():
+    random = np.random.default_rng(0)
+    engine = make_engine()
+    positions, rotations, velocities, rotational_velocities, masses, physics = random_rows(random, 200)
+    expected = [(glm.vec3(*p), glm.quat(*r), glm.vec3(*v), glm.vec3(*w)) for p, r, v, w in zip(positions.tolist(), rotations.tolist(), velocities.tolist(), rotational_velocities.tolist())]
+
+    acceleration = np.array(sum(engine.accelerations, glm.vec3()), dtype='f4')
+    force = np.array(sum(engine.forces, glm.vec3()), dtype='f4')
+    rotational_acceleration = np.array(sum(engine.rotational_accelerations, glm.vec3()), dtype='f4')
+
+    for step in range(10):
+        dt = 1 / 60 * (1 + step % 3)
+        moving = np.any(velocities != 0, axis=1), np.any(rotational_velocities != 0, axis=1)
+        changed = integrate_transforms(positions, rotations, velocities, rotational_velocities, masses, physics, acceleration, force, rotational_acceleration, dt)
+        assert np.array_equal(changed, moving[0] * DIRTY_POSITION | moving[1] * DIRTY_ROTATION)
+
+        expected = [reference_update(*row, float(mass), engine if flag else None, dt) for row, mass, flag in zip(expected, masses, physics)]
+
+    for row, (position, rotation, velocity, rotational_velocity) in enumerate(expected):
+        assert np.allclose(positions[row], position, atol=1e-4)
+        assert np.allclose(rotations[row], [rotation.w, rotation.x, rotation.y, rotation.z], atol=1e-5)
+        assert np.allclose(velocities[row], velocity, atol=1e-4)
+        assert np.allclose(rotational_velocities[row], rotational_velocity, atol=1e-5)
+
+def test_integrate_store():
+    random = np.random.default_rng(1)
+    engine = make_engine()
+    positions, rotations, velocities, rotational_velocities, masses, physics = random_rows(random, 100)
+    nodes = [Node(physics=bool(flag), mass=float(mass) if flag else None) for flag, mass in zip(physics, masses)]
+
+    # The store grows past its initial capacity
+    store = TransformStore(capacity=16)
+    store.add_many(nodes, positions, rotations, np.ones((100, 3), dtype='f4'), velocities, rotational_velocities)
+    store.clear_dirty()
+
+    expected = [(glm.vec3(*p), glm.quat(*r), glm.vec3(*v), glm.vec3(*w)) for p, r, v, w in zip(positions.tolist(), rotations.tolist(), velocities.tolist(), rotational_velocities.tolist())]
+    for _ in range(5):
+        rows, flags = store.integrate(1 / 30, engine)
+        assert np.array_equal(store.dirty[rows], flags) and np.all(flags)
+        expected = [reference_update(*row, node.physics_body.mass if node.physics_body else 1, engine if node.physics_body else None, 1 / 30) for row, node in zip(expected, nodes)]
+
+    for node, (position, rotation, velocity, rotational_velocity) in zip(nodes, expected):
+        row = node.transform_index
+        assert np.allclose(store.positions[row], position, atol=1e-4)
+        assert np.allclose(store.rotations[row], [rotation.w, rotation.x, rotation.y, rotation.z], atol=1e-5)
+        # Nodes read their velocities from the store
+        assert np.allclose(node.velocity, velocity, atol=1e-4)
+        assert np.allclose(node.rotational_velocity, rotational_velocity, atol=1e-5)
+
+def test_velocity_view():
+    store = TransformStore()
+    node = Node(velocity=(1, 2, 2))
+    store.add(node)
+
+    # Velocities are glm vectors, and edits to them are written to the node's row
+    assert glm.length(node.velocity) == pytest.approx(3) and glm.vec3(node.velocity) == glm.vec3(1, 2, 2)
+    node.velocity.x += 1
+    velocity = node.rotational_velocity
+    velocity += glm.vec3(0, 0, 4)
+    assert np.array_equal(store.velocities[node.transform_index], [2, 2, 2])
+    assert np.array_equal(store.rotational_velocities[node.transform_index], [0, 0, 4])
+
+    # Integration is seen by the next read
+    store.velocities[node.transform_index] = (0, 5, 0)
+    assert node.velocity == glm.vec3(0, 5, 0)
+
+def test_integrate_empty_store():
+    rows, flags = TransformStore().integrate(1 / 60, make_engine())
+    assert len(rows) == 0 and len(flags) == 0
+
+def test_deprecated_update():
+    store = TransformStore()
+    parent, child, other = Node(velocity=(1, 0, 0)), Node(position=(0, 2, 0)), Node(velocity=(0, 1, 0))
+    parent.add(child)
+    for node in (parent, child, other): store.add(node)
+    store.propagate()
+    store.clear_dirty()
+    parent.scene = SimpleNamespace(physics_engine=make_engine())
+
+    # Only the node's row is integrated and its children follow it
+    with pytest.warns(DeprecationWarning): parent.update(0.5)
+    assert parent.position.data == glm.vec3(0.5, 0, 0) and child.position.data == glm.vec3(0.5, 2, 0)
+    assert np.array_equal(store.positions[child.transform_index], [0.5, 2, 0])
+    assert other.position.data == glm.vec3(0, 0, 0)
+
+    # Moved parents are synchronized without integrating
+    store.positions[parent.transform_index] = (3, 0, 0)
+    store.dirty[parent.transform_index] |= DIRTY_POSITION
+    with pytest.warns(DeprecationWarning): child.sync_data()
+    assert child.position.data == glm.vec3(3, 2, 0)
+
+def test_deprecated_update_without_store():
+    parent, child = Node(velocity=(0, 0, 2)), Node(position=(1, 0, 0))
+    parent.add(child)
+    with pytest.warns(DeprecationWarning): parent.update(0.5)
+    assert parent.position.data == glm.vec3(0, 0, 1) and child.position.data == glm.vec3(1, 0, 1)
+
+def reference_sync(node, parent: tuple) -> tuple:
+    """
+    The per node sync_data that propagate replaced, keeping the components that are not relative to the parent
+    """
+
+    parent_position, parent_rotation, parent_scale = parent
+    position, rotation, scale = glm.vec3(node.position.data), glm.quat(node.rotation.data), glm.vec3(node.scale.data)
+
+    transform = glm.mat4x4()
+    if node.relative_position: transform  = glm.translate(transform, parent_position)
+    if node.relative_rotation: transform *= glm.transpose(glm.mat4_cast(parent_rotation))
+    if node.relative_scale:    transform  = glm.scale(transform, parent_scale)
+
+    if node.relative_position: position = transform * node.relative_position
+    if node.relative_scale:    scale    = node.relative_scale * parent_scale
+    if node.relative_rotation: rotation = glm.normalize(node.relative_rotation * parent_rotation)
+    return position, rotation, scale
+
+def make_hierarchy(random, store: TransformStore) -> tuple[list, list]:
+    """
+    Adds random trees of nodes to the store with a random mix of relative components. Returns the roots and the children
+    """
+
+    roots = [Node(position=tuple(random.uniform(-5, 5, 3).tolist()), scale=tuple(random.uniform(0.5, 2, 3).tolist())) for _ in range(6)]
+    for root in roots: store.add(root)
+
+    nodes, children = list(roots), []
+    for _ in range(40):
+        parent = nodes[random.integers(len(nodes))]
+        child = Node(position=tuple(random.uniform(-5, 5, 3).tolist()))
+        parent.add(child)
+        store.add(child)
+
+        rotation = glm.normalize(glm.quat(*random.normal(size=4).tolist()))
+        child.relative_position = tuple(random.uniform(-2, 2, 3).tolist()) if random.random() < 0.8 else None
+        child.relative_rotation = rotation if random.random() < 0.6 else None
+        child.relative_scale    = tuple(random.uniform(0.5, 2, 3).tolist()) if random.random() < 0.6 else None
+        nodes.append(child)
+        children.append(child)
+
+    return roots, children
+
+def get_transform(store: TransformStore, node) -> tuple:
+    row = node.transform_index
+    return glm.vec3(*store.positions[row].tolist()), glm.quat(*store.rotations[row].tolist()), glm.vec3(*store.scales[row].tolist())
+
+def check_children(store: TransformStore, children: list) -> None:
+    """
+    Compares the children in the store with syncing them one at a time from their parents, parents first
+    """
+
+    expected = {}
+    for child in children:
+        parent = expected.get(child.parent) or get_transform(store, child.parent)
+        # Components that are not relative keep the value the store had
+        child.internal_position._data, child.internal_rotation._data, child.internal_scale._data = get_transform(store, child)
+        expected[child] = reference_sync(child, parent)
+
+    for child, (position, rotation, scale) in expected.items():
+        actual = get_transform(store, child)
+        assert np.allclose(actual[0], position, atol=1e-3)
+        assert abs(glm.dot(actual[1], rotation)) == pytest.approx(1, abs=1e-5)
+        assert np.allclose(actual[2], scale, atol=1e-4)
+
+
+def test_propagate():
+    random = np.random.default_rng(2)
+    store = TransformStore(capacity=8)
+    roots, children = make_hierarchy(random, store)
+
+    rows, flags = store.propagate()
+    check_children(store, children)
+    store.clear_dirty()
+
+    # Nothing changes until a parent moves
+    rows, flags = store.propagate()
+    assert len(rows) == 0 and len(flags) == 0
+
+    for _ in range(5):
+        for root in roots:
+            row = root.transform_index
+            store.positions[row] += random.uniform(-1, 1, 3).astype('f4')
+            rotation = glm.normalize(glm.quat(*random.normal(size=4).tolist()))
+            store.rotations[row] = (rotation.w, rotation.x, rotation.y, rotation.z)
+            store.scales[row] = random.uniform(0.5, 2, 3).astype('f4')
+            store.dirty[row] |= DIRTY_TRANSFORM
+
+        rows, flags = store.propagate()
+        check_children(store, children)
+        store.clear_dirty()
+
+def test_propagate_dirty_subtree():
+    random = np.random.default_rng(3)
+    store = TransformStore()
+    roots, children = make_hierarchy(random, store)
+    store.propagate()
+    store.clear_dirty()
+
+    # Only the descendants of the moved root are updated
+    root = roots[0]
+    store.positions[root.transform_index] += 1
+    store.dirty[root.transform_index] |= DIRTY_POSITION
+    rows, flags = store.propagate()
+
+    descendants = {node.transform_index for node in root.get_all() if node is not root}
+    assert set(rows.tolist()) <= descendants
+    assert {node.transform_index for node in root.children if node.relative_position is not None} <= set(rows.tolist())
+    check_children(store, children)
+    store.clear_dirty()
+
+    # Changing a relative transform updates the child and its subtree
+    child = children[-1]
+    child.relative_position = (3, 0, 0)
+    child.relative_rotation = glm.quat(1, 0, 0, 0)
+    rows, flags = store.propagate()
+    assert child.transform_index in rows.tolist()
+    check_children(store, children)